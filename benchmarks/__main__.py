@@ -0,0 +1,122 @@
+"""Run benchmarks and compare against earlier results
+
+python -m benchmarks -o results.json
+python -m benchmarks --compare results.json
+"""
+import argparse
+import datetime
+import json
+import platform
+import re
+import subprocess
+import sys
+import timeit
+from .suite import BENCHMARKS
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def measure(build, repeat=5, min_time=0.2):
+    """Time a benchmark
+    Args:
+        build: benchmark function
+        repeat: number of timings to take the best of
+        min_time: least seconds per timing
+    Returns operations per second of the best timing
+    """
+    run, ops = build()
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    number = max(number, 1)
+    while timer.timeit(number) < min_time:
+        number *= 2
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return ops * number / best
+
+
+def git_revision():
+    """Current git commit, None outside a checkout"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(pattern=None, repeat=5, min_time=0.2):
+    """Run registered benchmarks
+    Args:
+        pattern: regex selecting benchmarks by name
+        repeat: number of timings to take the best of
+        min_time: least seconds per timing
+    Returns results dict
+    """
+    results = {}
+    for name, build in BENCHMARKS.items():
+        if pattern and not re.search(pattern, name):
+            continue
+        try:
+            ops = measure(build, repeat, min_time)
+        except ImportError as ex:  # vector engine without numpy
+            print("{0:40s} skipped ({1})".format(name, ex), file=sys.stderr)
+            continue
+        results[name] = {"ops_per_sec": ops}
+        print("{0:40s} {1:>14,.0f} ops/s".format(name, ops), file=sys.stderr)
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Compare results against a baseline
+    Args:
+        baseline: earlier results dict
+        current: new results dict
+        threshold: slowdown ratio counted as a regression
+    Returns dict of benchmark name to new/old throughput ratio for regressions
+    """
+    regressions = {}
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        ratio = result["ops_per_sec"] / old["ops_per_sec"]
+        if ratio < 1 - threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def main():
+    """Main method for benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark simulation hot paths")
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        help="JSON file to store results in")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="JSON results to check for throughput regressions against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown counted as a regression, 0.1 is 10%%")
+    parser.add_argument("-k", type=str, default=None, help="Only run benchmarks matching regex")
+    parser.add_argument("--repeat", type=int, default=5, help="Timings per benchmark")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.k, args.repeat)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(current, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(baseline, current, args.threshold)
+        for name, ratio in sorted(regressions.items()):
+            print("REGRESSION {0}: {1:.1%} of baseline throughput".format(name, ratio),
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Benchmarks of the simulation hot paths
+
+Each benchmark is a function taking no arguments that builds its state and
+returns a callable running one batch of operations, along with the number
+of operations in a batch.
+"""
+from pyblackjack.card import Card
+from pyblackjack.deck import Deck
+from pyblackjack.game import Game
+from pyblackjack.hand import Hand
+from pyblackjack.runner import needs_shuffle, new_deck, reshuffle, simulate
+from pyblackjack.strategy import BasicStrategy, DealerStrategy
+
+BENCHMARKS = {}
+
+# Rounds per end to end batch, the vector engine needs whole batches of lanes
+ROUNDS = {"object": 2000, "vector": 20000, "jit": 20000}
+
+
+def benchmark(name):
+    """Register a benchmark
+    Args:
+        name: benchmark name, used as key in results
+    """
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def dealt_hand(*values):
+    """Hand holding cards of given values
+    Args:
+        values: card values
+    Returns hand
+    """
+    hand = Hand()
+    for value in values:
+        hand.add_card(Card("Spades", value))
+    return hand
+
+
+def redeal(hand, cards):
+    """Return hand to its dealt cards, without building new objects
+    Args:
+        hand: hand to refill
+        cards: cards the hand was dealt
+    """
+    hand.clear()
+    for card in cards:
+        hand.add_card(card)
+
+
+@benchmark("deck_deal")
+def deck_deal():
+    """Deal a 4 deck shoe"""
+    deck = Deck(4)
+    deck.shuffle()
+
+    def run():
+        deck.reset()
+        for _ in range(200):
+            deck.deal()
+    return run, 200
+
+
+@benchmark("hand_get_value")
+def hand_get_value():
+    """Read value of a soft hand"""
+    hand = dealt_hand("A", "5", "3")
+
+    def run():
+        for _ in range(1000):
+            hand.get_value()
+    return run, 1000
+
+
+@benchmark("hand_add_card")
+def hand_add_card():
+    """Deal three cards to a cleared hand"""
+    cards = [Card("Spades", "A"), Card("Clubs", "5"), Card("Hearts", "9")]
+    hand = Hand()
+
+    def run():
+        for _ in range(1000):
+            redeal(hand, cards)
+    return run, 1000
+
+
+@benchmark("basic_strategy_play")
+def basic_strategy_play():
+    """Play hard 12 against a 10 with basic strategy"""
+    deck = new_deck(4)
+    strategy = BasicStrategy(deck)
+    dealer_hand = dealt_hand("6", "10")
+    hand = dealt_hand("10", "2")
+    cards = list(hand.cards)
+
+    def run():
+        for _ in range(500):
+            if len(deck) < 20:
+                reshuffle(deck)
+            redeal(hand, cards)
+            strategy.reset()
+            strategy.play(hand, dealer_hand)
+    return run, 500
+
+
+@benchmark("dealer_strategy_play")
+def dealer_strategy_play():
+    """Play dealer hard 12"""
+    deck = new_deck(4)
+    strategy = DealerStrategy(deck)
+    hand = dealt_hand("10", "2")
+    cards = list(hand.cards)
+
+    def run():
+        for _ in range(500):
+            if len(deck) < 20:
+                reshuffle(deck)
+            redeal(hand, cards)
+            strategy.play(hand)
+    return run, 500
+
+
+@benchmark("game_play")
+def game_play():
+    """Play rounds through a reused Game"""
+    deck = new_deck(4)
+    game = Game(deck, BasicStrategy(deck))
+
+    def run():
+        for _ in range(500):
+            if needs_shuffle(deck, 4, 0.75):
+                reshuffle(deck)
+            game.play_round()
+    return run, 500
+
+
+def rounds(strategy, num_decks, engine):
+    """End to end rounds through the runner
+    Args:
+        strategy: strategy name
+        num_decks: number of decks
+        engine: simulation engine
+    """
+    def build():
+        def run():
+            simulate(ROUNDS[engine], num_decks, 0.75, strategy, engine, seed=0)
+        return run, ROUNDS[engine]
+    return build
+
+
+for _strategy in ("basic_strategy", "basic_strategy_alt", "simple"):
+    for _decks in (1, 4):
+        benchmark("rounds_{0}_{1}".format(_strategy, _decks))(rounds(_strategy, _decks, "object"))
+        benchmark("rounds_vector_{0}_{1}".format(_strategy, _decks))(
+            rounds(_strategy, _decks, "vector"))
+        benchmark("rounds_jit_{0}_{1}".format(_strategy, _decks))(
+            rounds(_strategy, _decks, "jit"))
@@ -1,65 +1,74 @@
 """Main module"""
 import argparse
-import math
 import time
-import multiprocessing
 import logging
+import math
+import os
+import random
 import sys
 from .game import Game
-from .deck import Deck
-from .strategy import BasicStrategy, SimpleStrategy
+from .sweep import positive_int, shuffle_perc
+from .counting import SYSTEMS, parse_ramp
+from .table import MAX_SEATS
+from .rules import add_rule_arguments, rules_from_args
+from .stats import Z_95
+from .board import ResultBoard
+from .telemetry import add_telemetry_arguments, telemetry_from_args
+from .runner import (new_deck, new_counting, get_strategy, run_simulations, trace_path,
+                     new_tracer, check_penetration, TRACE_FORMATS, DEFAULT_CHUNK_SIZE)
+
 
+STRATEGIES = ["basic_strategy", "basic_strategy_alt", "basic_strategy_i18", "simple"]
 
-def new_deck(num_decks):
-    """Create new deck and shuffle
+
+def strategy_name(value):
+    """Validate strategy argument
     Args:
-        num_decks: number of decks to use for shuffle
-    Returns shuffled deck
+        value: packaged strategy name or path to a strategy JSON file
+    Returns strategy argument
     """
-    deck = Deck(num_decks)
-    deck.shuffle()
-    deck.cut()
-    return deck
+    if value not in STRATEGIES and not value.endswith(".json"):
+        raise argparse.ArgumentTypeError(
+            "invalid choice: {0!r} (choose from {1} or a .json file)".format(
+                value, ", ".join(STRATEGIES)))
+    return value
 
 
-def get_strategy(strategy):
-    """Generates player strategy to use based on input
+def bet_ramp(value):
+    """Validate bet ramp argument
     Args:
-        strategy: user input strategy
-    Returns strategy class
+        value: comma separated bet units
+    Returns tuple of units
     """
-    if strategy == "basic_strategy":
-        return BasicStrategy(None)
-    if strategy == "basic_strategy_alt":
-        return BasicStrategy(None, strat_file="basic_strategy_alt")
-    if strategy == "simple":
-        return SimpleStrategy(None)
+    try:
+        return parse_ramp(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
 
 
-def simulate(queue, batch_size, num_decks, shuffle_perc, strategy):
-    """Run single batch of simulations
+def report_comparison(strategies, results, finish_time):
+    """Log strategies compared on the same shoes
     Args:
-        batch_size: the batch size of games to run
-        num_decks: number of decks to use
-        shuffle_perc: at percentage used, reshuffle deck
-        strategy: player strategy to use
-    Adds results of sims to queue
+        strategies: strategy names, the first is the reference
+        results: comparison results of run_simulations
+        finish_time: run time in seconds
     """
-    deck = new_deck(num_decks)
-    batch_info = {"ties": 0, "wins": 0,
-                  "losses": 0, "earnings": 0, "num_hands": 0}
-    for _ in range(0, batch_size):
-        game = Game(deck, strategy)
-        if (float(len(game.deck.cards)) / (52 * num_decks)) < shuffle_perc:  # re-shuffle new deck
-            game.deck = new_deck(num_decks)
-        game.play()
-        batch_info["ties"] += game.game_info["ties"]
-        batch_info["wins"] += game.game_info["wins"]
-        batch_info["losses"] += game.game_info["losses"]
-        batch_info["earnings"] += game.game_info["earnings"]
-        batch_info["num_hands"] += (game.game_info["wins"] +
-                                    game.game_info["losses"] + game.game_info["ties"])
-    queue.put(batch_info)
+    num_sims = results["num_sims"]
+    logging.info('Total simulations: %d', num_sims)
+    logging.info('Simulations/s: %d', (float(num_sims) / finish_time))
+    logging.info('Execution time: %.2fs', finish_time)
+    for strategy, info in zip(strategies, results["strategies"]):
+        logging.info('%s: expected earnings per game %.4f, 95%% confidence interval [%.4f, %.4f]',
+                     strategy, info["round_stats"].mean, *info["round_stats"].confidence_interval())
+    reference = results["strategies"][0]["round_stats"]
+    for strategy, info, difference in zip(strategies[1:], results["strategies"][1:],
+                                          results["differences"]):
+        # Standard error the difference would have from two independent runs
+        independent = math.sqrt(reference.stderr ** 2 + info["round_stats"].stderr ** 2)
+        logging.info('%s - %s: %.4f per game, standard error %.4f (independent runs %.4f), '
+                     '95%% confidence interval [%.4f, %.4f]', strategy, strategies[0],
+                     difference.mean, difference.stderr, independent,
+                     *difference.confidence_interval())
 
 
 def main():
@@ -67,14 +76,49 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "num_sims", type=int, help="Enter the number of simulations to run")
-    parser.add_argument("num_decks", type=int,
-                        help="Number of decks to use", choices=[1, 2, 3, 4])
-    parser.add_argument("shuffle_perc", type=float,
-                        help="Shuffle percentage", choices=[0.50, 0.75])
-    parser.add_argument("strategy", type=str, help="Player strategy to use", choices=[
-                        "basic_strategy", "basic_strategy_alt", "simple"])
+    parser.add_argument("num_decks", type=positive_int, help="Number of decks to use")
+    parser.add_argument("shuffle_perc", type=shuffle_perc,
+                        help="Shuffle once less than this fraction of the shoe is left, "
+                        "between 0 and 1")
+    parser.add_argument("strategy", type=strategy_name, nargs="+",
+                        help="Player strategy to use, one of {0} or a strategy JSON file. "
+                        "Several strategies are played on the same shoes and compared "
+                        "with the first".format(", ".join(STRATEGIES)))
+    parser.add_argument("--engine", type=str, default="object",
+                        choices=["object", "vector", "jit"],
+                        help="Simulation engine, vector requires numpy, jit is compiled "
+                        "with numba when installed")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes, defaults to cpu count")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Simulations per unit of work handed to a worker")
+    parser.add_argument("--target-stderr", type=float, default=None,
+                        help="Stop once the standard error of earnings per game, or of the "
+                        "paired differences when comparing, is this small, "
+                        "num_sims is then the most simulations to run")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for reproducible runs")
+    parser.add_argument("--trace", type=str, default=None,
+                        help="Directory to write a trace of every round to, "
+                        "object engine only")
+    parser.add_argument("--trace-format", type=str, default="jsonl", choices=list(TRACE_FORMATS),
+                        help="Trace JSON lines or binary hand histories for replays")
+    parser.add_argument("--count", type=str, default=None, choices=list(SYSTEMS),
+                        help="Card counting system to track, object engine only")
+    parser.add_argument("--spread", type=bet_ramp, default=None,
+                        help="Bet units per true count of 1, 2, ... when counting, e.g. 1,2,4,8")
+    parser.add_argument("--seats", type=int, default=1,
+                        help="Players at the table sharing the shoe, 1 to 7, each simulation "
+                        "is then a table round (object engine only)")
     parser.add_argument('-d', action='store_true', help="Debug on/off")
+    add_rule_arguments(parser)
+    add_telemetry_arguments(parser)
     args = parser.parse_args()
+    try:
+        rules = rules_from_args(args)
+        check_penetration(args.num_decks, rules, args.seats)
+    except (argparse.ArgumentTypeError, ValueError) as error:
+        parser.error(str(error))
 
     if args.d:
         logging.basicConfig(level=logging.DEBUG, stream=sys.stdout)
@@ -83,42 +127,82 @@ def main():
 
     if args.num_sims < 1:
         logging.error("Please enter number of simulations >= 1")
-    elif args.num_sims == 1:
-        deck = new_deck(args.num_decks)
-        game = Game(deck, get_strategy(args.strategy))
+    elif args.chunk_size < 1 or (args.workers is not None and args.workers < 1):
+        logging.error("Please enter workers and chunk size >= 1")
+    elif args.trace and args.engine != "object":
+        logging.error("Tracing needs the object engine")
+    elif args.count and args.engine != "object":
+        logging.error("Counting needs the object engine")
+    elif not 1 <= args.seats <= MAX_SEATS:
+        logging.error("Please enter seats between 1 and %d", MAX_SEATS)
+    elif args.seats > 1 and (args.engine != "object" or args.trace or len(args.strategy) > 1):
+        logging.error("Several seats need the object engine, one strategy and no trace")
+    elif args.spread and not args.count:
+        logging.error("A bet spread needs a counting system, see --count")
+    elif len(args.strategy) > 1 and (args.trace or args.engine != "object"):
+        logging.error("Comparing strategies needs the object engine and no trace")
+    elif len(args.strategy) > 1:
+        board = ResultBoard(args.workers or os.cpu_count())
+        start_time = time.time()
+        try:
+            with telemetry_from_args(args, board, args.num_sims):
+                results, interrupted = run_simulations(
+                    args.num_sims, args.num_decks, args.shuffle_perc, args.strategy,
+                    workers=args.workers, chunk_size=args.chunk_size,
+                    seed=args.seed, target_stderr=args.target_stderr, count=args.count,
+                    spread=args.spread, rules=rules, board=board)
+        finally:
+            board.close()
+        finish_time = time.time() - start_time
+        if interrupted:
+            logging.warning('Interrupted, reporting completed simulations only')
+        if results["num_sims"] == 0:
+            return
+        report_comparison(args.strategy, results, finish_time)
+    elif args.num_sims == 1 and args.seats == 1:
+        deck = new_deck(args.num_decks, rng=random.Random(args.seed),
+                        penetration=rules.penetration)
+        tracer = None
+        if args.trace:
+            os.makedirs(args.trace, exist_ok=True)
+            tracer = new_tracer(trace_path(args.trace, 0, args.trace_format))
+        _, bet_spread = new_counting(deck, args.count, args.spread)
+        game = Game(deck, get_strategy(args.strategy[0], rules), tracer, bet_spread, rules)
         game.play()
         game.display_results()
+        if tracer is not None:
+            tracer.close()
         return
     else:
+        if args.trace:
+            os.makedirs(args.trace, exist_ok=True)
+        board = ResultBoard(args.workers or os.cpu_count())
         start_time = time.time()
-        cpus = multiprocessing.cpu_count()
-        batch_size = int(math.ceil(args.num_sims / float(cpus)))
-        queue = multiprocessing.Queue()
-
-        processes = []
-        for _ in range(0, cpus):
-            process = multiprocessing.Process(
-                target=simulate, args=(queue, batch_size,
-                                       args.num_decks, args.shuffle_perc,
-                                       get_strategy(args.strategy)))
-            processes.append(process)
-            process.start()
-
-        for proc in processes:
-            proc.join()
-
+        try:
+            with telemetry_from_args(args, board, args.num_sims):
+                results, interrupted = run_simulations(
+                    args.num_sims, args.num_decks, args.shuffle_perc, args.strategy[0],
+                    engine=args.engine, workers=args.workers, chunk_size=args.chunk_size,
+                    seed=args.seed, target_stderr=args.target_stderr, trace_dir=args.trace,
+                    trace_format=args.trace_format, count=args.count, spread=args.spread,
+                    seats=args.seats, rules=rules, board=board)
+        finally:
+            board.close()
         finish_time = time.time() - start_time
-        ties, wins, losses, num_hands, earnings = 0, 0, 0, 0, 0.0
-        for _ in range(0, cpus):
-            results = queue.get()
-            wins += results["wins"]
-            ties += results["ties"]
-            losses += results["losses"]
-            num_hands += results["num_hands"]
-            earnings += results["earnings"]
-
-        logging.info('Total simulations: %d', args.num_sims)
-        logging.info('Simulations/s: %d', (float(args.num_sims) / finish_time))
+        if interrupted:
+            logging.warning('Interrupted, reporting completed simulations only')
+        num_sims, num_hands = results["num_sims"], results["num_hands"]
+        wins, ties, losses = results["wins"], results["ties"], results["losses"]
+        earnings = results["earnings"]
+        if num_sims == 0:
+            return
+
+        # With several seats a simulation is a table round of a game per seat
+        num_games = results.get("seat_games", num_sims)
+        logging.info('Total simulations: %d', num_sims)
+        logging.info('Simulations/s: %d', (float(num_sims) / finish_time))
+        if "seat_games" in results:
+            logging.info('Seat games: %d', num_games)
         logging.info('Execution time: %.2fs', finish_time)
         logging.info('Hand win percentage: %.2f%%',
                      ((wins / float(num_hands)) * 100))
@@ -128,9 +212,18 @@ def main():
                      ((losses / float(num_hands)) * 100))
         logging.info('Total Earnings: %.2f', earnings)
         logging.info('Expected Earnings per game: %.2f',
-                     (earnings / args.num_sims))
-        logging.info('Expected Earnings per hand: %.2f\n',
+                     (earnings / num_games))
+        logging.info('Expected Earnings per hand: %.2f',
                      (earnings / num_hands))
+        round_stats, hand_stats = results["round_stats"], results["hand_stats"]
+        logging.info('Standard error per game: %.4f', round_stats.stderr)
+        logging.info('95%% confidence interval per game: [%.4f, %.4f]',
+                     *round_stats.confidence_interval())
+        logging.info('Standard error per hand: %.4f\n', hand_stats.stderr)
+        for upcard, stats in sorted(results.get("upcards", {}).items()):
+            logging.info('Dealer %s: %.2f%% of games, earnings per game %.4f +/- %.4f',
+                         'A' if upcard == 11 else upcard, 100.0 * stats.count / num_sims,
+                         stats.mean, Z_95 * stats.stderr)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,154 @@
+"""Module for bankroll and risk of ruin
+
+Answers session questions (risk of ruin, final bankroll, drawdown) by
+playing many independent sessions of a fixed number of rounds from a
+starting bankroll. Round outcomes, in units of the base bet, are
+simulated in bulk once, or read from the outcome histogram cache, and
+sessions draw from their distribution as NumPy arrays, a block of
+sessions at a time so memory stays bounded however many sessions are
+played.
+"""
+import argparse
+import math
+import numpy as np
+from .counting import SYSTEMS, parse_ramp
+from .outcomes import as_histogram, outcome_config, load_histogram
+from .rules import add_rule_arguments, rules_from_args
+from .runner import check_penetration
+from .sweep import positive_int, shuffle_perc, DEFAULT_CACHE_DIR
+
+# Session rounds held in memory at once, 4M float64 is 32MB per array
+MAX_BLOCK_CELLS = 2 ** 22
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def play_sessions(histogram, num_sessions, session_rounds, bankroll, rng):
+    """Play a block of sessions drawing rounds from an outcome distribution
+    A session is ruined once its bankroll is gone and stops there
+    Args:
+        histogram: outcomes.OutcomeHistogram to draw rounds from, in units
+        num_sessions: sessions in the block
+        session_rounds: rounds per session
+        bankroll: starting bankroll of each session, in units
+        rng: numpy random Generator
+    Returns ruined flags, final bankrolls and max drawdowns of the block
+    """
+    paths = histogram.sample(rng, (num_sessions, session_rounds))
+    paths = np.cumsum(paths, axis=1, out=paths)
+    paths += bankroll
+    broke = paths <= 0
+    ruined = broke.any(axis=1)
+    # Freeze ruined sessions at the round they went broke
+    if ruined.any():
+        at = broke.argmax(axis=1)
+        rows = np.nonzero(ruined)[0]
+        stopped = np.arange(session_rounds) > at[rows, None]
+        paths[rows] = np.where(stopped, paths[rows, at[rows], None], paths[rows])
+    peak = np.maximum(np.maximum.accumulate(paths, axis=1), bankroll)
+    drawdown = (peak - paths).max(axis=1)
+    return ruined, paths[:, -1], drawdown
+
+
+def run_sessions(outcomes, num_sessions, session_rounds, bankroll, seed=None,
+                 block_cells=MAX_BLOCK_CELLS):
+    """Play independent sessions drawing rounds from an outcome distribution
+    Args:
+        outcomes: outcomes.OutcomeHistogram, or round outcomes to resample, in units
+        num_sessions: sessions to play
+        session_rounds: rounds per session
+        bankroll: starting bankroll of each session, in units
+        seed: seed for the sessions, fresh system entropy if None
+        block_cells: most session rounds held in memory at once
+    Returns dict of ruined flags, final bankrolls and max drawdowns per session
+    """
+    histogram = as_histogram(outcomes)
+    block = max(block_cells // session_rounds, 1)
+    rng = np.random.default_rng(seed)
+    results = {"ruined": np.empty(num_sessions, dtype=bool),
+               "final": np.empty(num_sessions), "drawdown": np.empty(num_sessions)}
+    for start in range(0, num_sessions, block):
+        stop = min(start + block, num_sessions)
+        ruined, final, drawdown = play_sessions(histogram, stop - start, session_rounds,
+                                                bankroll, rng)
+        results["ruined"][start:stop] = ruined
+        results["final"][start:stop] = final
+        results["drawdown"][start:stop] = drawdown
+    return results
+
+
+def summarize_sessions(sessions, outcomes, percentiles=PERCENTILES):
+    """Session statistics
+    Args:
+        sessions: run_sessions results
+        outcomes: outcome histogram or round outcomes the sessions drew from
+        percentiles: percentiles of final bankroll and drawdown to report
+    Returns dict of ruin probability, percentiles of final bankroll and max
+    drawdown, and expected value, standard deviation and N0 per round. N0 is
+    the rounds it takes the expected win to reach one standard deviation,
+    infinite for a game without an edge
+    """
+    histogram = as_histogram(outcomes)
+    mean, std = histogram.mean, histogram.std
+    return {"sessions": len(sessions["final"]),
+            "ruin": float(sessions["ruined"].mean()),
+            "final": dict(zip(percentiles, np.percentile(sessions["final"], percentiles).tolist())),
+            "drawdown": dict(zip(percentiles,
+                                 np.percentile(sessions["drawdown"], percentiles).tolist())),
+            "ev": mean, "std": std,
+            "n0": (std / mean) ** 2 if mean > 0 else math.inf}
+
+
+def main():
+    """Print risk of ruin and session percentiles"""
+    parser = argparse.ArgumentParser(description="Simulate bankroll sessions")
+    parser.add_argument("num_sessions", type=positive_int, help="Sessions to play")
+    parser.add_argument("session_rounds", type=positive_int, help="Rounds per session")
+    parser.add_argument("bankroll", type=float, help="Starting bankroll in base bets")
+    parser.add_argument("num_decks", type=positive_int, help="Number of decks to use")
+    parser.add_argument("shuffle_perc", type=shuffle_perc,
+                        help="Shuffle once less than this fraction of the shoe is left")
+    parser.add_argument("strategy", type=str, help="Player strategy name or strategy JSON file")
+    parser.add_argument("--outcome-rounds", type=positive_int, default=1000000,
+                        help="Rounds in the outcome histogram sessions draw from")
+    parser.add_argument("--engine", type=str, default="vector",
+                        choices=["vector", "jit", "object"],
+                        help="Engine simulating round outcomes, object to count")
+    parser.add_argument("--count", type=str, default=None, choices=list(SYSTEMS),
+                        help="Card counting system to bet on, object engine only")
+    parser.add_argument("--spread", type=parse_ramp, default=None,
+                        help="Bet units per true count when counting, e.g. 1,2,4,8")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible runs")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR,
+                        help="Directory of cached outcome histograms")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the cache")
+    add_rule_arguments(parser)
+    args = parser.parse_args()
+    try:
+        rules = rules_from_args(args)
+        check_penetration(args.num_decks, rules)
+    except (argparse.ArgumentTypeError, ValueError) as error:
+        parser.error(str(error))
+    if args.count and args.engine != "object":
+        parser.error("Counting needs the object engine")
+
+    config = outcome_config(args.num_decks, args.shuffle_perc, args.strategy, args.engine, rules,
+                            args.count, args.spread)
+    outcomes = load_histogram(config, args.outcome_rounds, args.seed,
+                              None if args.no_cache else args.cache_dir)
+    sessions = run_sessions(outcomes, args.num_sessions, args.session_rounds, args.bankroll,
+                            args.seed)
+    summary = summarize_sessions(sessions, outcomes)
+    print("Sessions: {0} of {1} rounds from {2:g} units".format(
+        summary["sessions"], args.session_rounds, args.bankroll))
+    print("EV per round: {0:.4f} units, standard deviation {1:.4f}, N0 {2:.0f} rounds".format(
+        summary["ev"], summary["std"], summary["n0"]))
+    print("Risk of ruin: {0:.4%}".format(summary["ruin"]))
+    print("{0:>10} {1:>12} {2:>12}".format("percentile", "final", "drawdown"))
+    for percentile in PERCENTILES:
+        print("{0:>10} {1:>12.1f} {2:>12.1f}".format(
+            percentile, summary["final"][percentile], summary["drawdown"][percentile]))
+
+
+if __name__ == '__main__':
+    main()
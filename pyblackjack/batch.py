@@ -0,0 +1,326 @@
+"""Module for vectorized batch simulation
+
+Plays one round in each of many independent lanes at once, every lane
+owning its own shoe. Hands are tracked as integer arrays (hard total, ace
+count, card count) and player decisions come from the strategy JSON
+compiled into a dense action table, so the cost of a round is spread over
+the whole batch instead of being paid per Python object.
+"""
+import numpy as np
+from .rules import DEFAULT_RULES
+from .runner import check_penetration, MIN_ROUND_CARDS
+from .stats import RunningStats
+from .strategy import (load_strategy, load_surrender, PAIRS, SOFT, HARD, TABLE_KEYS,
+                       TABLE_UPCARDS, STAND_CODE, HIT_CODE, DOUBLE_CODE, SPLIT_CODE,
+                       SURRENDER_CODE)
+
+DEFAULT_LANES = 10000
+
+# Most cards a hand can take, 21 aces and the card busting it
+HAND_CARDS = 22
+
+# Most cards a single round can take (two hands and the dealer). Shoes are
+# padded with this many cards past their last, so a round started before the
+# cut never runs off the shoe
+MAX_ROUND_CARDS = 3 * HAND_CARDS
+
+# Rank index (A, 2, ..., K) to hard points, counting aces as 1
+POINTS = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10], dtype=np.int16)
+
+
+def simple_table():
+    """Action table for SimpleStrategy, hit below 12 otherwise stand
+    Returns int8 array indexed by [category, player key, dealer upcard]
+    """
+    table = np.full((3, TABLE_KEYS, TABLE_UPCARDS), STAND_CODE, dtype=np.int8)
+    table[HARD, :12] = HIT_CODE
+    table[PAIRS, 2:6] = HIT_CODE  # pair totals 4 through 10
+    return table
+
+
+def load_table(strategy, surrender=False):
+    """Load action table for named strategy
+    Args:
+        strategy: "basic_strategy", "basic_strategy_alt", or "simple"
+        surrender: load the table of first decisions with surrenders merged in,
+            the plain table if the strategy never surrenders
+    Returns int8 action table
+    """
+    if strategy == "simple":
+        return simple_table()
+    _, table = load_strategy(strategy)
+    if surrender:
+        table = load_surrender(strategy) or table
+    return np.frombuffer(table, dtype=np.int8).reshape(3, TABLE_KEYS, TABLE_UPCARDS)
+
+
+def summarize(values):
+    """Summarize array of values for merging into running stats
+    Args:
+        values: 1-d array
+    Returns RunningStats of values
+    """
+    if len(values) == 0:
+        return RunningStats()
+    mean = values.mean()
+    return RunningStats(len(values), float(mean), float(((values - mean) ** 2).sum()))
+
+
+def hand_value(hard, aces):
+    """Vectorized hand value
+    Args:
+        hard: hard totals counting aces as 1
+        aces: number of aces per hand
+    Returns best totals not above 21 where possible
+    """
+    return hard + 10 * ((aces > 0) & (hard + 10 <= 21))
+
+
+class BatchSimulator():
+    """Vectorized simulator over many lanes of independent shoes
+    Args:
+        num_decks: number of decks per shoe
+        shuffle_perc: at percentage remaining, reshuffle shoe
+        strategy: player strategy name
+        lanes: number of rounds played per step
+        seed: optional seed for the random generator
+        rules: optional rules.Rules, DEFAULT_RULES if not given. A pair is split
+            once at most, even where rules.max_hands allows more hands, and never
+            with max_hands of 1. Insurance is never taken without a count
+    """
+
+    def __init__(self, num_decks, shuffle_perc, strategy, lanes=DEFAULT_LANES, seed=None,
+                 rules=None):
+        rules = rules or DEFAULT_RULES
+        check_penetration(num_decks, rules)
+        self.num_decks = num_decks
+        self.table = load_table(strategy)
+        self.first_table = load_table(strategy, surrender=rules.surrender)
+        self.surrender = self.first_table is not self.table and \
+            bool((self.first_table == SURRENDER_CODE).any())
+        self.hit_soft_17 = rules.hit_soft_17
+        self.blackjack_payout = rules.blackjack_payout
+        self.double_after_split = rules.double_after_split
+        self.can_split = rules.max_hands > 1
+        self.penetration = rules.penetration
+        # A fixed cut card is the only reshuffle point
+        self.shuffle_perc = shuffle_perc if rules.penetration is None else 0.0
+        self.lanes = lanes
+        self.rng = np.random.default_rng(seed)
+        self.bet = 5.0
+        self.ranks = np.tile(np.arange(13, dtype=np.int8), 4 * num_decks)
+        self.shoe = np.empty((lanes, len(self.ranks) + MAX_ROUND_CARDS), dtype=np.int8)
+        self.cursor = np.zeros(lanes, dtype=np.int64)
+        self.end = np.zeros(lanes, dtype=np.int64)
+        self.reshuffle(np.arange(lanes))
+
+    def reshuffle(self, rows):
+        """Shuffle and cut shoes of given lanes
+        Args:
+            rows: lane indices to reshuffle
+        """
+        n_cards = len(self.ranks)
+        self.shoe[rows, :n_cards] = self.rng.permuted(
+            np.broadcast_to(self.ranks, (len(rows), n_cards)), axis=1)
+        # Padding is only reached by a long round at the very end of a shoe,
+        # and deals as from a fresh shoe rather than repeating dealt cards
+        self.shoe[rows, n_cards:] = self.rng.integers(
+            13, size=(len(rows), MAX_ROUND_CARDS), dtype=np.int8)
+        self.cursor[rows] = 0
+        if self.penetration is not None:
+            self.end[rows] = round(n_cards * self.penetration)
+        else:
+            self.end[rows] = self.rng.integers(
+                round(n_cards * 0.7), round(n_cards * 0.9), endpoint=True, size=len(rows))
+
+    def draw(self, rows):
+        """Deal next card from shoes of given lanes
+        Args:
+            rows: lane indices to deal to
+        Returns rank indices dealt
+        """
+        cards = self.shoe[rows, self.cursor[rows]]
+        self.cursor[rows] += 1
+        return cards
+
+    def run(self, num_rounds, board=None):
+        """Simulate rounds
+        Args:
+            num_rounds: total number of rounds to play
+            board: optional board.BoardRow to publish each step to
+        Returns dict of ties, wins, losses, earnings, num_hands and
+        round and hand earnings stats
+        """
+        info = {"ties": 0, "wins": 0, "losses": 0, "earnings": 0.0, "num_hands": 0,
+                "round_stats": RunningStats(), "hand_stats": RunningStats()}
+        while num_rounds > 0:
+            k = min(num_rounds, self.lanes)
+            wins, ties, losses, earnings, upcard = self.play_round(k)
+            info["wins"] += int(wins.sum())
+            info["ties"] += int(ties.sum())
+            info["losses"] += int(losses.sum())
+            info["earnings"] += float(earnings.sum())
+            info["num_hands"] = info["wins"] + info["ties"] + info["losses"]
+            round_earnings = earnings.sum(axis=1)
+            info["round_stats"].merge(summarize(round_earnings))
+            info["hand_stats"].merge(summarize(earnings[wins | ties | losses]))
+            if board is not None:
+                board.add_rounds(upcard, round_earnings)
+                board.publish(info)
+            num_rounds -= k
+        return info
+
+    def round_earnings(self, num_rounds):
+        """Simulate rounds keeping the earnings of each
+        Args:
+            num_rounds: total number of rounds to play
+        Returns float array of round earnings in play order
+        """
+        earnings = np.empty(num_rounds)
+        done = 0
+        while done < num_rounds:
+            k = min(num_rounds - done, self.lanes)
+            earnings[done:done + k] = self.play_round(k)[3].sum(axis=1)
+            done += k
+        return earnings
+
+    def play_round(self, k):
+        """Play one round in each of the first k lanes
+        Args:
+            k: number of lanes to play
+        Returns per-hand win, tie and loss flags and earnings, shaped (lanes, 2),
+        and the dealer upcard value of each lane
+        """
+        left = self.end[:k] - self.cursor[:k]
+        low = (left < MIN_ROUND_CARDS) | (left / (52.0 * self.num_decks) < self.shuffle_perc)
+        if low.any():
+            self.reshuffle(np.nonzero(low)[0])
+
+        lanes = np.arange(k)
+        p_1 = self.draw(lanes)
+        d_1 = self.draw(lanes)
+        p_2 = self.draw(lanes)
+        d_2 = self.draw(lanes)
+        upcard = np.where(d_2 == 0, 11, POINTS[d_2])
+
+        # Two hand slots per lane, second only used after a split
+        hard = np.zeros((k, 2), dtype=np.int16)
+        aces = np.zeros((k, 2), dtype=np.int8)
+        ncards = np.zeros((k, 2), dtype=np.int8)
+        bet = np.zeros((k, 2))
+        done = np.ones((k, 2), dtype=bool)
+        hard[:, 0] = POINTS[p_1] + POINTS[p_2]
+        aces[:, 0] = (p_1 == 0).astype(np.int8) + (p_2 == 0)
+        ncards[:, 0] = 2
+        bet[:, 0] = self.bet
+
+        d_hard = POINTS[d_1] + POINTS[d_2]
+        d_aces = (d_1 == 0).astype(np.int8) + (d_2 == 0)
+
+        player_bj = hand_value(hard[:, 0], aces[:, 0]) == 21
+        dealer_bj = hand_value(d_hard, d_aces) == 21
+        live = ~(player_bj | dealer_bj)
+        done[:, 0] = ~live
+
+        # Single split, split aces take one card each
+        is_pair = p_1 == p_2
+        pair_key = np.where(p_1 == 0, 11, POINTS[p_1])
+        split = live & is_pair & self.can_split & \
+            (self.table[PAIRS, pair_key, upcard] == SPLIT_CODE)
+        rows = np.nonzero(split)[0]
+        if len(rows):
+            first, second = self.draw(rows), self.draw(rows)
+            for slot, (card, new) in enumerate(((p_1[rows], first), (p_2[rows], second))):
+                hard[rows, slot] = POINTS[card] + POINTS[new]
+                aces[rows, slot] = (card == 0).astype(np.int8) + (new == 0)
+                ncards[rows, slot] = 2
+                bet[rows, slot] = self.bet
+                done[rows, slot] = p_1[rows] == 0
+
+        # Late surrender of unsplit hands without an ace, the only surrender cells
+        surrendered = np.zeros(k, dtype=bool)
+        if self.surrender:
+            hard_key = hand_value(hard[:, 0], aces[:, 0])
+            surrendered = live & ~split & ~(is_pair & self.can_split) & (aces[:, 0] == 0) & \
+                (self.first_table[HARD, hard_key, upcard] == SURRENDER_CODE)
+            done[:, 0] |= surrendered
+
+        for slot in range(2):
+            self.play_slot(slot, hard, aces, ncards, bet, done, split, is_pair,
+                           pair_key, upcard)
+
+        # Dealer draws once for lanes with a standing hand
+        value = hand_value(hard, aces)
+        in_play = bet > 0
+        in_play[:, 0] &= ~surrendered
+        standing = live & ((in_play & (value <= 21)).any(axis=1))
+        rows = np.nonzero(standing)[0]
+        while len(rows):
+            d_value = hand_value(d_hard[rows], d_aces[rows])
+            drawing = d_value < 17
+            if self.hit_soft_17:  # soft 17 counts an ace as 11, hard total 7
+                drawing |= (d_value == 17) & (d_aces[rows] > 0) & (d_hard[rows] == 7)
+            rows = rows[drawing]
+            if len(rows):
+                card = self.draw(rows)
+                d_hard[rows] += POINTS[card]
+                d_aces[rows] += (card == 0)
+        d_value = hand_value(d_hard, d_aces)[:, None]
+
+        bust = value > 21
+        win = in_play & live[:, None] & ~bust & ((d_value > 21) | (value > d_value))
+        tie = in_play & live[:, None] & ~bust & (d_value <= 21) & (value == d_value)
+        loss = in_play & live[:, None] & ~(win | tie)
+        earnings = np.where(win, bet, 0.0) - np.where(loss, bet, 0.0)
+
+        # Surrendered hands lose half their bet
+        loss[:, 0] |= surrendered
+        earnings[:, 0] -= np.where(surrendered, 0.5 * self.bet, 0.0)
+
+        # Naturals settle before any play
+        win[:, 0] |= player_bj & ~dealer_bj
+        tie[:, 0] |= player_bj & dealer_bj
+        loss[:, 0] |= dealer_bj & ~player_bj
+        earnings[:, 0] += np.where(player_bj & ~dealer_bj, self.blackjack_payout * self.bet, 0.0)
+        earnings[:, 0] -= np.where(dealer_bj & ~player_bj, self.bet, 0.0)
+        return win, tie, loss, earnings, upcard
+
+    def play_slot(self, slot, hard, aces, ncards, bet, done, split, is_pair,
+                  pair_key, upcard):
+        """Play player decisions for one hand slot until all lanes finish
+        Args:
+            slot: hand slot index
+            hard, aces, ncards, bet, done: per-lane hand state, updated in place
+            split: lanes whose opening pair was split
+            is_pair: lanes whose opening hand is a pair
+            pair_key: table key of opening pair
+            upcard: dealer upcard value
+        """
+        rows = np.nonzero(~done[:, slot])[0]
+        while len(rows):
+            h_hard, h_aces, h_cards = hard[rows, slot], aces[rows, slot], ncards[rows, slot]
+            value = hand_value(h_hard, h_aces)
+            two_cards = h_cards == 2
+            # Pairs that can't be split play on their total, A,A as hard 12
+            opening = two_cards & is_pair[rows] & ~split[rows]
+            pair = opening & self.can_split
+            soft = two_cards & (h_aces > 0) & ~opening
+            category = np.where(pair, PAIRS, np.where(soft, SOFT, HARD))
+            key = np.where(pair, pair_key[rows], np.where(soft, h_hard - 1, value))
+            action = self.table[category, key, upcard[rows]]
+
+            drawing = action != STAND_CODE
+            doubled = (action == DOUBLE_CODE) & two_cards
+            if not self.double_after_split:
+                doubled &= ~split[rows]
+            bet[rows[doubled], slot] *= 2
+            hitters = rows[drawing]
+            card = self.draw(hitters)
+            hard[hitters, slot] += POINTS[card]
+            aces[hitters, slot] += (card == 0)
+            ncards[hitters, slot] += 1
+
+            finished = ~drawing | doubled | \
+                (hand_value(hard[rows, slot], aces[rows, slot]) > 21)
+            done[rows[finished], slot] = True
+            rows = rows[~finished]
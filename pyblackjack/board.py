@@ -0,0 +1,217 @@
+"""Module for shared memory results
+
+Workers of a run write running totals into their own row of a shared
+memory block of doubles, which the parent reads at any time without
+anything being pickled: progress and estimates while the run is going,
+and breakdowns chunk results do not carry, such as earnings by dealer
+upcard. Rows are only ever written by their worker, so no locking is
+needed and a row read mid update is at most one publish behind.
+"""
+import time
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from .stats import RunningStats
+
+# Fields of a row, totals of every chunk the worker ran or is running, BUSY is 1
+# while a chunk is in progress
+(ROUNDS, HANDS, WINS, TIES, LOSSES, EARNINGS, ROUND_MEAN, ROUND_M2, CHUNKS, UPDATED,
+ BUSY) = range(11)
+
+# Rounds, earnings and squared earnings per round by dealer upcard
+UPCARDS = range(2, 12)
+UPCARD_START = 11
+FIELDS = UPCARD_START + 3 * len(UPCARDS)
+
+# Rounds the object engine plays between publishes
+PUBLISH_ROUNDS = 1000
+
+
+def sum_stats(count, total, squares):
+    """Running stats of values given by their sums
+    Args:
+        count: number of values
+        total: sum of values
+        squares: sum of squared values
+    Returns RunningStats
+    """
+    if count == 0:
+        return RunningStats()
+    mean = total / count
+    return RunningStats(int(count), mean, max(squares - total * mean, 0.0))
+
+
+class ResultBoard():
+    """Shared memory block of result rows, one per worker
+    Args:
+        rows: number of rows
+        name: name of a board to attach to, a new zeroed board if None
+    """
+
+    def __init__(self, rows, name=None):
+        self.rows = rows
+        self.shm = SharedMemory(name=name, create=name is None, size=rows * FIELDS * 8)
+        self.values = self.shm.buf.cast('d')
+        self.owner = name is None
+
+    @property
+    def name(self):
+        """Name to attach to the board with"""
+        return self.shm.name
+
+    def row(self, index):
+        """Writer of one row
+        Args:
+            index: row index
+        Returns BoardRow
+        """
+        return BoardRow(self, index)
+
+    def read(self):
+        """Copy of every row
+        Returns list of rows, each a list of FIELDS values
+        """
+        values = self.values.tolist()
+        return [values[row * FIELDS:(row + 1) * FIELDS] for row in range(self.rows)]
+
+    def totals(self):
+        """Results over every row
+        Returns dict of rounds, hands, wins, ties, losses and earnings, round
+        earnings RunningStats, RunningStats of round earnings by dealer
+        upcard, and the row, rounds, chunks, last publish time and whether a
+        chunk is in progress of each worker that published
+        """
+        totals = {"rounds": 0, "hands": 0, "wins": 0, "ties": 0, "losses": 0, "earnings": 0.0,
+                  "round_stats": RunningStats(), "upcards": {}, "workers": []}
+        upcards = [0.0] * (3 * len(UPCARDS))
+        for index, row in enumerate(self.read()):
+            if row[ROUNDS] == 0 and not row[BUSY]:
+                continue
+            for key, field in (("rounds", ROUNDS), ("hands", HANDS), ("wins", WINS),
+                               ("ties", TIES), ("losses", LOSSES)):
+                totals[key] += int(row[field])
+            totals["earnings"] += row[EARNINGS]
+            totals["round_stats"].merge(
+                RunningStats(int(row[ROUNDS]), row[ROUND_MEAN], row[ROUND_M2]))
+            for field, value in enumerate(row[UPCARD_START:]):
+                upcards[field] += value
+            totals["workers"].append({"row": index, "rounds": int(row[ROUNDS]),
+                                      "chunks": int(row[CHUNKS]), "updated": row[UPDATED],
+                                      "busy": bool(row[BUSY])})
+        for index, upcard in enumerate(UPCARDS):
+            if upcards[3 * index]:
+                totals["upcards"][upcard] = sum_stats(*upcards[3 * index:3 * index + 3])
+        return totals
+
+    def close(self):
+        """Detach from the board, removing it if this board created it"""
+        self.values.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class BoardRow():
+    """Writer of a worker's row of a ResultBoard
+    Totals of finished chunks are kept and the chunk in progress is
+    published on top of them
+    Args:
+        board: ResultBoard to write to
+        index: row index
+    """
+
+    def __init__(self, board, index):
+        self.board = board
+        self.values = board.values
+        self.start = index * FIELDS
+        self.finished = [0.0] * FIELDS
+        self.upcards = [0.0] * (3 * len(UPCARDS))
+
+    def add_round(self, upcard, earnings):
+        """Tally a round of the chunk in progress by dealer upcard
+        Args:
+            upcard: dealer upcard value, 2 to 11
+            earnings: earnings of the round
+        """
+        upcards = self.upcards
+        index = 3 * (upcard - 2)
+        upcards[index] += 1
+        upcards[index + 1] += earnings
+        upcards[index + 2] += earnings * earnings
+
+    def add_rounds(self, upcards, earnings):
+        """Tally rounds of the chunk in progress by dealer upcard
+        Args:
+            upcards: NumPy array of dealer upcard values, 2 to 11
+            earnings: NumPy array of earnings of each round
+        """
+        import numpy as np
+        index = upcards.astype(np.int64) - 2
+        size = len(UPCARDS)
+        tallies = (np.bincount(index, minlength=size),
+                   np.bincount(index, weights=earnings, minlength=size),
+                   np.bincount(index, weights=earnings * earnings, minlength=size))
+        for offset, tally in enumerate(tallies):
+            for upcard, value in enumerate(tally.tolist()):
+                self.upcards[3 * upcard + offset] += value
+
+    def begin(self):
+        """Publish the finished totals with a new chunk in progress"""
+        row = list(self.finished)
+        row[UPDATED] = time.time()
+        row[BUSY] = 1
+        self.values[self.start:self.start + FIELDS] = row_bytes(row)
+
+    def publish(self, results):
+        """Write totals of finished chunks and the chunk in progress
+        Args:
+            results: results of the chunk so far, see runner.new_results
+        """
+        row = chunk_totals(self.finished, results, self.upcards)
+        row[UPDATED] = time.time()
+        row[BUSY] = 1
+        self.values[self.start:self.start + FIELDS] = row_bytes(row)
+
+    def finish(self, results):
+        """Publish a finished chunk and add it to the finished totals
+        Args:
+            results: results of the finished chunk
+        """
+        self.finished = chunk_totals(self.finished, results, self.upcards)
+        self.finished[CHUNKS] += 1
+        self.upcards = [0.0] * (3 * len(UPCARDS))
+        self.finished[UPDATED] = time.time()
+        self.values[self.start:self.start + FIELDS] = row_bytes(self.finished)
+
+
+def chunk_totals(finished, results, upcards):
+    """Row of finished totals with a chunk added
+    Args:
+        finished: row of totals of finished chunks
+        results: chunk results, the first strategy's when comparing strategies
+        upcards: upcard tallies of the chunk
+    Returns new row
+    """
+    if "strategies" in results:
+        results = results["strategies"][0]
+    row = list(finished)
+    stats = RunningStats(int(row[ROUNDS]), row[ROUND_MEAN], row[ROUND_M2])
+    stats.merge(results["round_stats"])
+    row[ROUNDS] = stats.count
+    row[ROUND_MEAN], row[ROUND_M2] = stats.mean, stats.m2
+    row[HANDS] += results["num_hands"]
+    row[WINS] += results["wins"]
+    row[TIES] += results["ties"]
+    row[LOSSES] += results["losses"]
+    row[EARNINGS] += results["earnings"]
+    for index, value in enumerate(upcards):
+        row[UPCARD_START + index] += value
+    return row
+
+
+def row_bytes(row):
+    """Row packed for a memoryview slice of doubles
+    Args:
+        row: list of FIELDS values
+    Returns memoryview of doubles
+    """
+    return memoryview(array('d', row))
@@ -8,9 +8,13 @@ class Card():
         value: number value of card
     """
 
+    __slots__ = ("suit", "value", "points", "is_ace")
+
     def __init__(self, suit, value):
         self.suit = suit
         self.value = value
+        self.points = self.get_value()
+        self.is_ace = value == "A"
 
     def get_value(self):
         """Gets numeric value of card
@@ -0,0 +1,129 @@
+"""Module for card counting
+
+Counts are read off prefix sums of card tags built once per shuffle, so
+the running count after any number of dealt cards is a single array
+lookup at the deck cursor and dealing a card costs nothing extra.
+"""
+import math
+from array import array
+from itertools import accumulate
+from .deck import CARD_VALUES, CARDS
+
+# Tags per rank in CARD_VALUES order (A, 2-10, J, Q, K) and whether the
+# system is balanced, unbalanced systems start at an initial running count
+# and bet on the running count instead of the true count
+SYSTEMS = {
+    "hilo": ((-1, 1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1), True),
+    "ko": ((-1, 1, 1, 1, 1, 1, 1, 0, 0, -1, -1, -1, -1), False),
+    "omega2": ((0, 1, 1, 2, 2, 2, 1, 0, -1, -2, -2, -2, -2), True),
+}
+
+
+class Counter():
+    """Running and true count of a counting system over a shoe
+    The counter attaches to the deck, which refreshes it when shuffled
+    Args:
+        system: name of a system in SYSTEMS
+        deck: deck to count
+    """
+
+    __slots__ = ("system", "tags", "value_tags", "balanced", "initial", "prefix", "deck")
+
+    def __init__(self, system, deck):
+        if system not in SYSTEMS:
+            raise ValueError("Unknown counting system {0!r}, choose from {1}".format(
+                system, ", ".join(SYSTEMS)))
+        rank_tags, self.balanced = SYSTEMS[system]
+        self.system = system
+        self.tags = [rank_tags[code % len(CARD_VALUES)] for code in range(len(CARDS))]
+        self.value_tags = dict(zip(CARD_VALUES, rank_tags))
+        # KO starts at 4 - 4 * decks so its key counts do not depend on shoe size
+        self.initial = 0 if self.balanced else 4 - 4 * deck.num_decks
+        self.deck = deck
+        deck.counter = self
+        self.refresh()
+
+    def refresh(self):
+        """Drop prefix sums of the previous shoe order, rebuilt when next read"""
+        self.prefix = None
+
+    def build(self):
+        """Build prefix sums for the current order of the shoe
+        Returns prefix sums, running count before each card
+        """
+        self.prefix = array('i', accumulate(map(self.tags.__getitem__, self.deck.codes),
+                                            initial=self.initial))
+        return self.prefix
+
+    @property
+    def running_count(self):
+        """Running count of the cards dealt since the shoe was reset"""
+        prefix = self.prefix if self.prefix is not None else self.build()
+        return prefix[self.deck.pos]
+
+    @property
+    def decks_remaining(self):
+        """Decks not yet dealt, including those behind the cut card"""
+        return (len(self.deck.codes) - self.deck.pos) / 52
+
+    @property
+    def true_count(self):
+        """Running count per deck remaining, running count of unbalanced systems"""
+        deck = self.deck
+        prefix = self.prefix if self.prefix is not None else self.build()
+        if not self.balanced:
+            return prefix[deck.pos]
+        return prefix[deck.pos] * 52 / max(len(deck.codes) - deck.pos, 26)
+
+    def hidden_true_count(self, hidden):
+        """True count leaving out a dealt card the player has not seen
+        Args:
+            hidden: card dealt face down, such as the dealer hole card
+        Returns true count, running count of unbalanced systems
+        """
+        deck = self.deck
+        prefix = self.prefix if self.prefix is not None else self.build()
+        running = prefix[deck.pos] - self.value_tags[hidden.value]
+        if not self.balanced:
+            return running
+        return running * 52 / max(len(deck.codes) - deck.pos + 1, 26)
+
+
+class BetSpread():
+    """Bet sizing on the count
+    Args:
+        counter: counter of the shoe
+        unit: smallest bet
+        ramp: units to bet at a count of 1, 2, ... and at or above the last,
+            one unit below 1
+    """
+
+    __slots__ = ("counter", "unit", "ramp", "bets")
+
+    def __init__(self, counter, unit=5.0, ramp=(1, 2, 4, 6, 8)):
+        self.counter = counter
+        self.unit = unit
+        self.ramp = tuple(ramp)
+        # Bet at each count from 0 up to the top of the ramp
+        self.bets = (unit,) + tuple(unit * units for units in self.ramp)
+
+    def bet(self):
+        """Bet for the next round
+        Returns amount to bet
+        """
+        count = math.floor(self.counter.true_count)
+        if count < 1:
+            return self.unit
+        return self.bets[min(count, len(self.ramp))]
+
+
+def parse_ramp(value):
+    """Parse comma separated units per count, e.g. "1,2,4,8"
+    Args:
+        value: ramp argument
+    Returns tuple of units
+    """
+    ramp = tuple(int(units) for units in value.split(","))
+    if not ramp or min(ramp) < 1:
+        raise ValueError("Bet ramp needs units >= 1, got {0!r}".format(value))
+    return ramp
@@ -1,42 +1,85 @@
 """Module for decks"""
 import random
+from array import array
 from .card import Card
 
 SUITS = ["Spades", "Clubs", "Hearts", "Diamonds"]
 CARD_VALUES = ["A", "2", "3", "4", "5",
                "6", "7", "8", "9", "10", "J", "Q", "K"]
 
+# Shared card instances indexed by card code (suit * 13 + rank index),
+# dealt by reference so a shoe never rebuilds Card objects
+CARDS = tuple(Card(s, v) for s in SUITS for v in CARD_VALUES)
+
 
 class Deck():
     """Basic deck of gameplay
+    Cards are held as an array of card codes with a cursor to the next card,
+    dealing and re-shuffling never allocate
     Args:
         num_decks: number of decks to use
+        rng: random.Random to shuffle and cut with, seeded from system entropy if not given
+        penetration: fraction of the cards to place the cut card at, random if not given
+    An attached counting.Counter is refreshed whenever the deck is shuffled
     """
 
-    def __init__(self, num_decks):
-        self.cards = [Card(s, v)
-                      for s in SUITS for v in CARD_VALUES] * num_decks
+    def __init__(self, num_decks, rng=None, penetration=None):
+        self.num_decks = num_decks
+        self.penetration = penetration
+        self.rng = rng if rng is not None else random.Random()
+        self.codes = array('b', range(len(CARDS))) * num_decks
+        self.pos = 0
+        self.end = len(self.codes)
+        self.counter = None
+
+    def __len__(self):
+        """Number of cards left to deal"""
+        return self.end - self.pos
+
+    @property
+    def cards(self):
+        """Remaining cards in dealing order"""
+        return [CARDS[c] for c in self.codes[self.pos:self.end]]
+
+    def reset(self):
+        """
+        Returns all dealt and cut cards to the deck, keeping current order
+        """
+        self.pos = 0
+        self.end = len(self.codes)
 
     def shuffle(self):
         """
-        Shuffles deck
+        Shuffles remaining cards, in place when no card is dealt or cut off
+        as after reset, otherwise through a copy of the remaining cards
         """
-        if len(self.cards) > 1:
-            random.shuffle(self.cards)
+        if self.pos == 0 and self.end == len(self.codes):
+            self.rng.shuffle(self.codes)
+        elif self.end - self.pos > 1:
+            remaining = self.codes[self.pos:self.end]
+            self.rng.shuffle(remaining)
+            self.codes[self.pos:self.end] = remaining
+        if self.counter is not None:
+            self.counter.refresh()
 
     def cut(self):
         """
-        Cuts deck at uniform random dist around first 15 cards or so
+        Cuts deck at uniform random dist around first 15 cards or so,
+        or at the penetration if set
         """
-        if len(self.cards) > 1:
-            n_cards = len(self.cards)
-            cut_point = random.randint(round(n_cards*0.7), round(n_cards*0.9))
-            self.cards = self.cards[:cut_point]
+        if self.end - self.pos > 1:
+            n_cards = self.end - self.pos
+            if self.penetration is not None:
+                cut_point = round(n_cards * self.penetration)
+            else:
+                cut_point = self.rng.randint(round(n_cards*0.7), round(n_cards*0.9))
+            self.end = self.pos + cut_point
 
     def deal(self):
         """
         Gets first card from deck
         Returns first card from top of deck
         """
-        if len(self.cards) > 1:
-            return self.cards.pop(0)
+        if self.end - self.pos > 1:
+            self.pos += 1
+            return CARDS[self.codes[self.pos - 1]]
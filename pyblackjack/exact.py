@@ -0,0 +1,422 @@
+"""Module for exact expected value calculations
+
+Computes the dealer's final total distribution and the player's expected
+value by recursion over shoe compositions instead of Monte Carlo. A
+composition is a tuple of card counts by value, index 0 for aces through
+index 9 for ten valued cards.
+
+Dealer probabilities use the shoe after the player's two cards and the
+upcard are removed, player draws are taken from the shoe as it depletes.
+Splits are valued as two independent hands drawn from the same shoe, a
+pair is split once whatever the rules allow. As in the simulators only
+cards of one rank are a pair, so two ten valued cards are split only in
+the share of deals where their ranks match.
+"""
+import argparse
+from functools import lru_cache
+from .rules import DEFAULT_RULES, add_rule_arguments, rules_from_args
+from .strategy import (load_strategy, load_surrender, table_index, STAND_CODE, HIT_CODE,
+                       DOUBLE_CODE, SPLIT_CODE, SURRENDER_CODE, PAIRS, SOFT, HARD)
+
+# Dealer final totals, index 5 is a bust
+OUTCOMES = (17, 18, 19, 20, 21)
+BUST = len(OUTCOMES)
+
+DEALER_CACHE_SIZE = 2 ** 18
+
+# Ranks of ten valued cards, only two of one rank are a pair
+TEN_RANKS = 4
+
+
+def shoe_composition(num_decks):
+    """Composition of a full shoe
+    Args:
+        num_decks: number of decks
+    Returns counts of aces, twos through nines and ten valued cards
+    """
+    return (4 * num_decks,) * 9 + (16 * num_decks,)
+
+
+def remove(comp, value):
+    """Composition with one card removed
+    Args:
+        comp: composition
+        value: card value, 1 for an ace
+    Returns new composition
+    """
+    return comp[:value - 1] + (comp[value - 1] - 1,) + comp[value:]
+
+
+def same_rank_chance(value, comp):
+    """Chance two cards of a value are of one rank
+    Args:
+        value: card value, 1 for an ace
+        comp: composition the two cards are drawn from
+    Returns 1 but for ten valued cards, whose ranks are taken as equally many
+    """
+    if value != 10:
+        return 1.0
+    tens = comp[9]
+    return (tens / TEN_RANKS - 1) / (tens - 1)
+
+
+def total(hard, soft):
+    """Best total of a hand
+    Args:
+        hard: total counting aces as 1
+        soft: hand holds an ace
+    Returns total counting one ace as 11 where it does not bust
+    """
+    return hard + 10 if soft and hard <= 11 else hard
+
+
+@lru_cache(maxsize=DEALER_CACHE_SIZE)
+def dealer_draws(hard, soft, comp, hit_soft_17=False):
+    """Distribution of dealer final totals from a partial hand
+    Args:
+        hard: dealer total counting aces as 1
+        soft: dealer holds an ace
+        comp: composition left to draw from
+        hit_soft_17: dealer hits soft 17
+    Returns probabilities of 17 through 21 and bust
+    """
+    value = total(hard, soft)
+    if value > 21:
+        return (0.0,) * BUST + (1.0,)
+    if value > 17 or (value == 17 and not (hit_soft_17 and soft and hard <= 7)):
+        probs = [0.0] * (BUST + 1)
+        probs[value - 17] = 1.0
+        return tuple(probs)
+
+    probs = [0.0] * (BUST + 1)
+    n_cards = sum(comp)
+    for value, count in enumerate(comp, 1):
+        if count:
+            chance = count / n_cards
+            drawn = dealer_draws(hard + value, soft or value == 1, remove(comp, value),
+                                 hit_soft_17)
+            for i in range(BUST + 1):
+                probs[i] += chance * drawn[i]
+    return tuple(probs)
+
+
+@lru_cache(maxsize=DEALER_CACHE_SIZE)
+def dealer_probabilities(upcard, comp, hit_soft_17=False):
+    """Distribution of dealer final totals given no dealer blackjack
+    Args:
+        upcard: dealer upcard value, 1 for an ace
+        comp: composition left after the upcard is removed
+        hit_soft_17: dealer hits soft 17
+    Returns probabilities of 17 through 21 and bust
+    """
+    excluded = {1: 10, 10: 1}.get(upcard)
+    n_cards = sum(comp) - (comp[excluded - 1] if excluded else 0)
+    probs = [0.0] * (BUST + 1)
+    for value, count in enumerate(comp, 1):
+        if count and value != excluded:
+            chance = count / n_cards
+            drawn = dealer_draws(upcard + value, upcard == 1 or value == 1,
+                                 remove(comp, value), hit_soft_17)
+            for i in range(BUST + 1):
+                probs[i] += chance * drawn[i]
+    return tuple(probs)
+
+
+def dealer_blackjack_chance(upcard, comp):
+    """Chance the hole card makes a dealer blackjack
+    Args:
+        upcard: dealer upcard value, 1 for an ace
+        comp: composition left after the upcard is removed
+    Returns probability of a dealer blackjack
+    """
+    if upcard == 1:
+        return comp[9] / sum(comp)
+    if upcard == 10:
+        return comp[0] / sum(comp)
+    return 0.0
+
+
+def stand_ev(value, dealer):
+    """Expected value of standing
+    Args:
+        value: player total
+        dealer: dealer final total distribution
+    Returns expected value per unit bet
+    """
+    if value > 21:
+        return -1.0
+    ev = dealer[BUST]
+    for i, outcome in enumerate(OUTCOMES):
+        if value > outcome:
+            ev += dealer[i]
+        elif value < outcome:
+            ev -= dealer[i]
+    return ev
+
+
+class ExactCalculator():
+    """Exact expected values for a shoe and strategy
+    Args:
+        num_decks: number of decks in the shoe
+        table: compiled strategy table to follow, play optimally if None
+        rules: optional rules.Rules, DEFAULT_RULES if not given
+        first_table: compiled table of first decisions with surrenders merged
+            in, see strategy.load_surrender, table if not given
+    """
+
+    def __init__(self, num_decks, table=None, rules=None, first_table=None):
+        rules = rules or DEFAULT_RULES
+        self.shoe = shoe_composition(num_decks)
+        self.table = table
+        self.first_table = first_table if first_table is not None and rules.surrender else table
+        self.hit_soft_17 = rules.hit_soft_17
+        self.blackjack_payout = rules.blackjack_payout
+        self.double_after_split = rules.double_after_split
+        self.surrender = rules.surrender
+        self.can_split = rules.max_hands > 1
+        self.dealer = None
+        self.upcard = None
+        self.memo = {}
+
+    def decide(self, hard, soft, two_cards, pair, upcard, table=None):
+        """Strategy table action for a hand
+        Args:
+            hard: total counting aces as 1
+            soft: hand holds an ace
+            two_cards: hand holds two cards
+            pair: value of a splittable pair, None otherwise
+            upcard: dealer upcard value, 1 for an ace
+            table: compiled table to look up, the strategy table if not given
+        Returns action code
+        """
+        if table is None:
+            table = self.table
+        up = 11 if upcard == 1 else upcard
+        if pair:
+            return table[table_index(PAIRS, 11 if pair == 1 else pair, up)]
+        # A,A that may not be split plays on its total, as in BasicStrategy
+        if two_cards and soft and hard > 2:
+            return table[table_index(SOFT, hard - 1, up)]
+        return table[table_index(HARD, total(hard, soft), up)]
+
+    def hand_ev(self, hard, soft, two_cards, split, comp):
+        """Expected value of playing a hand on from its current cards
+        Args:
+            hard: total counting aces as 1
+            soft: hand holds an ace
+            two_cards: hand holds two cards, so may double
+            split: hand came from a split
+            comp: composition left to draw from
+        Returns expected value per unit of the original bet
+        """
+        value = total(hard, soft)
+        if value > 21:
+            return -1.0
+        key = (hard, soft, two_cards, split, comp)
+        if key in self.memo:
+            return self.memo[key]
+
+        if self.table is None:
+            ev = max(self.action_evs(hard, soft, two_cards, split, comp).values())
+        else:
+            action = self.decide(hard, soft, two_cards, None, self.upcard)
+            ev = self.policy_ev(action, hard, soft, two_cards, split, comp)
+        self.memo[key] = ev
+        return ev
+
+    def policy_ev(self, action, hard, soft, two_cards, split, comp):
+        """Expected value of taking an action from the strategy table
+        Doubles after the first two cards are hits, as in BasicStrategy
+        Args:
+            action: action code
+            hard, soft, two_cards, split, comp: hand state, see hand_ev
+        Returns expected value per unit of the original bet
+        """
+        if action == STAND_CODE:
+            return stand_ev(total(hard, soft), self.dealer)
+        if action == DOUBLE_CODE and two_cards and (self.double_after_split or not split):
+            return self.double_ev(hard, soft, comp)
+        return self.hit_ev(hard, soft, split, comp)
+
+    def hit_ev(self, hard, soft, split, comp):
+        """Expected value of hitting then playing on
+        Args:
+            hard, soft, split, comp: hand state, see hand_ev
+        Returns expected value per unit of the original bet
+        """
+        n_cards = sum(comp)
+        ev = 0.0
+        for value, count in enumerate(comp, 1):
+            if count:
+                ev += count / n_cards * self.hand_ev(hard + value, soft or value == 1, False,
+                                                     split, remove(comp, value))
+        return ev
+
+    def double_ev(self, hard, soft, comp):
+        """Expected value of doubling, one card for twice the bet
+        Args:
+            hard, soft, comp: hand state, see hand_ev
+        Returns expected value per unit of the original bet
+        """
+        n_cards = sum(comp)
+        ev = 0.0
+        for value, count in enumerate(comp, 1):
+            if count:
+                ev += count / n_cards * stand_ev(total(hard + value, soft or value == 1),
+                                                 self.dealer)
+        return 2 * ev
+
+    def action_evs(self, hard, soft, two_cards, split, comp):
+        """Expected value of each action available to a hand
+        Args:
+            hard, soft, two_cards, split, comp: hand state, see hand_ev
+        Returns dict of action code to expected value
+        """
+        evs = {STAND_CODE: stand_ev(total(hard, soft), self.dealer)}
+        if total(hard, soft) == 21:
+            return evs
+        evs[HIT_CODE] = self.hit_ev(hard, soft, split, comp)
+        if two_cards and (self.double_after_split or not split):
+            evs[DOUBLE_CODE] = self.double_ev(hard, soft, comp)
+        return evs
+
+    def split_ev(self, value, comp):
+        """Expected value of splitting a pair, both hands together
+        Args:
+            value: value of the paired card
+            comp: composition left after the initial cards
+        Returns expected value per unit of the original bet
+        """
+        n_cards = sum(comp)
+        ev = 0.0
+        for drawn, count in enumerate(comp, 1):
+            if count:
+                chance = count / n_cards
+                hard, soft = value + drawn, value == 1 or drawn == 1
+                if value == 1:  # Split aces take one card
+                    ev += chance * stand_ev(total(hard, soft), self.dealer)
+                else:
+                    ev += chance * self.hand_ev(hard, soft, True, True, remove(comp, drawn))
+        return 2 * ev
+
+    def deal(self, first, second, upcard):
+        """Set up dealer state for an initial hand
+        Args:
+            first: first player card value
+            second: second player card value
+            upcard: dealer upcard value
+        Returns composition left after the initial cards
+        """
+        comp = remove(remove(remove(self.shoe, first), second), upcard)
+        self.upcard = upcard
+        self.dealer = dealer_probabilities(upcard, comp, self.hit_soft_17)
+        self.memo = {}
+        return comp
+
+    def initial_evs(self, first, second, upcard, pair=True):
+        """Expected value of each action for an initial hand given no dealer blackjack
+        Args:
+            first: first player card value, 1 for an ace
+            second: second player card value
+            upcard: dealer upcard value
+            pair: cards of equal value are of one rank, False for ten valued
+                cards of different ranks, which may not be split
+        Returns dict of action code to expected value
+        """
+        comp = self.deal(first, second, upcard)
+        evs = self.action_evs(first + second, first == 1 or second == 1, True, False, comp)
+        if first == second and pair and self.can_split:
+            evs[SPLIT_CODE] = self.split_ev(first, comp)
+        if self.surrender:
+            evs[SURRENDER_CODE] = -0.5
+        return evs
+
+    def initial_ev(self, first, second, upcard, pair=True):
+        """Expected value of an initial hand, including naturals
+        Args:
+            first: first player card value, 1 for an ace
+            second: second player card value
+            upcard: dealer upcard value
+            pair: cards of equal value are of one rank, see initial_evs
+        Returns expected value per unit bet
+        """
+        comp = remove(remove(remove(self.shoe, first), second), upcard)
+        dealer_bj = dealer_blackjack_chance(upcard, comp)
+        if {first, second} == {1, 10}:
+            return self.blackjack_payout * (1 - dealer_bj)
+
+        if self.table is None:
+            ev = max(self.initial_evs(first, second, upcard, pair).values())
+        else:
+            comp = self.deal(first, second, upcard)
+            hard, soft = first + second, first == 1 or second == 1
+            split = first == second and pair and self.can_split
+            action = self.decide(hard, soft, True, first if split else None, upcard,
+                                 self.first_table)
+            if action == SURRENDER_CODE:
+                ev = -0.5
+            elif action == SPLIT_CODE:
+                ev = self.split_ev(first, comp)
+            else:
+                ev = self.policy_ev(action, hard, soft, True, False, comp)
+        return -dealer_bj + (1 - dealer_bj) * ev
+
+    def pair_weighted_ev(self, first, second, upcard):
+        """Expected value of an initial hand over the ranks its cards may have
+        Args:
+            first, second, upcard: card values, see initial_ev
+        Returns expected value per unit bet
+        """
+        same = same_rank_chance(first, self.shoe) if first == second else 1.0
+        ev = same * self.initial_ev(first, second, upcard)
+        if same < 1.0:
+            ev += (1 - same) * self.initial_ev(first, second, upcard, pair=False)
+        return ev
+
+    def expected_value(self):
+        """Expected value per round over all initial deals
+        Returns player expected value per unit bet, the house edge is its negative
+        """
+        n_cards = sum(self.shoe)
+        counts = list(self.shoe)
+        ev = 0.0
+        cache = {}
+        for first in range(1, 11):
+            p_first = counts[first - 1] / n_cards
+            counts[first - 1] -= 1
+            for second in range(1, 11):
+                p_second = counts[second - 1] / (n_cards - 1)
+                counts[second - 1] -= 1
+                for upcard in range(1, 11):
+                    chance = p_first * p_second * counts[upcard - 1] / (n_cards - 2)
+                    if chance:
+                        key = (min(first, second), max(first, second), upcard)
+                        if key not in cache:
+                            cache[key] = self.pair_weighted_ev(*key)
+                        ev += chance * cache[key]
+                counts[second - 1] += 1
+            counts[first - 1] += 1
+        return ev
+
+
+def main():
+    """Print exact expected value of a strategy"""
+    parser = argparse.ArgumentParser(description="Exact expected value of a strategy")
+    parser.add_argument("num_decks", type=int, help="Number of decks to use")
+    parser.add_argument("strategy", type=str, nargs="?", default=None,
+                        help="Strategy file to follow, optimal play if omitted")
+    add_rule_arguments(parser)
+    args = parser.parse_args()
+    try:
+        rules = rules_from_args(args)
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+    table = load_strategy(args.strategy)[1] if args.strategy else None
+    first_table = load_surrender(args.strategy) if args.strategy else None
+    ev = ExactCalculator(args.num_decks, table, rules, first_table).expected_value()
+    print("Expected value per hand: {0:.4f}%".format(ev * 100))
+    print("House edge: {0:.4f}%".format(-ev * 100))
+
+
+if __name__ == '__main__':
+    main()
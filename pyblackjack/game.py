@@ -2,9 +2,11 @@
 import logging
 from .hand import Hand
 from .strategy import DealerStrategy
+from .rules import DEFAULT_RULES
 
 WIN = 1
 LOSS = 0
+TIE = 2
 
 
 class Game():
@@ -12,31 +14,92 @@ class Game():
     Args:
         deck: finalized deck to use
         player_strategy: strategy for player to inject, "basic", "basic_alt", or "simple"
+        tracer: optional RoundTracer recording each round played
+        bet_spread: optional counting.BetSpread sizing each bet, default_bet if not given
+        rules: optional rules.Rules of the dealer and payouts, DEFAULT_RULES if not
+            given, the player strategy is built with its own rules
+    A game can be replayed round after round with play_round, which
+    recycles its hands, counters and strategy state
     """
 
-    def __init__(self, deck, player_strategy):
+    __slots__ = ("deck", "player_strategy", "dealer_strategy", "default_bet", "game_info",
+                 "hand_earnings", "player_hand", "dealer_hand", "debug", "tracer",
+                 "round_start", "round_bet", "bet_spread", "blackjack_payout", "insurance",
+                 "pending_insurance")
+
+    def __init__(self, deck, player_strategy, tracer=None, bet_spread=None, rules=None):
+        rules = rules or DEFAULT_RULES
         self.deck = deck
         self.player_strategy = player_strategy
-        self.dealer_strategy = DealerStrategy(self.deck)
+        self.dealer_strategy = DealerStrategy(self.deck, rules)
+        self.blackjack_payout = rules.blackjack_payout
+        self.insurance = rules.insurance
         self.default_bet = 5.0
         self.game_info = {"wins": 0, "ties": 0, "losses": 0, "earnings": 0.0}
-        self.has_split = False
+        self.hand_earnings = []
+        self.player_hand = Hand()
+        self.dealer_hand = Hand()
+        # Checked once, hand reprs are only built when debug output is on
+        self.debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        self.tracer = tracer
+        self.round_start = 0
+        self.round_bet = self.default_bet
+        self.bet_spread = bet_spread
+        # Insurance result still to be added to the first hand settled
+        self.pending_insurance = 0.0
+        if tracer is not None:
+            player_strategy.actions = []
+
+    def reset(self):
+        """Clear hands, results and strategy state for a new round
+        """
+        game_info = self.game_info
+        game_info["wins"] = game_info["ties"] = game_info["losses"] = 0
+        game_info["earnings"] = 0.0
+        self.hand_earnings.clear()
+        self.pending_insurance = 0.0
+        self.player_hand.clear()
+        self.dealer_hand.clear()
+        self.player_strategy.reset()
 
-    def calculate_earnings(self, player_hand, result, dealer_bust):
+    def calculate_earnings(self, player_hand, result, natural=False):
         """Return earnings
-        Payouts are 3-2 for standard casino rules if player has an "natural" win
+        A natural win pays the blackjack payout of the rules, 3-2 by default,
+        a surrendered hand loses half its bet and other hands win or lose their bet
         Args:
             player_hand: player hand
             result: result of hand
-            dealer_bust: did dealer bust
+            natural: hand is a blackjack dealt to the player
         Returns earnings payout
         """
-        if any(c.value in ['A', 'J', 'Q', 'K'] for c in player_hand.cards) \
-                and result == WIN \
-                and dealer_bust is False:
-            return player_hand.bet * 1.5
+        if player_hand.surrendered:
+            return player_hand.bet * 0.5
+        if natural and result == WIN:
+            return player_hand.bet * self.blackjack_payout
         return player_hand.bet
 
+    def record(self, player_hand, result, natural=False):
+        """Record result of a settled hand
+        The first hand settled in a round carries any insurance result, so
+        hand earnings add up to the round's earnings
+        Args:
+            player_hand: player hand
+            result: WIN, LOSS or TIE
+            natural: hand is a blackjack dealt to the player
+        """
+        if result == WIN:
+            self.game_info["wins"] += 1
+            earnings = self.calculate_earnings(player_hand, WIN, natural)
+        elif result == LOSS:
+            self.game_info["losses"] += 1
+            earnings = -self.calculate_earnings(player_hand, LOSS)
+        else:
+            self.game_info["ties"] += 1
+            earnings = 0.0
+        self.game_info["earnings"] += earnings
+        self.hand_earnings.append(earnings + self.pending_insurance)
+        self.pending_insurance = 0.0
+
     def calculate_results(self, player_hand, dealer_hand):
         """Calculate result of game with specific hands
         Args:
@@ -48,75 +111,98 @@ class Game():
         # Re-calculate decks to ensure latest
         self.dealer_strategy.deck = self.deck
         self.player_strategy.deck = self.deck
-        logging.debug("Player initial hand: %s", str(player_hand.cards))
-        logging.debug("Dealer initial hand: %s", str(dealer_hand.cards))
-
-        player_has_blackjack, dealer_has_blackjack = Game.check_inital_blackjack(
-            player_hand, dealer_hand)
+        if self.debug:
+            logging.debug("Player initial hand: %s", str(player_hand.cards))
+            logging.debug("Dealer initial hand: %s", str(dealer_hand.cards))
 
-        if player_has_blackjack or dealer_has_blackjack:
-            if player_has_blackjack and dealer_has_blackjack:
-                self.game_info["ties"] += 1
-                return
-            if player_has_blackjack:
-                self.game_info["wins"] += 1
-                self.game_info["earnings"] += self.calculate_earnings(
-                    player_hand, WIN, False)
-                return
-            if dealer_has_blackjack:
-                self.game_info["losses"] += 1
-                self.game_info["earnings"] -= self.calculate_earnings(
-                    player_hand, LOSS, False)
-                return
-        self.player_strategy.play(player_hand, dealer_hand)
-        logging.debug("Player post-strat hand: %s", str(player_hand.cards))
-        # Allow split once, cannot split after first split house rules
-        if len(self.player_strategy.split_hands) > 0 and not self.has_split:
-            self.has_split = True
-            for s_hand in self.player_strategy.split_hands:
-                logging.debug("Player post-strat split hand: %s",
-                              str(s_hand.cards))
-                # Reset game info and continue splitting
-                self.game_info["ties"] = 0
-                self.game_info["wins"] = 0
-                self.game_info["losses"] = 0
-                self.game_info["earnings"] = 0
-                self.calculate_results(s_hand, dealer_hand)
-        if Game.check_bust(player_hand):
-            self.game_info["losses"] += 1
-            self.game_info["earnings"] -= self.calculate_earnings(
-                player_hand, LOSS, False)
+        if self.settle_blackjack(player_hand, dealer_hand):
             return
+        hands = self.player_strategy.play(player_hand, dealer_hand)
+        if self.debug:
+            for hand in hands:
+                logging.debug("Player post-strat hand: %s", str(hand.cards))
 
-        self.dealer_strategy.play(dealer_hand)
-        logging.debug("Dealer post-strat hand: %s", str(dealer_hand.cards))
-        if Game.check_bust(dealer_hand):
-            self.game_info["wins"] += 1
-            self.game_info["earnings"] += self.calculate_earnings(
-                player_hand, WIN, True)
-            return
+        # Dealer plays once for all hands, not at all if every hand busted or surrendered
+        for hand in hands:
+            if not (Game.check_bust(hand) or hand.surrendered):
+                self.dealer_strategy.play(dealer_hand)
+                if self.debug:
+                    logging.debug("Dealer post-strat hand: %s", str(dealer_hand.cards))
+                break
+        for hand in hands:
+            self.settle(hand, dealer_hand)
 
-        if player_hand.get_value() == dealer_hand.get_value():
-            self.game_info["ties"] += 1
-            return
-        if player_hand.get_value() > dealer_hand.get_value():
-            self.game_info["wins"] += 1
-            self.game_info["earnings"] += self.calculate_earnings(
-                player_hand, WIN, False)
-            return
+    def settle(self, player_hand, dealer_hand):
+        """Record result of a played hand against the dealer's finished hand
+        Args:
+            player_hand: player hand after play
+            dealer_hand: dealer hand after play
+        """
+        if Game.check_bust(player_hand) or player_hand.surrendered:
+            self.record(player_hand, LOSS)
+        elif Game.check_bust(dealer_hand):
+            self.record(player_hand, WIN)
+        elif player_hand.value == dealer_hand.value:
+            self.record(player_hand, TIE)
+        elif player_hand.value > dealer_hand.value:
+            self.record(player_hand, WIN)
+        else:
+            self.record(player_hand, LOSS)
 
-        self.game_info["losses"] += 1
-        self.game_info["earnings"] -= self.calculate_earnings(
-            player_hand, LOSS, False)
-        return
+    def settle_blackjack(self, player_hand, dealer_hand):
+        """Record result if player or dealer was dealt blackjack
+        Args:
+            player_hand: initial player hand
+            dealer_hand: initial dealer hand
+        Returns whether the hand was settled
+        """
+        player_has_blackjack, dealer_has_blackjack = Game.check_inital_blackjack(
+            player_hand, dealer_hand)
+        if self.insurance and dealer_hand.cards[1].is_ace:
+            self.settle_insurance(player_hand, dealer_hand, dealer_has_blackjack)
+        if player_has_blackjack and dealer_has_blackjack:
+            self.record(player_hand, TIE)
+        elif player_has_blackjack:
+            self.record(player_hand, WIN, True)
+        elif dealer_has_blackjack:
+            self.record(player_hand, LOSS)
+        else:
+            return False
+        return True
+
+    def settle_insurance(self, player_hand, dealer_hand, dealer_has_blackjack):
+        """Offer insurance against a dealer ace and add its result to the earnings
+        Insurance costs half the bet and pays 2-1 on a dealer blackjack, its
+        result is also added to the first hand settled, see record
+        Args:
+            player_hand: initial player hand
+            dealer_hand: initial dealer hand
+            dealer_has_blackjack: dealer hole card makes a blackjack
+        """
+        if self.player_strategy.insure(dealer_hand):
+            insurance = player_hand.bet * 0.5
+            self.pending_insurance = 2 * insurance if dealer_has_blackjack else -insurance
+            self.game_info["earnings"] += self.pending_insurance
+
+    def next_bet(self):
+        """Size bet of the next round before its cards are seen
+        Returns bet from the bet spread, default_bet without one
+        """
+        return self.bet_spread.bet() if self.bet_spread is not None else self.default_bet
 
     def play(self):
         """Play a game
-        Returns game obj with stats
+        Results are in game_info
         """
-        # Initialize hands
-        self.player_hand = Hand()
-        self.dealer_hand = Hand()
+        self.play_round()
+
+    def play_round(self):
+        """Reset and play a round with the current deck
+        Results are in game_info
+        """
+        self.reset()
+        self.round_start = self.deck.pos
+        bet = self.round_bet = self.next_bet()
 
         # Deal initial cards
         for _ in range(2):
@@ -124,9 +210,11 @@ class Game():
             self.dealer_hand.add_card(self.deck.deal())
 
         # Intialize default bets
-        self.player_hand.add_bet(self.default_bet)
+        self.player_hand.add_bet(bet)
 
         self.calculate_results(self.player_hand, self.dealer_hand)
+        if self.tracer is not None:
+            self.tracer.record(self)
 
     @staticmethod
     def check_blackjack(hand):
@@ -134,7 +222,7 @@ class Game():
         Args:
             hand: hand to check
         """
-        return bool(hand.get_value() == 21)
+        return hand.value == 21
 
     @staticmethod
     def check_inital_blackjack(player_hand, dealer_hand):
@@ -157,7 +245,7 @@ class Game():
         Args:
             hand: hand to check
         """
-        return bool(hand.get_value() > 21)
+        return hand.value > 21
 
     def display_results(self):
         """Print results of game
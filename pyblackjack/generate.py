@@ -0,0 +1,154 @@
+"""Module for generating strategy tables
+
+Derives the best action for every cell of a strategy table from exact
+expected values (see exact module) and writes it in the schema read by
+BasicStrategy. Hard totals are decided on the two card hands making up
+the total, weighted by how likely each is from the shoe. When pairs
+can't be split they play on their total, so A,A counts among the hands
+of hard 12. Tables are generated for any house rules, with a Surrender
+section of the hard totals to surrender when the rules allow it.
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from .exact import ExactCalculator, remove
+from .rules import DEFAULT_RULES, add_rule_arguments, rules_from_args
+from .strategy import ACTIONS, CATEGORIES, UPCARDS, SPLIT_CODE, SURRENDER_CODE
+
+
+def best_action(evs):
+    """Action with highest expected value
+    Args:
+        evs: dict of action code to expected value
+    Returns action string
+    """
+    return ACTIONS[max(sorted(evs), key=evs.get)]
+
+
+def hard_combos(hard_total):
+    """Two card hands without aces making up a hard total
+    Args:
+        hard_total: player total
+    Returns list of card value pairs
+    """
+    return [(a, hard_total - a) for a in range(2, 11)
+            if a <= hard_total - a <= 10]
+
+
+def combo_chance(comp, first, second):
+    """Chance of being dealt a two card hand in either order
+    Args:
+        comp: composition dealt from
+        first: first card value, 1 for an ace
+        second: second card value
+    Returns probability
+    """
+    n_cards = sum(comp)
+    orders = 1 if first == second else 2
+    return (orders * comp[first - 1] * (comp[second - 1] - (first == second))
+            / (n_cards * (n_cards - 1)))
+
+
+def upcard_column(num_decks, upcard, rules=None):
+    """Best actions against one dealer upcard
+    Args:
+        num_decks: number of decks in the shoe
+        upcard: dealer upcard, 2 through 11 for an ace
+        rules: optional rules.Rules, DEFAULT_RULES if not given
+    Returns dict of JSON section to dict of player key to action, and
+    under "Surrender" the hard totals to surrender
+    """
+    calculator = ExactCalculator(num_decks, rules=rules or DEFAULT_RULES)
+    up = 1 if upcard == 11 else upcard
+    column = {"Pairs": {}, "Ace": {}, "Other": {}, "Surrender": []}
+    for key in CATEGORIES[0][2]:
+        card = 1 if key == 11 else key
+        evs = calculator.initial_evs(card, card, up)
+        evs.pop(SURRENDER_CODE, None)
+        column["Pairs"][key] = best_action(evs)
+    for key in CATEGORIES[1][2]:
+        evs = calculator.initial_evs(1, key, up)
+        evs.pop(SURRENDER_CODE, None)
+        column["Ace"][key] = best_action(evs)
+
+    comp = remove(calculator.shoe, up)
+    for key in CATEGORIES[2][2]:
+        combos = hard_combos(key)
+        if key == 12 and not calculator.can_split:
+            combos.append((1, 1))
+        weighted, weights = {}, 0.0
+        for first, second in combos:
+            chance = combo_chance(comp, first, second)
+            evs = calculator.initial_evs(first, second, up)
+            evs.pop(SPLIT_CODE, None)
+            for action, ev in evs.items():
+                weighted[action] = weighted.get(action, 0.0) + chance * ev
+            weights += chance
+        if not weights:
+            column["Other"][key] = ACTIONS[0]
+            continue
+        if best_action(weighted) == ACTIONS[SURRENDER_CODE]:
+            column["Surrender"].append(key)
+        weighted.pop(SURRENDER_CODE, None)
+        column["Other"][key] = best_action(weighted)
+    return column
+
+
+def generate_strategy(num_decks, rules=None, workers=1):
+    """Generate a strategy table
+    Args:
+        num_decks: number of decks in the shoe
+        rules: optional rules.Rules, DEFAULT_RULES if not given
+        workers: processes to spread upcards over
+    Returns strategy dict in the BasicStrategy JSON schema, with a
+    Surrender section if the rules allow surrender
+    """
+    rules = rules or DEFAULT_RULES
+    args = [(num_decks, upcard, rules) for upcard in UPCARDS]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            columns = list(executor.map(upcard_column, *zip(*args)))
+    else:
+        columns = [upcard_column(*arg) for arg in args]
+
+    table = {}
+    for name, _, keys in CATEGORIES:
+        table[name] = {}
+        for key in keys:
+            row = {str(upcard): column[name][key] for upcard, column in zip(UPCARDS, columns)}
+            uniform = set(row.values())
+            table[name][str(key)] = uniform.pop() if len(uniform) == 1 else row
+    strategy = {"BasicStrategy": table}
+    if rules.surrender:
+        strategy["Surrender"] = {
+            str(key): [upcard for upcard, column in zip(UPCARDS, columns)
+                       if key in column["Surrender"]]
+            for key in CATEGORIES[2][2] if any(key in column["Surrender"] for column in columns)}
+    return strategy
+
+
+def main():
+    """Write generated strategy JSON"""
+    parser = argparse.ArgumentParser(description="Generate a strategy table")
+    parser.add_argument("num_decks", type=int, help="Number of decks to use")
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        help="File to write, stdout if omitted")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes to spread dealer upcards over")
+    add_rule_arguments(parser)
+    args = parser.parse_args()
+    try:
+        rules = rules_from_args(args)
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+    strategy = generate_strategy(args.num_decks, rules, args.workers)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(strategy, output, indent=2)
+    else:
+        json.dump(strategy, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,12 +3,27 @@
 
 class Hand():
     """Basic hand of gameplay
+    Totals are kept up to date as cards are added
     """
 
+    __slots__ = ("cards", "value", "hard_value", "aces", "is_soft", "bet", "surrendered")
+
     def __init__(self):
         self.cards = []
         self.value = 0
+        self.hard_value = 0
+        self.aces = 0
+        self.is_soft = False
+        self.bet = 0.0
+        self.surrendered = False
+
+    def clear(self):
+        """Empty hand for reuse
+        """
+        self.cards.clear()
+        self.value, self.hard_value, self.aces, self.is_soft = 0, 0, 0, False
         self.bet = 0.0
+        self.surrendered = False
 
     def __str__(self):
         return "".join([card.__str__() for card in self.cards])
@@ -19,6 +34,13 @@ class Hand():
             card: card to add
         """
         self.cards.append(card)
+        if card.is_ace:
+            self.aces += 1
+            self.hard_value += 1
+        else:
+            self.hard_value += card.points
+        self.is_soft = self.aces > 0 and self.hard_value <= 11
+        self.value = self.hard_value + 10 if self.is_soft else self.hard_value
 
     def add_bet(self, bet):
         """Add bet amount to given hand
@@ -27,27 +49,28 @@ class Hand():
         """
         self.bet = bet
 
+    @property
+    def is_pair(self):
+        """Two cards of the same rank"""
+        return len(self.cards) == 2 and self.cards[0].value == self.cards[1].value
+
+    @property
+    def is_blackjack(self):
+        """Two card 21"""
+        return len(self.cards) == 2 and self.value == 21
+
     def calculate_value(self):
-        """Calculate value of the hand
+        """Recalculate value of the hand from its cards
         """
-        self.value = 0
-        has_ace = False
-        for card in self.cards:
-            if card.value.isnumeric():
-                self.value += int(card.value)
-            else:
-                if card.value == "A":
-                    has_ace = True
-                    self.value += 11
-                else:
-                    self.value += 10
-
-        if has_ace and self.value > 21:
-            self.value -= 10
+        cards = list(self.cards)
+        bet = self.bet
+        self.clear()
+        self.bet = bet
+        for card in cards:
+            self.add_card(card)
 
     def get_value(self):
-        """Calculate value of hand
+        """Get value of hand
         Returns numeric value of hand
         """
-        self.calculate_value()
         return self.value
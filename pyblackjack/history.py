@@ -0,0 +1,210 @@
+"""Module for binary hand histories
+
+A history file is a short header followed by fixed size records, one per
+round, holding the shoe from the first card of the round on, the
+decisions taken, the initial bet and the result. Files are written a
+record at a time while playing and read back memory mapped as a NumPy
+structured array.
+
+Replaying a history plays another strategy against the same card
+sequences and bets, so the difference between two strategies is
+measured on paired rounds instead of independent ones. Cards past the
+cut card are recorded too, so a replayed strategy may draw more cards
+than the recorded one. A replayed round drawing past the recorded cards
+is skipped and counted.
+"""
+import argparse
+import os
+import struct
+from .deck import CARDS
+from .game import Game
+from .rules import add_rule_arguments, rules_from_args
+from .stats import RunningStats, Z_95
+from .strategy import ACTIONS
+
+MAGIC = b"PBJH"
+# Version 2 records the initial bet of a round rather than the total wagered
+VERSION = 2
+HEADER = struct.Struct("<4sHH")
+
+# Cards kept from the start of each round, enough for a split with several hits
+# whether or not the cut card comes first
+LOOKAHEAD = 32
+MAX_ACTIONS = 16
+NO_CARD = -1
+NO_ACTION = 255
+
+# Fixed record layout, kept in step with RECORD_DTYPE
+RECORD = struct.Struct("<{0}bB{1}BBdd3B".format(LOOKAHEAD, MAX_ACTIONS))
+RECORD_DTYPE = [("cards", "i1", (LOOKAHEAD,)), ("n_cards", "u1"),
+                ("actions", "u1", (MAX_ACTIONS,)), ("n_actions", "u1"),
+                ("bet", "<f8"), ("earnings", "<f8"),
+                ("wins", "u1"), ("ties", "u1"), ("losses", "u1")]
+
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+
+class RecordExhausted(Exception):
+    """A replayed round drew past the cards recorded for it"""
+
+
+class HistoryRecorder():
+    """Append a binary record per played round
+    Passed to Game as its tracer
+    Args:
+        path: history file, header is written if the file is new
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rounds = 0
+        self.output = open(path, "ab")
+        if self.output.tell() == 0:
+            self.output.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, game):
+        """Write record of the round game just played
+        Args:
+            game: game after play_round
+        """
+        deck, start = game.deck, game.round_start
+        stop = min(start + LOOKAHEAD, len(deck.codes))
+        cards = list(deck.codes[start:stop])
+        cards += [NO_CARD] * (LOOKAHEAD - len(cards))
+        strategy = game.player_strategy
+        actions = [ACTION_CODES[action] for action in strategy.actions[:MAX_ACTIONS]]
+        n_actions = len(actions)
+        actions += [NO_ACTION] * (MAX_ACTIONS - n_actions)
+        info = game.game_info
+        self.output.write(RECORD.pack(*cards, deck.pos - start, *actions, n_actions,
+                                      game.round_bet, info["earnings"],
+                                      info["wins"], info["ties"], info["losses"]))
+        self.rounds += 1
+
+    def close(self):
+        """Flush and close history file"""
+        self.output.close()
+
+
+def read_history(path):
+    """Memory map a history file
+    Args:
+        path: history file
+    Returns read-only NumPy structured array of records
+    """
+    import numpy as np
+    with open(path, "rb") as history:
+        header = history.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError("{0} is not a hand history".format(path))
+    magic, version, size = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+        raise ValueError("{0} is not a version {1} hand history".format(path, VERSION))
+    dtype = np.dtype(RECORD_DTYPE)
+    if os.path.getsize(path) == HEADER.size:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size)
+
+
+class ReplayDeck():
+    """Deck dealing the recorded cards of one round at a time
+    Dealing past the recorded cards raises RecordExhausted
+    """
+
+    def __init__(self):
+        self.codes = []
+        self.pos = 0
+        self.counter = None
+
+    def __len__(self):
+        return len(self.codes) - self.pos
+
+    def load(self, cards):
+        """Deal from a recorded round next
+        Args:
+            cards: card codes of the round, padded with NO_CARD
+        """
+        self.codes = [code for code in cards if code != NO_CARD]
+        self.pos = 0
+
+    def deal(self):
+        """
+        Gets next recorded card
+        Returns card, raises RecordExhausted once recorded cards run out
+        """
+        if self.pos >= len(self.codes):
+            raise RecordExhausted("round drew past its {0} recorded cards".format(
+                len(self.codes)))
+        self.pos += 1
+        return CARDS[self.codes[self.pos - 1]]
+
+
+def replay(paths, player_strategy, rules=None):
+    """Play a strategy against recorded rounds
+    Each round is bet as recorded, so rounds bet on a count are paired too
+    Args:
+        paths: history files
+        player_strategy: strategy instance to replay with
+        rules: optional rules.Rules of the dealer and payouts, DEFAULT_RULES if not given
+    Returns dict of RunningStats for recorded and replayed earnings per
+    round and their paired difference (replayed - recorded), over the
+    rounds replayed in full, and the number of rounds skipped for drawing
+    past their recorded cards
+    """
+    results = {"recorded": RunningStats(), "replayed": RunningStats(),
+               "difference": RunningStats(), "skipped": 0}
+    deck = ReplayDeck()
+    game = Game(deck, player_strategy, rules=rules)
+    for path in paths:
+        history = read_history(path)
+        for cards, bet, recorded in zip(history["cards"].tolist(), history["bet"].tolist(),
+                                        history["earnings"].tolist()):
+            deck.load(cards)
+            game.default_bet = bet
+            try:
+                game.play_round()
+            except RecordExhausted:
+                results["skipped"] += 1
+                continue
+            replayed = game.game_info["earnings"]
+            results["recorded"].add(recorded)
+            results["replayed"].add(replayed)
+            results["difference"].add(replayed - recorded)
+    return results
+
+
+def main():
+    """Print paired comparison of a strategy against recorded rounds"""
+    from .runner import get_strategy
+    parser = argparse.ArgumentParser(description="Replay hand histories with another strategy")
+    parser.add_argument("strategy", type=str, help="Strategy to replay with")
+    parser.add_argument("histories", type=str, nargs="+", help="History files to replay")
+    add_rule_arguments(parser)
+    args = parser.parse_args()
+    try:
+        rules = rules_from_args(args)
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+    results = replay(args.histories, get_strategy(args.strategy, rules), rules)
+    recorded, replayed = results["recorded"], results["replayed"]
+    difference = results["difference"]
+    print("Rounds: {0}".format(difference.count))
+    if results["skipped"]:
+        print("Skipped rounds drawing past the recorded cards: {0}".format(results["skipped"]))
+    print("Recorded earnings per game: {0:.4f} +/- {1:.4f}".format(
+        recorded.mean, Z_95 * recorded.stderr))
+    print("Replayed earnings per game: {0:.4f} +/- {1:.4f}".format(
+        replayed.mean, Z_95 * replayed.stderr))
+    low, high = difference.confidence_interval()
+    print("Paired difference per game: {0:.4f} [{1:.4f}, {2:.4f}]".format(
+        difference.mean, low, high))
+
+
+if __name__ == '__main__':
+    main()
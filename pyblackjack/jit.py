@@ -0,0 +1,346 @@
+"""Module for the compiled round kernel
+
+Plays rounds one after another as the object engine does, but over
+integer arrays: a shoe of rank indices, hands as hard totals, ace and card
+counts, and the strategy compiled into its flat action table. With numba
+installed the kernel is compiled with njit, otherwise the same function
+runs interpreted, a little slower than the object engine, and results
+never depend on whether numba is available.
+
+The random bits of a few hundred shuffles and cuts are drawn with NumPy
+at a time and the kernel shuffles the shoe with them, so a seed gives the
+same rounds compiled or not. The shoe array is padded past its last card
+with enough cards for any round, so the kernel reshuffles only on the cut
+card and never reads past the array.
+"""
+import numpy as np
+from .batch import POINTS, HAND_CARDS, load_table, summarize
+from .rules import DEFAULT_RULES
+from .runner import check_penetration, MIN_ROUND_CARDS
+from .stats import RunningStats
+from .strategy import (PAIRS, SOFT, HARD, TABLE_KEYS, TABLE_UPCARDS, STAND_CODE, HIT_CODE,
+                       DOUBLE_CODE, SPLIT_CODE, SURRENDER_CODE)
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+JIT_AVAILABLE = njit is not None
+
+# Shuffles drawn per refill of the kernel
+SHOES_PER_REFILL = 256
+# Rounds the kernel plays between publishes to a board
+RUN_STEP = 100000
+
+
+def jit(func):
+    """Compile a kernel with numba when available
+    Args:
+        func: function over scalars and NumPy arrays
+    Returns compiled dispatcher, its py_func is the interpreted kernel, or
+    func itself without numba
+    """
+    if njit is None:
+        return func
+    return njit(cache=True, nogil=True)(func)
+
+
+@jit
+def shuffle(cards, bits):
+    """Fisher-Yates shuffle in place
+    Args:
+        cards: cards to shuffle
+        bits: uint32 random bits, one per card but the first
+    """
+    for i in range(len(cards) - 1, 0, -1):
+        j = (int(bits[i - 1]) * (i + 1)) >> 32
+        cards[i], cards[j] = cards[j], cards[i]
+
+
+@jit
+def play_rounds(cards, shuffles, ends, pads, state, num_rounds, table, first_table, max_hands,
+                resplit_aces, double_after_split, hit_soft_17, blackjack_payout, shuffle_cards,
+                bet, points, round_earnings, round_upcards, hand_earnings, totals):
+    """Play rounds from a shoe reshuffled with pre-drawn random bits
+    Args:
+        cards: int8 rank indices of the shoe followed by its padding, shuffled in place
+        shuffles: uint32 random bits of each shuffle, one per card of the shoe but the first
+        ends: cut card position of each shuffle
+        pads: int8 rank indices of the padding after each shuffle
+        state: int64 next shuffle, next card and cut card position, updated in place
+        num_rounds: rounds to play
+        table: flat int8 action table, see strategy.table_index
+        first_table: flat action table of the first decision of a dealt hand
+        max_hands, resplit_aces, double_after_split, hit_soft_17, blackjack_payout:
+            resolved house rules
+        shuffle_cards: reshuffle with fewer cards than this left before the cut
+        bet: bet of each round
+        points: hard points of each rank index, aces as 1
+        round_earnings: earnings of each round, filled from index 0
+        round_upcards: dealer upcard value of each round, filled from index 0
+        hand_earnings: earnings of each hand, filled from index totals[3]
+        totals: int64 wins, ties, losses and hands so far, updated in place
+    Returns rounds played, fewer than num_rounds once the shuffles run out
+    """
+    n_shuffles = shuffles.shape[0]
+    # Arrays are not bounds checked here. A round starts before the cut card,
+    # and the padding holds more cards than any round can draw past the shoe
+    n_cards = cards.shape[0] - pads.shape[1]
+    hard = np.zeros(max_hands, dtype=np.int64)
+    aces = np.zeros(max_hands, dtype=np.int64)
+    bets = np.zeros(max_hands, dtype=np.float64)
+    surrendered = np.zeros(max_hands, dtype=np.bool_)
+    stack_first = np.zeros(max_hands, dtype=np.int64)
+    stack_second = np.zeros(max_hands, dtype=np.int64)
+    next_shuffle, pos, end = state[0], state[1], state[2]
+    for index in range(num_rounds):
+        if end - pos < shuffle_cards or end - pos < MIN_ROUND_CARDS:
+            if next_shuffle == n_shuffles:
+                state[0], state[1], state[2] = next_shuffle, pos, end
+                return index
+            shuffle(cards[:n_cards], shuffles[next_shuffle])
+            cards[n_cards:] = pads[next_shuffle]
+            pos, end = 0, ends[next_shuffle]
+            next_shuffle += 1
+        p_1, d_1, p_2, d_2 = cards[pos], cards[pos + 1], cards[pos + 2], cards[pos + 3]
+        pos += 4
+        upcard = 11 if d_2 == 0 else points[d_2]
+        round_upcards[index] = upcard
+        d_hard = points[d_1] + points[d_2]
+        d_aces = int(d_1 == 0) + int(d_2 == 0)
+        player_bj = int(p_1 == 0) + int(p_2 == 0) == 1 and points[p_1] + points[p_2] == 11
+        dealer_bj = d_aces == 1 and d_hard == 11
+        earnings = 0.0
+        if player_bj or dealer_bj:
+            if player_bj and dealer_bj:
+                totals[1] += 1
+                hand_earnings[totals[3]] = 0.0
+            elif player_bj:
+                totals[0] += 1
+                earnings = bet * blackjack_payout
+                hand_earnings[totals[3]] = earnings
+            else:
+                totals[2] += 1
+                earnings = -bet
+                hand_earnings[totals[3]] = earnings
+            totals[3] += 1
+            round_earnings[index] = earnings
+            continue
+
+        # Hands still to play, last pushed played first as in BasicStrategy.play
+        stack_first[0], stack_second[0] = p_1, p_2
+        n_stack = 1
+        n_done = 0
+        num_hands = 1
+        decision_table = first_table
+        while n_stack > 0:
+            n_stack -= 1
+            first, second = stack_first[n_stack], stack_second[n_stack]
+            h_hard = points[first] + points[second]
+            h_aces = int(first == 0) + int(second == 0)
+            h_cards = 2
+            h_bet = bet
+            h_surrendered = False
+            can_split = first == second and num_hands < max_hands and \
+                (num_hands == 1 or first != 0 or resplit_aces)
+            split = False
+            if num_hands > 1 and first == 0 and not can_split:
+                playing = False  # split aces take a single card
+            else:
+                playing = True
+            while playing:
+                value = h_hard + 10 if h_aces > 0 and h_hard <= 11 else h_hard
+                if value > 21:
+                    break
+                if can_split:
+                    key = (PAIRS * TABLE_KEYS + (11 if first == 0 else points[first])) \
+                        * TABLE_UPCARDS + upcard
+                elif h_cards == 2 and h_aces > 0 and first != second:
+                    key = (SOFT * TABLE_KEYS + h_hard - 1) * TABLE_UPCARDS + upcard
+                else:
+                    key = (HARD * TABLE_KEYS + value) * TABLE_UPCARDS + upcard
+                code = decision_table[key]
+                decision_table = table
+                if code == STAND_CODE:
+                    playing = False
+                elif code == HIT_CODE:
+                    card = cards[pos]
+                    pos += 1
+                    h_hard += points[card]
+                    h_aces += int(card == 0)
+                    h_cards += 1
+                elif code == SPLIT_CODE:
+                    if can_split:
+                        # Both hands take their second card now, second pushed first
+                        num_hands += 1
+                        stack_first[n_stack], stack_second[n_stack] = \
+                            second, cards[pos + 1]
+                        stack_first[n_stack + 1], stack_second[n_stack + 1] = \
+                            first, cards[pos]
+                        n_stack += 2
+                        pos += 2
+                        split = True
+                    playing = False
+                elif code == DOUBLE_CODE:
+                    card = cards[pos]
+                    pos += 1
+                    h_hard += points[card]
+                    h_aces += int(card == 0)
+                    if h_cards == 2 and (num_hands == 1 or double_after_split):
+                        h_bet *= 2
+                        playing = False
+                    h_cards += 1
+                elif code == SURRENDER_CODE:
+                    h_surrendered = True
+                    playing = False
+                can_split = False
+            if not split:
+                hard[n_done], aces[n_done] = h_hard, h_aces
+                bets[n_done], surrendered[n_done] = h_bet, h_surrendered
+                n_done += 1
+
+        # Dealer draws once if any hand still stands
+        standing = False
+        for hand in range(n_done):
+            value = hard[hand] + 10 if aces[hand] > 0 and hard[hand] <= 11 else hard[hand]
+            if value <= 21 and not surrendered[hand]:
+                standing = True
+        d_value = d_hard + 10 if d_aces > 0 and d_hard <= 11 else d_hard
+        if standing:
+            while d_value < 17 or (hit_soft_17 and d_value == 17 and d_aces > 0 and d_hard == 7):
+                card = cards[pos]
+                pos += 1
+                d_hard += points[card]
+                d_aces += int(card == 0)
+                d_value = d_hard + 10 if d_aces > 0 and d_hard <= 11 else d_hard
+
+        for hand in range(n_done):
+            value = hard[hand] + 10 if aces[hand] > 0 and hard[hand] <= 11 else hard[hand]
+            if surrendered[hand]:
+                totals[2] += 1
+                result = -0.5 * bets[hand]
+            elif value > 21 or (d_value <= 21 and value < d_value):
+                totals[2] += 1
+                result = -bets[hand]
+            elif d_value <= 21 and value == d_value:
+                totals[1] += 1
+                result = 0.0
+            else:
+                totals[0] += 1
+                result = bets[hand]
+            hand_earnings[totals[3]] = result
+            totals[3] += 1
+            earnings += result
+        round_earnings[index] = earnings
+    state[0], state[1], state[2] = next_shuffle, pos, end
+    return num_rounds
+
+
+class JitSimulator():
+    """Simulator playing rounds in the compiled kernel
+    Args:
+        num_decks: number of decks per shoe
+        shuffle_perc: at percentage remaining, reshuffle shoe
+        strategy: player strategy name or JSON file
+        seed: optional seed for the random generator
+        rules: optional rules.Rules, DEFAULT_RULES if not given. Insurance is
+            never taken without a count
+    """
+
+    def __init__(self, num_decks, shuffle_perc, strategy, seed=None, rules=None):
+        rules = rules or DEFAULT_RULES
+        check_penetration(num_decks, rules)
+        self.num_decks = num_decks
+        self.table = load_table(strategy).ravel()
+        self.first_table = load_table(strategy, surrender=rules.surrender).ravel()
+        self.rules = rules
+        self.penetration = rules.penetration
+        # A fixed cut card is the only reshuffle point
+        shuffle_perc = shuffle_perc if rules.penetration is None else 0.0
+        self.shuffle_cards = shuffle_perc * 52 * num_decks
+        self.rng = np.random.default_rng(seed)
+        self.bet = 5.0
+        self.points = POINTS.astype(np.int64)
+        self.n_cards = 52 * num_decks
+        # Padding of a hand's worth of cards for each player hand and the dealer's
+        self.cards = np.zeros(self.n_cards + HAND_CARDS * (rules.max_hands + 1), dtype=np.int8)
+        self.cards[:self.n_cards] = np.tile(np.arange(13, dtype=np.int8), 4 * num_decks)
+        self.shuffles, self.ends, self.pads = self.draw_shuffles()
+        # No cards before the first cut, the first round shuffles
+        self.state = np.zeros(3, dtype=np.int64)
+
+    def draw_shuffles(self):
+        """Draw the random bits, cuts and padding of the next refill
+        Returns random bits, cut card position and padding of each shuffle,
+        padding deals as from a fresh shoe rather than repeating dealt cards
+        """
+        n_cards = self.n_cards
+        shuffles = self.rng.integers(2 ** 32, size=(SHOES_PER_REFILL, n_cards - 1),
+                                     dtype=np.uint32)
+        if self.penetration is not None:
+            ends = np.full(SHOES_PER_REFILL, round(n_cards * self.penetration), dtype=np.int64)
+        else:
+            ends = self.rng.integers(round(n_cards * 0.7), round(n_cards * 0.9), endpoint=True,
+                                     size=SHOES_PER_REFILL)
+        pads = self.rng.integers(13, size=(SHOES_PER_REFILL, len(self.cards) - n_cards),
+                                 dtype=np.int8)
+        return shuffles, ends, pads
+
+    def play(self, num_rounds):
+        """Play rounds, refilling shuffles as the kernel runs out
+        Args:
+            num_rounds: rounds to play
+        Returns round earnings, dealer upcards, hand earnings and wins, ties,
+        losses and hands
+        """
+        rules = self.rules
+        round_earnings = np.empty(num_rounds)
+        round_upcards = np.empty(num_rounds, dtype=np.int8)
+        hand_earnings = np.empty(num_rounds * rules.max_hands)
+        totals = np.zeros(4, dtype=np.int64)
+        done = 0
+        while done < num_rounds:
+            done += play_rounds(
+                self.cards, self.shuffles, self.ends, self.pads, self.state, num_rounds - done,
+                self.table, self.first_table, rules.max_hands, rules.resplit_aces,
+                rules.double_after_split, rules.hit_soft_17, rules.blackjack_payout,
+                self.shuffle_cards, self.bet, self.points, round_earnings[done:],
+                round_upcards[done:], hand_earnings, totals)
+            if self.state[0] == SHOES_PER_REFILL:
+                self.shuffles, self.ends, self.pads = self.draw_shuffles()
+                self.state[0] = 0
+        return round_earnings, round_upcards, hand_earnings[:totals[3]], totals
+
+    def run(self, num_rounds, board=None):
+        """Simulate rounds
+        Args:
+            num_rounds: total number of rounds to play
+            board: optional board.BoardRow to publish every RUN_STEP rounds to
+        Returns dict of ties, wins, losses, earnings, num_hands and
+        round and hand earnings stats
+        """
+        info = {"ties": 0, "wins": 0, "losses": 0, "earnings": 0.0, "num_hands": 0,
+                "round_stats": RunningStats(), "hand_stats": RunningStats()}
+        while num_rounds > 0:
+            k = min(num_rounds, RUN_STEP)
+            round_earnings, round_upcards, hand_earnings, totals = self.play(k)
+            info["wins"] += int(totals[0])
+            info["ties"] += int(totals[1])
+            info["losses"] += int(totals[2])
+            info["earnings"] += float(round_earnings.sum())
+            info["num_hands"] += int(totals[3])
+            info["round_stats"].merge(summarize(round_earnings))
+            info["hand_stats"].merge(summarize(hand_earnings))
+            if board is not None:
+                board.add_rounds(round_upcards, round_earnings)
+                board.publish(info)
+            num_rounds -= k
+        return info
+
+    def round_earnings(self, num_rounds):
+        """Simulate rounds keeping the earnings of each
+        Args:
+            num_rounds: total number of rounds to play
+        Returns float array of round earnings in play order
+        """
+        return self.play(num_rounds)[0]
@@ -0,0 +1,321 @@
+"""Module for round outcome distributions
+
+A configuration's round outcomes (net units won per round, -2, -1, 0, 1,
+1.5, ...) take only a handful of values, so a histogram of them is a
+compact stand-in for the rounds themselves. Histograms are cached on disk
+per configuration like sweep cells, topped up when more rounds are asked
+for, and sampled with NumPy to draw millions of synthetic rounds for
+bankroll and variance studies without playing them again.
+
+When the shoe is counted the histogram is split by the true count at the
+start of each round, giving the correlation of outcomes with the count
+and the distribution at any count.
+"""
+import argparse
+import json
+import math
+import os
+import numpy as np
+from .counting import SYSTEMS, parse_ramp
+from .game import Game
+from .rules import Rules, DEFAULT_RULES, add_rule_arguments, rules_from_args
+from .runner import (new_shoe, new_counting, get_strategy, needs_shuffle, reshuffle, chunk_seed,
+                     split_chunks, check_penetration)
+from .sweep import config_key, positive_int, shuffle_perc, DEFAULT_CACHE_DIR
+
+# True counts are bucketed by floor and clipped to this magnitude
+MAX_TRUE_COUNT = 10
+
+# Rounds simulated per seeded chunk when filling a histogram
+OUTCOME_CHUNK_SIZE = 100000
+
+
+def round_outcomes(num_rounds, num_decks, shuffle_perc, strategy, engine="vector", seed=None,
+                   rules=None, count=None, spread=None):
+    """Simulate round outcomes
+    Args:
+        num_rounds: rounds to simulate
+        num_decks: number of decks to use
+        shuffle_perc: at percentage used, reshuffle deck
+        strategy: player strategy name
+        engine: "vector", "jit", or "object" to count and spread bets
+        seed: seed for the rounds, fresh system entropy if None
+        rules: optional rules.Rules of the table
+        count: optional counting system, object engine only
+        spread: optional bet ramp on the count, see counting.BetSpread
+    Returns float array of earnings per round in units of the base bet, and
+    int array of the true count bucket each round started at, None without a count
+    """
+    rules = rules or DEFAULT_RULES
+    if engine == "vector":
+        from .batch import BatchSimulator
+        simulator = BatchSimulator(num_decks, shuffle_perc, strategy, seed=seed, rules=rules)
+        return simulator.round_earnings(num_rounds) / simulator.bet, None
+    if engine == "jit":
+        from .jit import JitSimulator
+        simulator = JitSimulator(num_decks, shuffle_perc, strategy, seed=seed, rules=rules)
+        return simulator.round_earnings(num_rounds) / simulator.bet, None
+
+    deck, shuffle_perc = new_shoe(num_decks, shuffle_perc, seed, rules)
+    counter, bet_spread = new_counting(deck, count, spread)
+    game = Game(deck, get_strategy(strategy, rules), bet_spread=bet_spread, rules=rules)
+    unit = bet_spread.unit if bet_spread is not None else game.default_bet
+    outcomes = np.empty(num_rounds)
+    true_counts = np.empty(num_rounds, dtype=np.int64) if counter is not None else None
+    for index in range(num_rounds):
+        if needs_shuffle(deck, num_decks, shuffle_perc):
+            reshuffle(deck)
+        if counter is not None:
+            true_counts[index] = math.floor(counter.true_count)
+        game.play_round()
+        outcomes[index] = game.game_info["earnings"]
+    if true_counts is not None:
+        np.clip(true_counts, -MAX_TRUE_COUNT, MAX_TRUE_COUNT, out=true_counts)
+    return outcomes / unit, true_counts
+
+
+class OutcomeHistogram():
+    """Histogram of round outcomes, optionally split by true count
+    Args:
+        values: distinct outcomes in units, ascending
+        counts: rounds per outcome, shaped (true counts, values), or (1, values)
+            without a count
+        true_counts: true count bucket of each row, None without a count
+    """
+
+    def __init__(self, values, counts, true_counts=None):
+        self.values = np.asarray(values, dtype=float)
+        self.counts = np.asarray(counts, dtype=np.int64).reshape(-1, len(self.values))
+        self.true_counts = None if true_counts is None else np.asarray(true_counts, dtype=np.int64)
+
+    @classmethod
+    def from_outcomes(cls, outcomes, true_counts=None):
+        """Histogram of simulated outcomes
+        Args:
+            outcomes: outcome of each round
+            true_counts: optional true count bucket of each round
+        Returns OutcomeHistogram
+        """
+        values, value_index = np.unique(outcomes, return_inverse=True)
+        if true_counts is None:
+            return cls(values, np.bincount(value_index, minlength=len(values)))
+        buckets, bucket_index = np.unique(true_counts, return_inverse=True)
+        counts = np.bincount(bucket_index * len(values) + value_index,
+                             minlength=len(buckets) * len(values))
+        return cls(values, counts, buckets)
+
+    @property
+    def rounds(self):
+        """Rounds in the histogram"""
+        return int(self.counts.sum())
+
+    @property
+    def marginal(self):
+        """Rounds per outcome over all true counts"""
+        return self.counts.sum(axis=0)
+
+    @property
+    def mean(self):
+        """Expected outcome per round"""
+        return float(self.marginal @ self.values / self.rounds)
+
+    @property
+    def std(self):
+        """Standard deviation of the outcome per round"""
+        mean = self.mean
+        return math.sqrt(float(self.marginal @ (self.values - mean) ** 2 / self.rounds))
+
+    def merge(self, other):
+        """Histogram of the rounds of both histograms
+        Args:
+            other: histogram of the same configuration
+        Returns new OutcomeHistogram
+        """
+        if (self.true_counts is None) != (other.true_counts is None):
+            raise ValueError("Cannot merge counted and uncounted histograms")
+        totals = {}
+        for histogram in (self, other):
+            buckets = histogram.true_counts if histogram.true_counts is not None else [0]
+            for bucket, row in zip(buckets, histogram.counts):
+                for value, rounds in zip(histogram.values, row):
+                    key = (int(bucket), float(value))
+                    totals[key] = totals.get(key, 0) + int(rounds)
+        values = sorted({value for _, value in totals})
+        buckets = sorted({bucket for bucket, _ in totals})
+        counts = [[totals.get((bucket, value), 0) for value in values] for bucket in buckets]
+        return OutcomeHistogram(values, counts, buckets if self.true_counts is not None else None)
+
+    def given_count(self, true_count):
+        """Histogram of the rounds started at a true count
+        Args:
+            true_count: true count bucket, floor of the true count
+        Returns OutcomeHistogram without a count
+        """
+        if self.true_counts is None:
+            raise ValueError("Histogram was not split by true count")
+        rows = self.true_counts == max(-MAX_TRUE_COUNT, min(true_count, MAX_TRUE_COUNT))
+        return OutcomeHistogram(self.values, self.counts[rows].sum(axis=0))
+
+    def ev_by_count(self):
+        """Expected outcome per round at each true count
+        Returns dict of true count bucket to rounds and expected outcome
+        """
+        if self.true_counts is None:
+            return {}
+        rounds = self.counts.sum(axis=1)
+        evs = self.counts @ self.values / np.maximum(rounds, 1)
+        return {int(bucket): (int(n), float(ev))
+                for bucket, n, ev in zip(self.true_counts, rounds, evs)}
+
+    def count_correlation(self):
+        """Pearson correlation of the true count with the round outcome
+        Returns correlation, nan without a count or without spread in either
+        """
+        if self.true_counts is None:
+            return math.nan
+        weights = self.counts / self.rounds
+        counts = self.true_counts.astype(float)[:, None]
+        values = self.values[None, :]
+        count_mean = float((weights * counts).sum())
+        value_mean = float((weights * values).sum())
+        cov = float((weights * (counts - count_mean) * (values - value_mean)).sum())
+        count_var = float((weights * (counts - count_mean) ** 2).sum())
+        value_var = float((weights * (values - value_mean) ** 2).sum())
+        if count_var == 0 or value_var == 0:
+            return math.nan
+        return cov / math.sqrt(count_var * value_var)
+
+    def sample(self, rng, size):
+        """Draw synthetic rounds from the outcome distribution
+        Args:
+            rng: numpy random Generator
+            size: shape of the draws
+        Returns float array of outcomes
+        """
+        cdf = np.cumsum(self.marginal)
+        draws = rng.integers(cdf[-1], size=size)
+        return self.values[np.searchsorted(cdf, draws, side='right')]
+
+    def as_dict(self):
+        """Histogram as JSON compatible dict"""
+        return {"values": self.values.tolist(), "counts": self.counts.tolist(),
+                "true_counts": None if self.true_counts is None else self.true_counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Histogram from as_dict output"""
+        return cls(data["values"], data["counts"], data["true_counts"])
+
+
+def as_histogram(outcomes):
+    """Histogram of outcomes given as a histogram or as round outcomes
+    Args:
+        outcomes: OutcomeHistogram, or outcome of each round
+    Returns OutcomeHistogram, raises ValueError without any rounds
+    """
+    if isinstance(outcomes, OutcomeHistogram):
+        return outcomes
+    if len(outcomes) == 0:
+        raise ValueError("Need round outcomes to resample")
+    return OutcomeHistogram.from_outcomes(np.asarray(outcomes, dtype=float))
+
+
+def outcome_config(num_decks, shuffle_perc, strategy, engine="vector", rules=None, count=None,
+                   spread=None):
+    """Config of an outcome histogram, keys its cache entry
+    Args:
+        num_decks, shuffle_perc, strategy, engine, rules, count, spread: see round_outcomes
+    Returns config dict
+    """
+    return {"num_decks": num_decks, "shuffle_perc": shuffle_perc, "strategy": strategy,
+            "engine": engine, "rules": (rules or DEFAULT_RULES).as_dict(), "count": count,
+            "spread": list(spread) if spread else None, "kind": "outcomes"}
+
+
+def load_histogram(config, num_rounds, seed=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Outcome histogram of a configuration, simulating only what the cache lacks
+    Rounds are simulated in seeded chunks numbered on from the cached ones,
+    so topping up never replays a cached chunk's rounds
+    Args:
+        config: outcome_config of the histogram
+        num_rounds: rounds wanted
+        seed: run seed, each chunk gets its own stream derived from it
+        cache_dir: directory of cached histograms, None to not cache
+    Returns OutcomeHistogram with at least num_rounds rounds
+    """
+    key = config_key(config, seed)
+    path = None
+    histogram, chunks, rounds = None, 0, 0
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, key + ".json")
+        if os.path.exists(path):
+            with open(path) as cached:
+                data = json.load(cached)
+            histogram = OutcomeHistogram.from_dict(data["histogram"])
+            chunks, rounds = data["chunks"], histogram.rounds
+    rules = Rules(**config["rules"])
+    for index, size in enumerate(split_chunks(max(num_rounds - rounds, 0), OUTCOME_CHUNK_SIZE),
+                                 chunks):
+        outcomes, true_counts = round_outcomes(
+            size, config["num_decks"], config["shuffle_perc"], config["strategy"],
+            config["engine"], chunk_seed(key if seed is not None else None, index), rules,
+            config["count"], config["spread"])
+        chunk = OutcomeHistogram.from_outcomes(outcomes, true_counts)
+        histogram = chunk if histogram is None else histogram.merge(chunk)
+        chunks = index + 1
+        if path is not None:
+            with open(path + ".tmp", "w") as cached:
+                json.dump({"config": config, "seed": seed, "chunks": chunks,
+                           "histogram": histogram.as_dict()}, cached)
+            os.replace(path + ".tmp", path)
+    return histogram
+
+
+def main():
+    """Print the outcome distribution of a configuration"""
+    parser = argparse.ArgumentParser(description="Cached distribution of round outcomes")
+    parser.add_argument("num_rounds", type=positive_int, help="Rounds in the histogram")
+    parser.add_argument("num_decks", type=positive_int, help="Number of decks to use")
+    parser.add_argument("shuffle_perc", type=shuffle_perc,
+                        help="Shuffle once less than this fraction of the shoe is left")
+    parser.add_argument("strategy", type=str, help="Player strategy name or strategy JSON file")
+    parser.add_argument("--engine", type=str, default="vector",
+                        choices=["vector", "jit", "object"],
+                        help="Engine simulating rounds, object to count")
+    parser.add_argument("--count", type=str, default=None, choices=list(SYSTEMS),
+                        help="Card counting system to split outcomes by, object engine only")
+    parser.add_argument("--spread", type=parse_ramp, default=None,
+                        help="Bet units per true count when counting, e.g. 1,2,4,8")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible runs")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR,
+                        help="Directory of cached histograms")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the cache")
+    add_rule_arguments(parser)
+    args = parser.parse_args()
+    try:
+        rules = rules_from_args(args)
+        check_penetration(args.num_decks, rules)
+    except (argparse.ArgumentTypeError, ValueError) as error:
+        parser.error(str(error))
+    if args.count and args.engine != "object":
+        parser.error("Counting needs the object engine")
+
+    config = outcome_config(args.num_decks, args.shuffle_perc, args.strategy, args.engine, rules,
+                            args.count, args.spread)
+    histogram = load_histogram(config, args.num_rounds, args.seed,
+                               None if args.no_cache else args.cache_dir)
+    print("Rounds: {0}, EV per round {1:.4f} units, standard deviation {2:.4f}".format(
+        histogram.rounds, histogram.mean, histogram.std))
+    print("{0:>8} {1:>10}".format("outcome", "chance"))
+    for value, rounds in zip(histogram.values, histogram.marginal):
+        print("{0:>8g} {1:>10.6f}".format(value, rounds / histogram.rounds))
+    if histogram.true_counts is not None:
+        print("Correlation with true count: {0:.4f}".format(histogram.count_correlation()))
+        print("{0:>6} {1:>10} {2:>10}".format("count", "rounds", "EV"))
+        for bucket, (rounds, ev) in histogram.ev_by_count().items():
+            print("{0:>6} {1:>10} {2:>10.4f}".format(bucket, rounds, ev))
+
+
+if __name__ == '__main__':
+    main()
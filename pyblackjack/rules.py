@@ -0,0 +1,143 @@
+"""Module for house rules
+
+Rules are read once when games, strategies and engines are built and
+resolved into the code paths they play with, such as the dealer's soft 17
+play or a decision table with surrenders merged in, so no decision looks
+up rules while playing.
+"""
+import argparse
+import json
+
+
+class Rules():
+    """House rules of a table
+    Args:
+        max_hands: most hands a player can hold by splitting
+        resplit_aces: hands split from aces may be split again
+        double_after_split: split hands may double down
+        hit_soft_17: dealer hits soft 17
+        blackjack_payout: payout of a natural per unit bet, 1.5 for 3-2 or 1.2 for 6-5
+        surrender: late surrender of the first two cards for half the bet
+        insurance: insurance offered against a dealer ace, paying 2-1
+        penetration: fraction of the shoe dealt before the cut card, a random
+            cut between 70% and 90% if None
+    """
+
+    __slots__ = ("max_hands", "resplit_aces", "double_after_split", "hit_soft_17",
+                 "blackjack_payout", "surrender", "insurance", "penetration")
+
+    def __init__(self, max_hands=4, resplit_aces=False, double_after_split=True,
+                 hit_soft_17=False, blackjack_payout=1.5, surrender=False, insurance=False,
+                 penetration=None):
+        if max_hands < 1:
+            raise ValueError("max_hands must be at least 1, got {0}".format(max_hands))
+        if blackjack_payout <= 0:
+            raise ValueError("blackjack_payout must be above 0, got {0}".format(blackjack_payout))
+        if penetration is not None and not 0.0 < penetration < 1.0:
+            raise ValueError("penetration must be between 0 and 1, got {0}".format(penetration))
+        self.max_hands = max_hands
+        self.resplit_aces = resplit_aces
+        self.double_after_split = double_after_split
+        self.hit_soft_17 = hit_soft_17
+        self.blackjack_payout = blackjack_payout
+        self.surrender = surrender
+        self.insurance = insurance
+        self.penetration = penetration
+
+    def __repr__(self):
+        return "Rules({0})".format(", ".join(
+            "{0}={1!r}".format(name, getattr(self, name)) for name in self.__slots__))
+
+    def __eq__(self, other):
+        return isinstance(other, Rules) and self.as_dict() == other.as_dict()
+
+    def as_dict(self):
+        """Rules as a plain dict, e.g. to key cached results"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+DEFAULT_RULES = Rules()
+
+
+def load_rules(path):
+    """Load rules from a JSON file of Rules arguments
+    Args:
+        path: rules JSON file, e.g. {"hit_soft_17": true, "blackjack_payout": 1.2}
+    Returns Rules
+    """
+    with open(path) as rules_file:
+        options = json.load(rules_file)
+    unknown = set(options) - set(Rules.__slots__)
+    if unknown:
+        raise ValueError("Unknown rules in {0}: {1}".format(path, ", ".join(sorted(unknown))))
+    return Rules(**options)
+
+
+def add_rule_arguments(parser, grid=False):
+    """Add house rule options to a command line parser
+    Args:
+        parser: argparse.ArgumentParser
+        grid: take several rules files, one per set of rules to sweep, see
+            rules_grid_from_args
+    """
+    group = parser.add_argument_group("house rules")
+    if grid:
+        group.add_argument("--rules", type=str, nargs="+", default=None,
+                           help="JSON files of house rules, one set of rules each to sweep, "
+                           "options below override every one")
+    else:
+        group.add_argument("--rules", type=str, default=None,
+                           help="JSON file of house rules, options below override it")
+    group.add_argument("--h17", dest="hit_soft_17", action="store_const", const=True,
+                       help="Dealer hits soft 17")
+    group.add_argument("--blackjack-payout", type=float, default=None,
+                       help="Payout of a natural, 1.5 for 3-2 or 1.2 for 6-5")
+    group.add_argument("--surrender", action="store_const", const=True,
+                       help="Late surrender allowed")
+    group.add_argument("--insurance", action="store_const", const=True,
+                       help="Insurance offered against a dealer ace")
+    group.add_argument("--no-das", dest="double_after_split", action="store_const", const=False,
+                       help="No doubling after a split")
+    group.add_argument("--max-hands", type=int, default=None,
+                       help="Most hands a player can split to")
+    group.add_argument("--resplit-aces", action="store_const", const=True,
+                       help="Split aces may be split again")
+    group.add_argument("--penetration", type=float, default=None,
+                       help="Fraction of the shoe dealt before the cut card")
+
+
+def rules_from_args(args):
+    """Rules of parsed command line options
+    Args:
+        args: namespace parsed with add_rule_arguments options
+    Returns Rules, raises argparse.ArgumentTypeError if invalid
+    """
+    return apply_rule_options(args.rules, args)
+
+
+def rules_grid_from_args(args):
+    """Rules of each rules file of parsed command line options
+    Args:
+        args: namespace parsed with add_rule_arguments(parser, grid=True) options
+    Returns list of Rules, one per rules file, or the options alone without
+    a rules file, raises argparse.ArgumentTypeError if invalid
+    """
+    return [apply_rule_options(path, args) for path in args.rules or [None]]
+
+
+def apply_rule_options(path, args):
+    """Rules of a rules file with command line options applied over it
+    Args:
+        path: rules JSON file, None for the default rules
+        args: namespace parsed with add_rule_arguments options
+    Returns Rules, raises argparse.ArgumentTypeError if invalid
+    """
+    try:
+        options = load_rules(path).as_dict() if path else {}
+        for name in Rules.__slots__:
+            value = getattr(args, name, None)
+            if value is not None:
+                options[name] = value
+        return Rules(**options)
+    except (OSError, ValueError, TypeError) as error:
+        raise argparse.ArgumentTypeError(str(error))
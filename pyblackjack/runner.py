@@ -0,0 +1,542 @@
+"""Module for running simulations across worker processes"""
+import hashlib
+import itertools
+import multiprocessing
+import os
+import random
+import signal
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .board import ResultBoard, PUBLISH_ROUNDS
+from .game import Game
+from .deck import Deck
+from .stats import RunningStats
+from .trace import RoundTracer
+from .history import HistoryRecorder
+from .counting import Counter, BetSpread
+from .strategy import BasicStrategy, SimpleStrategy
+from .table import Table
+from .rules import DEFAULT_RULES
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Trace formats by file extension
+TRACE_FORMATS = {"jsonl": RoundTracer, "bin": HistoryRecorder}
+
+# Fewest cards to start a round with, fewer could run the shoe dry mid round
+MIN_ROUND_CARDS = 20
+
+# Chunks queued per worker, keeps workers busy without dispatching the whole run up front
+CHUNKS_PER_WORKER = 2
+
+# Row of the run's result board written by a worker process, set by init_worker
+BOARD_ROW = None
+
+
+def new_deck(num_decks, rng=None, penetration=None):
+    """Create new deck and shuffle
+    Args:
+        num_decks: number of decks to use for shuffle
+        rng: optional random.Random for the deck
+        penetration: optional fraction of the shoe to place the cut card at
+    Returns shuffled deck
+    """
+    deck = Deck(num_decks, rng=rng, penetration=penetration)
+    reshuffle(deck)
+    return deck
+
+
+def reshuffle(deck):
+    """Return all cards to deck, shuffle and cut in place
+    Args:
+        deck: deck to reshuffle
+    """
+    deck.reset()
+    deck.shuffle()
+    deck.cut()
+
+
+def needs_shuffle(deck, num_decks, shuffle_perc, seats=1):
+    """Whether the shoe is due a reshuffle before the next round
+    Args:
+        deck: deck in play
+        num_decks: number of decks in the shoe
+        shuffle_perc: at percentage used, reshuffle deck
+        seats: players dealt each round
+    """
+    return len(deck) < MIN_ROUND_CARDS * seats or \
+        (float(len(deck)) / (52 * num_decks)) < shuffle_perc
+
+
+def check_penetration(num_decks, rules, seats=1):
+    """Check a penetration rule leaves a round's worth of cards before the cut
+    Args:
+        num_decks: number of decks in the shoe
+        rules: rules.Rules of the table
+        seats: players dealt each round
+    Raises ValueError if the cut card comes before MIN_ROUND_CARDS per seat
+    """
+    if rules.penetration is None:
+        return
+    cut_point = round(52 * num_decks * rules.penetration)
+    if cut_point < MIN_ROUND_CARDS * seats:
+        raise ValueError("penetration {0} cuts {1} deck(s) at card {2}, {3} seat(s) need "
+                         "at least {4} cards a round".format(rules.penetration, num_decks,
+                                                             cut_point, seats,
+                                                             MIN_ROUND_CARDS * seats))
+
+
+def new_shoe(num_decks, shuffle_perc, seed=None, rules=DEFAULT_RULES, seats=1):
+    """Create shuffled shoe for a batch
+    With a penetration rule the shoe is reshuffled at its cut card and
+    shuffle_perc no longer applies
+    Args:
+        num_decks: number of decks in the shoe
+        shuffle_perc: at percentage used, reshuffle deck
+        seed: seed for the shoe, fresh system entropy if None
+        rules: rules.Rules of the table
+        seats: players dealt each round
+    Returns deck and the shuffle percentage in effect, raises ValueError if
+    the penetration leaves too few cards for a round, see check_penetration
+    """
+    check_penetration(num_decks, rules, seats)
+    deck = new_deck(num_decks, rng=random.Random(seed), penetration=rules.penetration)
+    return deck, shuffle_perc if rules.penetration is None else 0.0
+
+
+def get_strategy(strategy, rules=None):
+    """Generates player strategy to use based on input
+    Args:
+        strategy: user input strategy
+        rules: optional rules.Rules the strategy plays within
+    Returns strategy class
+    """
+    if strategy == "basic_strategy":
+        return BasicStrategy(None, rules=rules)
+    if strategy == "basic_strategy_alt":
+        return BasicStrategy(None, strat_file="basic_strategy_alt", rules=rules)
+    if strategy == "basic_strategy_i18":
+        return BasicStrategy(None, strat_file="basic_strategy_i18", rules=rules)
+    if strategy == "simple":
+        return SimpleStrategy(None, rules=rules)
+    if strategy.endswith(".json"):
+        return BasicStrategy(None, strat_file=strategy, rules=rules)
+
+
+def new_results(seats=1):
+    """Empty simulation results
+    Args:
+        seats: players per table, results of several seats also count
+            "seat_games", a game per seat per table round
+    """
+    results = {"ties": 0, "wins": 0, "losses": 0, "earnings": 0.0, "num_hands": 0,
+               "num_sims": 0, "round_stats": RunningStats(), "hand_stats": RunningStats()}
+    if seats > 1:
+        results["seat_games"] = 0
+    return results
+
+
+def new_comparison(num_strategies):
+    """Empty results of strategies compared on the same shoes
+    Args:
+        num_strategies: number of strategies compared
+    Returns results per strategy and RunningStats of earnings per game
+    of each strategy after the first minus the first
+    """
+    return {"num_sims": 0, "strategies": [new_results() for _ in range(num_strategies)],
+            "differences": [RunningStats() for _ in range(num_strategies - 1)]}
+
+
+def merge_results(total, results):
+    """Add results of a batch into running totals
+    Args:
+        total: results to add to
+        results: batch results
+    Returns total
+    """
+    for key in total:
+        if isinstance(total[key], RunningStats):
+            total[key].merge(results[key])
+        elif isinstance(total[key], list):
+            for part, other in zip(total[key], results[key]):
+                if isinstance(part, RunningStats):
+                    part.merge(other)
+                else:
+                    merge_results(part, other)
+        else:
+            total[key] += results[key]
+    return total
+
+
+def run_stderr(total):
+    """Standard error a run target is checked against
+    Args:
+        total: results so far
+    Returns standard error of earnings per game, or comparing strategies
+    the largest standard error of the paired differences
+    """
+    if "differences" in total:
+        return max((difference.stderr for difference in total["differences"]), default=0.0)
+    return total["round_stats"].stderr
+
+
+def chunk_seed(seed, index):
+    """Derive an independent seed for one chunk of a run
+    Args:
+        seed: run seed, or None for an unseeded run
+        index: chunk index
+    Returns seed for the chunk, None if run is unseeded
+    """
+    if seed is None:
+        return None
+    digest = hashlib.sha256("{0}:{1}".format(seed, index).encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def trace_path(trace_dir, index, trace_format="jsonl"):
+    """Trace file of one chunk
+    Args:
+        trace_dir: directory for trace files, None if not tracing
+        index: chunk index
+        trace_format: "jsonl" or "bin"
+    Returns path of the chunk trace, None if not tracing
+    """
+    if trace_dir is None:
+        return None
+    return os.path.join(trace_dir, "chunk-{0:05d}.{1}".format(index, trace_format))
+
+
+def new_tracer(path):
+    """Open tracer for the format of a trace file
+    Args:
+        path: trace file, ".jsonl" for JSON lines or ".bin" for a binary hand history
+    Returns RoundTracer or HistoryRecorder
+    """
+    return TRACE_FORMATS[os.path.splitext(path)[1][1:]](path)
+
+
+def new_counting(deck, count=None, spread=None):
+    """Attach counter and bet spread to a deck
+    Args:
+        deck: deck to count
+        count: counting system name, None to not count
+        spread: bet ramp in units per count, None to bet flat
+    Returns counter and bet spread, each None if not used
+    """
+    counter = Counter(count, deck) if count is not None else None
+    bet_spread = BetSpread(counter, ramp=spread) if counter is not None and spread else None
+    return counter, bet_spread
+
+
+def simulate(batch_size, num_decks, shuffle_perc, strategy, engine="object", seed=None,
+             trace=None, count=None, spread=None, seats=1, rules=None, board=None):
+    """Run single batch of simulations
+    Args:
+        batch_size: the batch size of games to run
+        num_decks: number of decks to use
+        shuffle_perc: at percentage used, reshuffle deck
+        strategy: player strategy name, or list of names to compare on the same shoes
+        engine: "object", "vector" or "jit", comparisons always use object
+        seed: seed for the batch, fresh system entropy if None
+        trace: optional trace file, ".jsonl" or ".bin", object engine only
+        count: optional counting system, object engine only
+        spread: optional bet ramp on the count, see counting.BetSpread
+        seats: players at the table playing the strategy, object engine only.
+            With several seats a simulation is a table round and results
+            also count a game per seat as "seat_games"
+        rules: optional rules.Rules of the table, DEFAULT_RULES if not given
+        board: optional board.BoardRow to publish progress and earnings by
+            dealer upcard to, single strategy only
+    Returns results of sims
+    """
+    rules = rules or DEFAULT_RULES
+    if isinstance(strategy, (list, tuple)):
+        return compare_strategies(batch_size, num_decks, shuffle_perc, strategy, seed,
+                                  count, spread, rules)
+    if engine == "vector":
+        from .batch import BatchSimulator
+        batch_info = BatchSimulator(num_decks, shuffle_perc, strategy, seed=seed,
+                                    rules=rules).run(batch_size, board)
+        batch_info["num_sims"] = batch_size
+        return batch_info
+    if engine == "jit":
+        from .jit import JitSimulator
+        batch_info = JitSimulator(num_decks, shuffle_perc, strategy, seed=seed,
+                                  rules=rules).run(batch_size, board)
+        batch_info["num_sims"] = batch_size
+        return batch_info
+    if seats > 1:
+        return simulate_table(batch_size, num_decks, shuffle_perc, [strategy] * seats, seed,
+                              count, spread, rules, board)
+
+    deck, shuffle_perc = new_shoe(num_decks, shuffle_perc, seed, rules)
+    player_strategy = get_strategy(strategy, rules)
+    batch_info = new_results()
+    tracer = new_tracer(trace) if trace is not None else None
+    _, bet_spread = new_counting(deck, count, spread)
+    game = Game(deck, player_strategy, tracer, bet_spread, rules)
+    for index in range(0, batch_size):
+        if needs_shuffle(deck, num_decks, shuffle_perc):
+            reshuffle(deck)
+        game.play_round()
+        add_round(batch_info, game)
+        if board is not None:
+            board.add_round(game.dealer_hand.cards[1].points, game.game_info["earnings"])
+            if index % PUBLISH_ROUNDS == 0:
+                board.publish(batch_info)
+    if tracer is not None:
+        tracer.close()
+    batch_info["num_sims"] = batch_size
+    return batch_info
+
+
+def simulate_table(batch_size, num_decks, shuffle_perc, strategies, seed=None,
+                   count=None, spread=None, rules=DEFAULT_RULES, board=None):
+    """Run single batch of table rounds
+    Args:
+        batch_size: the batch size of table rounds to run
+        num_decks: number of decks to use
+        shuffle_perc: at percentage used, reshuffle deck
+        strategies: player strategy name of each seat
+        seed: seed for the batch, fresh system entropy if None
+        count: optional counting system
+        spread: optional bet ramp on the count, see counting.BetSpread
+        rules: rules.Rules of the table
+        board: optional board.BoardRow to publish progress and the average
+            earnings per seat by dealer upcard to
+    Returns results of sims over all seats, num_sims counting table rounds
+    and seat_games a game per seat per round. round_stats holds the
+    average earnings per seat of each table round
+    """
+    deck, shuffle_perc = new_shoe(num_decks, shuffle_perc, seed, rules, len(strategies))
+    _, bet_spread = new_counting(deck, count, spread)
+    table = Table(deck, [get_strategy(strategy, rules) for strategy in strategies],
+                  bet_spread=bet_spread, rules=rules)
+    batch_info = new_results(len(strategies))
+    round_stats = batch_info["round_stats"]
+    for index in range(0, batch_size):
+        if needs_shuffle(deck, num_decks, shuffle_perc, len(strategies)):
+            reshuffle(deck)
+        table.play_round()
+        earnings = 0.0
+        for seat in table.seats:
+            add_round(batch_info, seat, round_stats=False)
+            earnings += seat.game_info["earnings"]
+        # Seats share the dealer hand, their average per round keeps the standard error honest
+        round_stats.add(earnings / len(strategies))
+        if board is not None:
+            board.add_round(table.dealer_hand.cards[1].points, earnings / len(strategies))
+            if index % PUBLISH_ROUNDS == 0:
+                board.publish(batch_info)
+    batch_info["num_sims"] = batch_size
+    batch_info["seat_games"] = batch_size * len(strategies)
+    return batch_info
+
+
+def add_round(batch_info, game, round_stats=True):
+    """Add result of the round a game just played
+    Args:
+        batch_info: results to add to
+        game: game after play_round
+        round_stats: also add round earnings to round_stats
+    """
+    game_info = game.game_info
+    batch_info["ties"] += game_info["ties"]
+    batch_info["wins"] += game_info["wins"]
+    batch_info["losses"] += game_info["losses"]
+    batch_info["earnings"] += game_info["earnings"]
+    batch_info["num_hands"] += game_info["wins"] + game_info["losses"] + game_info["ties"]
+    if round_stats:
+        batch_info["round_stats"].add(game_info["earnings"])
+    hand_stats = batch_info["hand_stats"]
+    for earnings in game.hand_earnings:
+        hand_stats.add(earnings)
+
+
+def compare_strategies(batch_size, num_decks, shuffle_perc, strategies, seed=None,
+                       count=None, spread=None, rules=DEFAULT_RULES, board=None):
+    """Run single batch playing several strategies on the same shoes
+    Every strategy plays each round from the same position in one shared
+    shoe (common random numbers), so differences in earnings are paired.
+    The first strategy is the reference, the shoe moves on by the cards it used.
+    Args:
+        batch_size: the batch size of games to run
+        num_decks: number of decks to use
+        shuffle_perc: at percentage used, reshuffle deck
+        strategies: player strategy names
+        seed: seed for the batch, fresh system entropy if None
+        count: optional counting system
+        spread: optional bet ramp on the count, see counting.BetSpread
+        rules: rules.Rules of the table
+    Returns comparison results of sims, see new_comparison
+    """
+    deck, shuffle_perc = new_shoe(num_decks, shuffle_perc, seed, rules)
+    _, bet_spread = new_counting(deck, count, spread)
+    games = [Game(deck, get_strategy(strategy, rules), bet_spread=bet_spread, rules=rules)
+             for strategy in strategies]
+    batch_info = new_comparison(len(strategies))
+    for _ in range(0, batch_size):
+        if needs_shuffle(deck, num_decks, shuffle_perc):
+            reshuffle(deck)
+        start = deck.pos
+        for game in reversed(games):  # reference last, leaving the shoe where it stopped
+            deck.pos = start
+            game.play_round()
+        reference = games[0].game_info["earnings"]
+        for game, difference in zip(games[1:], batch_info["differences"]):
+            difference.add(game.game_info["earnings"] - reference)
+        for game, info in zip(games, batch_info["strategies"]):
+            add_round(info, game)
+    for info in batch_info["strategies"]:
+        info["num_sims"] = batch_size
+    batch_info["num_sims"] = batch_size
+    return batch_info
+
+
+def split_chunks(num_sims, chunk_size):
+    """Split simulations into chunks
+    Args:
+        num_sims: total simulations
+        chunk_size: largest chunk
+    Returns chunk sizes adding up to exactly num_sims
+    """
+    full, rest = divmod(num_sims, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def merge_in_order(total, finished, next_index):
+    """Merge finished chunks into totals in chunk order
+    Merging in a fixed order keeps floating point sums of seeded runs
+    identical whatever order workers finish in
+    Args:
+        total: results to add to
+        finished: dict of chunk index to results not yet merged
+        next_index: index of the next chunk to merge
+    Returns index of the next chunk still to merge
+    """
+    while next_index in finished:
+        merge_results(total, finished.pop(next_index))
+        next_index += 1
+    return next_index
+
+
+def ignore_interrupt():
+    """Worker initializer, leaves Ctrl-C handling to the parent"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def init_worker(board_name, rows, next_row):
+    """Worker initializer, leaves Ctrl-C to the parent and claims a board row
+    Args:
+        board_name: name of the run's board.ResultBoard
+        rows: rows of the board
+        next_row: shared multiprocessing.Value of the next unclaimed row
+    """
+    global BOARD_ROW
+    ignore_interrupt()
+    with next_row.get_lock():
+        index = next_row.value
+        next_row.value += 1
+    BOARD_ROW = ResultBoard(rows, board_name).row(index)
+
+
+def simulate_chunk(*args, **kwargs):
+    """Run a chunk in a worker, publishing it to the worker's board row
+    Args:
+        args: simulate arguments
+        kwargs: simulate keyword arguments
+    Returns results of the chunk
+    """
+    BOARD_ROW.begin()
+    results = simulate(*args, board=BOARD_ROW, **kwargs)
+    BOARD_ROW.finish(results)
+    return results
+
+
+def run_simulations(num_sims, num_decks, shuffle_perc, strategy, engine="object",
+                    workers=None, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, target_stderr=None,
+                    trace_dir=None, trace_format="jsonl", count=None, spread=None, seats=1,
+                    rules=None, board=None):
+    """Run simulations in chunks pulled by a pool of worker processes
+    Idle workers take the next chunk, so a slow worker only holds up its
+    own chunk. On Ctrl-C queued chunks are cancelled and running ones finish.
+    With a target standard error no more chunks are handed out once the
+    standard error of earnings per game reaches it, num_sims is then an upper bound.
+    Comparing strategies the target applies to the paired differences.
+    Each worker publishes its running totals to its own row of a shared
+    memory board.ResultBoard, which can be read while the run goes.
+    Args:
+        num_sims: total simulations to run
+        num_decks: number of decks to use
+        shuffle_perc: at percentage used, reshuffle deck
+        strategy: player strategy name, or list of names to compare on the same shoes
+        engine: "object", "vector" or "jit"
+        workers: number of worker processes, defaults to cpu count
+        chunk_size: simulations per chunk
+        seed: run seed, each chunk gets its own stream derived from it
+        target_stderr: optional standard error of earnings per game to stop at
+        trace_dir: optional directory to write a round trace per chunk to
+        trace_format: "jsonl" or "bin" trace files
+        count: optional counting system, object engine only
+        spread: optional bet ramp on the count, see counting.BetSpread
+        seats: players per table, num_sims then counts table rounds
+        rules: optional rules.Rules of the table, DEFAULT_RULES if not given
+        board: optional board.ResultBoard of at least workers rows to publish
+            to, one is made for the run if not given
+    Returns results of completed sims and whether the run was interrupted,
+    raises ValueError if the penetration leaves too few cards for a round.
+    Single strategy, single seat results include "upcards", RunningStats of
+    earnings per game by dealer upcard collected on the board
+    """
+    check_penetration(num_decks, rules or DEFAULT_RULES, seats)
+    workers = workers or os.cpu_count()
+    chunks = enumerate(split_chunks(num_sims, chunk_size))
+    if isinstance(strategy, (list, tuple)):
+        total = new_comparison(len(strategy))
+    else:
+        total = new_results(seats)
+    finished = {}
+    next_index = 0
+    interrupted = False
+    run_board = board if board is not None else ResultBoard(workers)
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                       initargs=(run_board.name, run_board.rows,
+                                                 multiprocessing.Value('i', 0)))
+        with executor:
+            pending = {}
+            try:
+                for index, size in chunks:
+                    pending[executor.submit(simulate_chunk, size, num_decks, shuffle_perc,
+                                            strategy, engine, chunk_seed(seed, index),
+                                            trace_path(trace_dir, index, trace_format),
+                                            count, spread, seats, rules)] = index
+                    if len(pending) >= workers * CHUNKS_PER_WORKER:
+                        break
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished[pending.pop(future)] = future.result()
+                    next_index = merge_in_order(total, finished, next_index)
+                    if target_stderr is not None and run_stderr(total) <= target_stderr:
+                        chunks = iter(())
+                    for index, size in itertools.islice(chunks, len(done)):
+                        pending[executor.submit(simulate_chunk, size, num_decks, shuffle_perc,
+                                                strategy, engine, chunk_seed(seed, index),
+                                                trace_path(trace_dir, index, trace_format),
+                                                count, spread, seats, rules)] = index
+            except KeyboardInterrupt:
+                interrupted = True
+                for future in pending:
+                    future.cancel()
+                for future, index in pending.items():
+                    if not future.cancelled():
+                        finished[index] = future.result()
+        for index in sorted(finished):
+            merge_results(total, finished[index])
+        upcards = run_board.totals()["upcards"]
+    finally:
+        if board is None:
+            run_board.close()
+    if upcards:
+        total["upcards"] = upcards
+    return total, interrupted
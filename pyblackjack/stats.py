@@ -0,0 +1,81 @@
+"""Module for streaming statistics"""
+import math
+
+# Two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+
+
+class RunningStats():
+    """Streaming count, mean and variance
+    Values are added one at a time (Welford) and partial results from
+    other workers are merged without revisiting their values
+    Args:
+        count: number of values already summarized
+        mean: mean of those values
+        m2: sum of squared differences from the mean
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def __repr__(self):
+        return "RunningStats(count={0}, mean={1}, m2={2})".format(self.count, self.mean, self.m2)
+
+    def __eq__(self, other):
+        return isinstance(other, RunningStats) and \
+            (self.count, self.mean, self.m2) == (other.count, other.mean, other.m2)
+
+    def add(self, value):
+        """Add single value
+        Args:
+            value: value to add
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Merge summary of other values into this one
+        Args:
+            other: RunningStats to merge
+        Returns self
+        """
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance"""
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stdev(self):
+        """Sample standard deviation"""
+        return math.sqrt(self.variance)
+
+    @property
+    def stderr(self):
+        """Standard error of the mean, infinite until two values are seen"""
+        if self.count < 2:
+            return math.inf
+        return math.sqrt(self.variance / self.count)
+
+    def confidence_interval(self, z=Z_95):
+        """Normal confidence interval of the mean
+        Args:
+            z: normal quantile, 95% by default
+        Returns low and high bounds
+        """
+        margin = z * self.stderr
+        return self.mean - margin, self.mean + margin
@@ -1,13 +1,169 @@
 """Module for strategies"""
 
 import json
+from functools import lru_cache
 import pkg_resources as pkg
 from .hand import Hand
+from .rules import DEFAULT_RULES
 
 STAND = "St"
 SPLIT = "Sp"
 HIT = "H"
 DOUBLE = "D"
+SURRENDER = "Su"
+
+# Compiled tables hold the index of an action in ACTIONS, surrender is only
+# taken from the Surrender section on the first decision of a dealt hand
+ACTIONS = (STAND, HIT, DOUBLE, SPLIT, SURRENDER)
+STAND_CODE, HIT_CODE, DOUBLE_CODE, SPLIT_CODE, SURRENDER_CODE = range(len(ACTIONS))
+
+# Table categories with the JSON section and player keys each must cover
+PAIRS, SOFT, HARD = 0, 1, 2
+CATEGORIES = (("Pairs", PAIRS, range(2, 12)),
+              ("Ace", SOFT, range(2, 11)),
+              ("Other", HARD, range(4, 22)))
+UPCARDS = range(2, 12)
+
+# Dense table layout, [category][player key 0-21][dealer upcard 0-11]
+TABLE_KEYS = 22
+TABLE_UPCARDS = 12
+TABLE_SIZE = len(CATEGORIES) * TABLE_KEYS * TABLE_UPCARDS
+
+
+def table_index(category, key, upcard):
+    """Index of a decision in a compiled table
+    Args:
+        category: PAIRS, SOFT or HARD
+        key: pair card value, soft non-ace value or hard total
+        upcard: dealer upcard value
+    Returns flat table index
+    """
+    return (category * TABLE_KEYS + key) * TABLE_UPCARDS + upcard
+
+
+def compile_strategy(lookup_table):
+    """Compile strategy JSON into a dense decision table
+    Every category, player key and dealer upcard must be present
+    Args:
+        lookup_table: parsed strategy JSON
+    Returns bytes of action codes, see table_index
+    """
+    table = bytearray(TABLE_SIZE)
+    try:
+        sections = lookup_table['BasicStrategy']
+    except (KeyError, TypeError):
+        raise ValueError("Strategy is missing 'BasicStrategy' table")
+    for name, category, keys in CATEGORIES:
+        if name not in sections:
+            raise ValueError("Strategy is missing '{0}' table".format(name))
+        for key in keys:
+            row = sections[name].get(str(key))
+            if row is None:
+                raise ValueError("Strategy '{0}' is missing {1}".format(name, key))
+            for upcard in UPCARDS:
+                action = row if isinstance(row, str) else row.get(str(upcard))
+                if action not in ACTIONS or action == SURRENDER:
+                    raise ValueError("Strategy '{0}' {1} vs {2} has invalid action {3!r}".format(
+                        name, key, upcard, action))
+                table[table_index(category, key, upcard)] = ACTIONS.index(action)
+    return bytes(table)
+
+
+def compile_deviations(lookup_table, table):
+    """Compile count deviations of a strategy JSON
+    Each deviation takes its action at or above a true count index, or
+    below it with "Below", and the table action otherwise
+    Args:
+        lookup_table: parsed strategy JSON
+        table: compiled table of the same strategy
+    Returns tuple indexed like table of (index, code at or above, code below)
+    or None per cell, None if the strategy has no deviations
+    """
+    entries = lookup_table.get('Deviations')
+    if not entries:
+        return None
+    deviations = [None] * TABLE_SIZE
+    sections = {name: (category, keys) for name, category, keys in CATEGORIES}
+    for entry in entries:
+        try:
+            category, keys = sections[entry['Table']]
+            key, upcard, index = entry['Player'], entry['Dealer'], entry['Index']
+            action = entry['Action']
+        except (KeyError, TypeError):
+            raise ValueError("Invalid deviation {0!r}".format(entry))
+        if key not in keys or upcard not in UPCARDS or action not in ACTIONS \
+                or action == SURRENDER:
+            raise ValueError("Invalid deviation {0!r}".format(entry))
+        cell = table_index(category, key, upcard)
+        code = ACTIONS.index(action)
+        if entry.get('Below', False):
+            deviations[cell] = (index, table[cell], code)
+        else:
+            deviations[cell] = (index, code, table[cell])
+    return tuple(deviations)
+
+
+def compile_surrender(lookup_table, table):
+    """Compile the table of first decisions with late surrender
+    The optional Surrender section maps hard totals to the dealer upcards
+    to surrender against, e.g. {"16": [9, 10, 11], "15": [10]}
+    Args:
+        lookup_table: parsed strategy JSON
+        table: compiled table of the same strategy
+    Returns bytes like table with surrender codes merged in, None if the
+    strategy has no Surrender section
+    """
+    section = lookup_table.get('Surrender')
+    if not section:
+        return None
+    first = bytearray(table)
+    keys = CATEGORIES[HARD][2]
+    for key, upcards in section.items():
+        if not key.isdigit() or int(key) not in keys or not isinstance(upcards, list) \
+                or any(upcard not in UPCARDS for upcard in upcards):
+            raise ValueError("Invalid surrender {0!r}: {1!r}".format(key, upcards))
+        for upcard in upcards:
+            first[table_index(HARD, int(key), upcard)] = SURRENDER_CODE
+    return bytes(first)
+
+
+@lru_cache(maxsize=None)
+def load_surrender(strat_file):
+    """Load and compile the first decision table with surrender once per process
+    Args:
+        strat_file: packaged strategy name without extension, or path to a JSON file
+    Returns compiled table, None if the strategy has no Surrender section
+    """
+    lookup_table, table = load_strategy(strat_file)
+    return compile_surrender(lookup_table, table)
+
+
+@lru_cache(maxsize=None)
+def load_deviations(strat_file):
+    """Load and compile count deviations once per process
+    Args:
+        strat_file: packaged strategy name without extension, or path to a JSON file
+    Returns compiled deviations, None if the strategy has none
+    """
+    lookup_table, table = load_strategy(strat_file)
+    return compile_deviations(lookup_table, table)
+
+
+@lru_cache(maxsize=None)
+def load_strategy(strat_file):
+    """Load and compile a strategy once per process
+    Args:
+        strat_file: packaged strategy name without extension, or path to a JSON file
+    Returns parsed strategy JSON and compiled table
+    """
+    if strat_file.endswith('.json'):
+        strategy_path = strat_file
+    else:
+        strategy_path = pkg.resource_filename(
+            'pyblackjack', 'resources/strategies/{0}.json'.format(strat_file))
+    with open(strategy_path, 'r') as resource:
+        lookup_table = json.load(resource)
+    return lookup_table, compile_strategy(lookup_table)
 
 
 class SimpleStrategy():
@@ -17,9 +173,21 @@ class SimpleStrategy():
         deck: deck of cards to deal from
     """
 
-    def __init__(self, deck):
+    def __init__(self, deck, **kwargs):
         self.deck = deck
-        self.split_hands = []
+        self.hands = []
+        self.actions = None  # list of decisions when tracing
+
+    @property
+    def split_hands(self):
+        """Hands split this round, never any"""
+        return []
+
+    def reset(self):
+        """Clear state of previous round"""
+        self.hands.clear()
+        if self.actions is not None:
+            self.actions.clear()
 
     def play(self, hand, dealer_hand):
         """Play strategy
@@ -27,49 +195,105 @@ class SimpleStrategy():
         Args:
             hand: hand to use with strategy
             dealer_hand: shown dealer card to use with strategy
+        Returns list of finished hands, just hand
         """
-        while hand.get_value() < 13 and hand.get_value() <= 21:
-            if hand.get_value() == 12:
-                break
-
+        while hand.value < 12:
+            if self.actions is not None:
+                self.actions.append(HIT)
             hand.add_card(self.deck.deal())
+        if self.actions is not None:
+            self.actions.append(STAND)
+        self.hands.append(hand)
+        return self.hands
+
+    def insure(self, dealer_hand):
+        """Whether to take insurance, never"""
+        return False
 
 
 class BasicStrategy():
     """Basic 21 strategy as noted by experts
+    Split hands are played from an explicit stack of hands within the
+    limits of the house rules. With late surrender allowed the first
+    decision of a dealt hand is looked up in a table with the strategy's
+    surrenders merged in.
     Args:
         deck: deck of cards to deal from
+        strat_file: optional packaged strategy name or JSON path
+        rules: optional rules.Rules, DEFAULT_RULES if not given
     """
 
     def __init__(self, deck, **kwargs):
         self.deck = deck
-        self.split_hands = []
-        self.cont_split = True
-        strat_file = kwargs.get('strat_file', None)
-        strategy_path = 'resources/strategies/{0}.json'.format(
-            strat_file) if strat_file is not None else 'resources/strategies/basic_strategy.json'
-        try:
-            with open(pkg.resource_filename('pyblackjack', strategy_path), 'r') as resource:
-                self.lookup_table = json.load(resource)
-        except Exception as ex:
-            raise ex
+        rules = kwargs.get('rules', None) or DEFAULT_RULES
+        self.rules = rules
+        self.max_hands = rules.max_hands
+        self.resplit_aces = rules.resplit_aces
+        self.double_after_split = rules.double_after_split
+        self.hands = []
+        self.stack = []
+        self.num_hands = 1
+        self.actions = None  # list of decisions when tracing
+        strat_file = kwargs.get('strat_file', None) or 'basic_strategy'
+        self.lookup_table, self.table = load_strategy(strat_file)
+        self.deviations = load_deviations(strat_file)
+        self.first_table = (load_surrender(strat_file) if rules.surrender else None) \
+            or self.table
+        # True count to take insurance at, never without a count
+        self.insurance_index = self.lookup_table.get('Insurance') if rules.insurance else None
+
+    @property
+    def split_hands(self):
+        """Hands split from the dealt hand this round, empty without a split"""
+        return self.hands if self.num_hands > 1 else []
+
+    def reset(self):
+        """Clear split state of previous round"""
+        self.hands.clear()
+        self.stack.clear()
+        self.num_hands = 1
+        if self.actions is not None:
+            self.actions.clear()
 
-    @classmethod
-    def lookup(cls, dict_lookup, dealer_card):
+    def can_split(self, hand):
+        """Whether the rules allow splitting a pair
+        Args:
+            hand: pair to split
+        """
+        if self.num_hands >= self.max_hands:
+            return False
+        return self.num_hands == 1 or not hand.cards[0].is_ace or self.resplit_aces
+
+    def decide(self, hand, upcard, counter=None, hole=None, can_split=True, table=None):
         """Lookup strat based on scenario
         Args:
-            dict_lookup: original dict lookup
-            dealer_card: known card of dealer to compare
-        Returns strat to use (Hit, Stand, Split, Double-Down)
+            hand: hand to decide on
+            upcard: value of known dealer card
+            counter: optional counting.Counter, enables count deviations
+            hole: dealer hole card, left out of the count
+            can_split: pairs may be split, otherwise they are played on their total
+            table: compiled table to look up, the strategy table if not given
+        Returns strat to use (Hit, Stand, Split, Double-Down, Surrender)
         """
-        if isinstance(dict_lookup, str):
-            return dict_lookup
-        for i in dict_lookup.keys():
-            if dealer_card.get_value() == int(i):
-                return dict_lookup[i]
+        if table is None:
+            table = self.table
+        if hand.is_pair and can_split:
+            key = table_index(PAIRS, hand.cards[0].points, upcard)
+        elif len(hand.cards) == 2 and hand.aces and not hand.is_pair:
+            key = table_index(SOFT, hand.hard_value - 1, upcard)
+        else:
+            key = table_index(HARD, hand.value, upcard)
+        code = table[key]
+        if counter is not None and code != SURRENDER_CODE:
+            deviation = self.deviations[key]
+            if deviation is not None:
+                index, above, below = deviation
+                return ACTIONS[above if counter.hidden_true_count(hole) >= index else below]
+        return ACTIONS[code]
 
     def play_hand(self, strat, hand, dealer_hand):
         """Play hand based on strat input
+        Split hands are pushed on the stack of hands still to play
         Args:
             strat: user input decided on strategy
             hand: hand to play/modify
@@ -82,27 +306,21 @@ class BasicStrategy():
             hand.add_card(self.deck.deal())
             return True
         if strat == SPLIT:  # Split
-            if len(self.split_hands) > 0:  # Cannot split further after single split
+            if not (hand.is_pair and self.can_split(hand)):
                 return False
-            if hand.cards[0].value == "A" and hand.cards[1].value == "A":
-                self.cont_split = False
-            hand_1 = Hand()
-            hand_2 = Hand()
-            hand_1.add_card(hand.cards[0])
-            hand_2.add_card(hand.cards[1])
-
-            hand_1.add_card(self.deck.deal())
-            hand_2.add_card(self.deck.deal())
-
-            hand_1.bet = hand.bet
-            hand_2.bet = hand.bet
-
-            self.split_hands.append(hand_1)
-            self.split_hands.append(hand_2)
-
-            return True
+            self.num_hands += 1
+            split = []
+            for card in hand.cards:
+                s_hand = Hand()
+                s_hand.add_card(card)
+                s_hand.add_card(self.deck.deal())
+                s_hand.bet = hand.bet
+                split.append(s_hand)
+            # Second hand pushed first so the first is played first
+            self.stack.extend(reversed(split))
+            return False
         if strat == DOUBLE:  # Double Down (if first hand)
-            if len(hand.cards) == 2:
+            if len(hand.cards) == 2 and (self.num_hands == 1 or self.double_after_split):
                 if hand.bet:
                     hand.bet = hand.bet * 2
                 hand.add_card(self.deck.deal())
@@ -110,39 +328,56 @@ class BasicStrategy():
 
             hand.add_card(self.deck.deal())
             return True
+        if strat == SURRENDER:  # Surrender, half the bet is lost
+            hand.surrendered = True
+            return False
+
+    def insure(self, dealer_hand):
+        """Whether to take insurance against a dealer ace
+        Taken at or above the strategy's Insurance true count index when
+        the shoe is counted and the rules offer insurance
+        Args:
+            dealer_hand: dealer hand, hole card first
+        """
+        if self.insurance_index is None or self.deck.counter is None:
+            return False
+        return self.deck.counter.hidden_true_count(dealer_hand.cards[0]) >= self.insurance_index
 
     def play(self, hand, dealer_hand):
         """Play strategy
-        Adds cards to hand based on strategy
+        Adds cards to hand, or to the hands split from it, based on strategy
         Args:
             hand: hand to use with strategy
             dealer_hand: shown dealer card to use with strategy
+        Returns list of finished hands, hand itself or the hands split from it
         """
-        is_playing = True
-        while is_playing and hand.get_value() <= 21 and self.cont_split:
-            # Two same cards
-            if len(hand.cards) == 2 and hand.cards[0].value == hand.cards[1].value:
-                tbl = self.lookup_table['BasicStrategy']['Pairs']
-                strat = BasicStrategy.lookup(
-                    tbl[str(hand.cards[0].get_value())], dealer_hand.cards[1])
-                is_playing = self.play_hand(strat, hand, dealer_hand)
-            # Has Ace
-            elif len(hand.cards) == 2 \
-                and (hand.cards[0].value == "A"
-                     or hand.cards[1].value == "A"):
-                tbl = self.lookup_table['BasicStrategy']['Ace']
-                non_ace = hand.cards[0]
-                if hand.cards[0].value == "A":
-                    non_ace = hand.cards[1]
-                strat = BasicStrategy.lookup(
-                    tbl[str(non_ace.get_value())], dealer_hand.cards[1])
-                is_playing = self.play_hand(strat, hand, dealer_hand)
-            # Normal lookup
-            else:
-                tbl = self.lookup_table['BasicStrategy']['Other']
-                hand_value = str(hand.get_value())
-                strat = BasicStrategy.lookup(tbl[hand_value], dealer_hand.cards[1])
+        upcard = dealer_hand.cards[1].points
+        # Deviations apply only when the shoe is counted
+        counter = self.deck.counter if self.deviations is not None else None
+        hole = dealer_hand.cards[0]
+        actions = self.actions
+        # Surrender only as the first decision on the two dealt cards
+        table = self.first_table if len(hand.cards) == 2 else self.table
+        stack = self.stack
+        stack.append(hand)
+        while stack:
+            hand = stack.pop()
+            can_split = hand.is_pair and self.can_split(hand)
+            if self.num_hands > 1 and hand.cards[0].is_ace and not can_split:
+                self.hands.append(hand)  # split aces take a single card
+                continue
+            num_hands = self.num_hands
+            is_playing = True
+            while is_playing and hand.value <= 21:
+                strat = self.decide(hand, upcard, counter, hole, can_split, table)
+                if actions is not None:
+                    actions.append(strat)
                 is_playing = self.play_hand(strat, hand, dealer_hand)
+                can_split = False
+                table = self.table
+            if self.num_hands == num_hands:  # not replaced by split hands
+                self.hands.append(hand)
+        return self.hands
 
 
 class DealerStrategy():
@@ -151,22 +386,33 @@ class DealerStrategy():
     If total is < 17, must hit
     Continue to take cards until total is >= 17
     If ace would bring total to >= 17, must use as 11
+    If the rules hit soft 17, a soft 17 is hit as well
 
     Args:
         deck: deck of cards to deal from
+        rules: optional rules.Rules, DEFAULT_RULES if not given
     """
 
-    def __init__(self, deck):
+    def __init__(self, deck, rules=None):
         self.deck = deck
+        rules = rules or DEFAULT_RULES
+        # Resolved once, play is the method for the table's soft 17 rule
+        self.play = self.play_h17 if rules.hit_soft_17 else self.play_s17
 
-    def play(self, hand):
-        """Play strategy
+    def play_s17(self, hand):
+        """Play strategy standing on all 17s
         Add cards to hand based on strategy
         Args:
             hand: hand to use with strategy
         """
-        while hand.get_value() < 18 and hand.get_value() <= 21:
-            if hand.get_value() == 17:  # Ace handling strategy already implemented in hand method
-                break
+        while hand.value < 17:  # Soft totals already counted by hand
+            hand.add_card(self.deck.deal())
 
+    def play_h17(self, hand):
+        """Play strategy hitting soft 17
+        Add cards to hand based on strategy
+        Args:
+            hand: hand to use with strategy
+        """
+        while hand.value < 17 or (hand.value == 17 and hand.is_soft):
             hand.add_card(self.deck.deal())
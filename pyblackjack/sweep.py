@@ -0,0 +1,312 @@
+"""Module for parameter sweeps
+
+A sweep runs every cell of a grid of configurations (decks, shuffle
+percentage, strategy, engine, house rules) on one shared pool of worker
+processes.
+Accumulated results of each cell are cached on disk under a hash of its
+configuration and the run seed, so a re-run only simulates cells that
+are missing or have fewer simulations than asked for. Topping up a cell
+continues its chunk indices, so new chunks never repeat a cached chunk.
+A seeded top-up matches a fresh run of the larger count only when the
+cached count is a whole number of chunks, a cached partial chunk stays
+partial and shifts the chunks after it.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .runner import (simulate, simulate_chunk, new_results, merge_in_order, split_chunks,
+                     chunk_seed, ignore_interrupt, init_worker, check_penetration, get_strategy,
+                     CHUNKS_PER_WORKER, DEFAULT_CHUNK_SIZE)
+from .board import ResultBoard
+from .stats import RunningStats
+from .rules import Rules, DEFAULT_RULES, add_rule_arguments, rules_grid_from_args
+from .telemetry import add_telemetry_arguments, telemetry_from_args
+
+DEFAULT_CACHE_DIR = ".pyblackjack-cache"
+
+
+def grid(num_decks, shuffle_percs, strategies, engines=("object",), rules=(DEFAULT_RULES,)):
+    """Configurations of every combination of grid values
+    Args:
+        num_decks: deck counts
+        shuffle_percs: shuffle percentages
+        strategies: strategy names
+        engines: simulation engines
+        rules: rules.Rules of the tables to sweep
+    Returns list of config dicts
+    """
+    return [{"num_decks": decks, "shuffle_perc": perc, "strategy": strategy, "engine": engine,
+             "rules": table_rules.as_dict()}
+            for strategy, decks, perc, engine, table_rules
+            in itertools.product(strategies, num_decks, shuffle_percs, engines, rules)]
+
+
+def config_key(config, seed):
+    """Cache key of a cell
+    Strategy files are keyed by their contents as well as their path
+    Args:
+        config: cell config
+        seed: run seed
+    Returns hex digest
+    """
+    keyed = dict(config)
+    if config["strategy"].endswith(".json"):
+        with open(config["strategy"], "rb") as strat_file:
+            keyed["strategy_digest"] = hashlib.sha256(strat_file.read()).hexdigest()
+    text = json.dumps({"config": keyed, "seed": seed}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def dump_results(results):
+    """JSON compatible copy of simulation results"""
+    return {key: vars(value) if isinstance(value, RunningStats) else value
+            for key, value in results.items()}
+
+
+def load_results(data):
+    """Simulation results from dump_results output"""
+    return {key: RunningStats(**value) if isinstance(value, dict) else value
+            for key, value in data.items()}
+
+
+class Cell():
+    """One configuration of a sweep with its cached progress
+    Args:
+        config: cell config
+        seed: run seed
+        cache_dir: directory of cached cells, None to not cache
+    """
+
+    def __init__(self, config, seed, cache_dir):
+        self.config = config
+        self.seed = seed
+        self.key = config_key(config, seed)
+        self.path = None
+        self.results = new_results()
+        self.chunks = 0  # chunks merged into results, the next chunk index to merge
+        if cache_dir is not None:
+            self.path = os.path.join(cache_dir, self.key + ".json")
+            if os.path.exists(self.path):
+                with open(self.path) as cached:
+                    data = json.load(cached)
+                self.results = load_results(data["results"])
+                self.chunks = data["chunks"]
+        self.finished = {}
+
+    def save(self):
+        """Write cell to the cache, replacing the previous copy"""
+        if self.path is None:
+            return
+        data = {"config": self.config, "seed": self.seed, "chunks": self.chunks,
+                "results": dump_results(self.results)}
+        with open(self.path + ".tmp", "w") as cached:
+            json.dump(data, cached)
+        os.replace(self.path + ".tmp", self.path)
+
+    def is_done(self, num_sims, target_stderr=None):
+        """Whether the cell has enough simulations
+        Args:
+            num_sims: simulations wanted
+            target_stderr: optional standard error of earnings per game that is enough
+        """
+        if target_stderr is not None and self.results["round_stats"].stderr <= target_stderr:
+            return True
+        return self.results["num_sims"] >= num_sims
+
+    def pending_chunks(self, num_sims, chunk_size):
+        """Chunks still to run, continuing the chunk indices after the cached ones
+        so no cached chunk is repeated
+        Args:
+            num_sims: simulations wanted
+            chunk_size: largest chunk
+        Returns generator of cell, chunk index and size
+        """
+        missing = max(num_sims - self.results["num_sims"], 0)
+        for index, size in enumerate(split_chunks(missing, chunk_size), self.chunks):
+            yield self, index, size
+
+
+def run_sweep(configs, num_sims, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, seed=None,
+              target_stderr=None, cache_dir=DEFAULT_CACHE_DIR, board=None):
+    """Run every cell of a sweep on one pool of worker processes
+    Chunks of all cells are interleaved so every cell makes progress, and
+    each cell is written to the cache as its chunks are merged. On Ctrl-C
+    queued chunks are cancelled and finished ones are kept in the cache.
+    Args:
+        configs: cell configs, see grid
+        num_sims: simulations per cell
+        workers: number of worker processes, defaults to cpu count
+        chunk_size: simulations per chunk
+        seed: run seed, each chunk of each cell gets its own stream derived from it
+        target_stderr: optional standard error of earnings per game a cell stops at
+        cache_dir: directory to cache cells in, None to not cache
+        board: optional board.ResultBoard of at least workers rows the
+            workers publish their progress over every cell to
+    Returns list of cells and whether the sweep was interrupted
+    """
+    workers = workers or os.cpu_count()
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+    cells = [Cell(config, seed, cache_dir) for config in configs]
+    todo = [cell.pending_chunks(num_sims, chunk_size)
+            for cell in cells if not cell.is_done(num_sims, target_stderr)]
+    chunks = (chunk for round_robin in itertools.zip_longest(*todo)
+              for chunk in round_robin if chunk is not None)
+
+    def submit(executor, cell, index, size):
+        config = cell.config
+        cell_seed = chunk_seed(cell.key if seed is not None else None, index)
+        rules = Rules(**config["rules"]) if "rules" in config else None
+        return executor.submit(run_chunk, size, config["num_decks"], config["shuffle_perc"],
+                               config["strategy"], config["engine"], cell_seed, rules=rules)
+
+    def next_chunks(count):
+        while count > 0:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            if not chunk[0].is_done(num_sims, target_stderr):
+                yield chunk
+                count -= 1
+
+    interrupted = False
+    if board is not None:
+        run_chunk = simulate_chunk
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                       initargs=(board.name, board.rows,
+                                                 multiprocessing.Value('i', 0)))
+    else:
+        run_chunk = simulate
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=ignore_interrupt)
+    with executor:
+        pending = {}
+        try:
+            for cell, index, size in next_chunks(workers * CHUNKS_PER_WORKER):
+                pending[submit(executor, cell, index, size)] = (cell, index)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    cell, index = pending.pop(future)
+                    cell.finished[index] = future.result()
+                    cell.chunks = merge_in_order(cell.results, cell.finished, cell.chunks)
+                    cell.save()
+                for cell, index, size in next_chunks(len(done)):
+                    pending[submit(executor, cell, index, size)] = (cell, index)
+        except KeyboardInterrupt:
+            interrupted = True
+            for future in pending:
+                future.cancel()
+            for future, (cell, index) in pending.items():
+                if not future.cancelled():
+                    cell.finished[index] = future.result()
+                    cell.chunks = merge_in_order(cell.results, cell.finished, cell.chunks)
+            for cell in cells:
+                cell.save()
+    return cells, interrupted
+
+
+def rules_label(rules):
+    """Short label of a cell's rules
+    Args:
+        rules: rules dict of a cell config
+    Returns comma separated rules that differ from DEFAULT_RULES, "default" if none
+    """
+    default = DEFAULT_RULES.as_dict()
+    return ",".join("{0}={1}".format(name, value) for name, value in rules.items()
+                    if default.get(name) != value) or "default"
+
+
+def positive_int(value):
+    """Validate integer argument of at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("{0} is not >= 1".format(value))
+    return number
+
+
+def shuffle_perc(value):
+    """Validate shuffle percentage between 0 and 1"""
+    perc = float(value)
+    if not 0.0 < perc < 1.0:
+        raise argparse.ArgumentTypeError("{0} is not between 0 and 1".format(value))
+    return perc
+
+
+def main():
+    """Run a sweep and print a line per cell"""
+    parser = argparse.ArgumentParser(description="Simulate a grid of configurations")
+    parser.add_argument("num_sims", type=positive_int, help="Simulations per cell")
+    parser.add_argument("--decks", type=positive_int, nargs="+", default=[1, 2, 4, 6, 8],
+                        help="Deck counts")
+    parser.add_argument("--shuffle-perc", type=shuffle_perc, nargs="+", default=[0.5, 0.75],
+                        help="Shuffle percentages")
+    parser.add_argument("--strategies", type=str, nargs="+",
+                        default=["basic_strategy", "basic_strategy_alt", "simple"],
+                        help="Strategy names or strategy JSON files")
+    parser.add_argument("--engines", type=str, nargs="+", default=["object"],
+                        choices=["object", "vector", "jit"], help="Simulation engines")
+    parser.add_argument("--workers", type=positive_int, default=None,
+                        help="Number of worker processes, defaults to cpu count")
+    parser.add_argument("--chunk-size", type=positive_int, default=DEFAULT_CHUNK_SIZE,
+                        help="Simulations per unit of work handed to a worker")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for reproducible runs, cells are cached per seed")
+    parser.add_argument("--target-stderr", type=float, default=None,
+                        help="Stop a cell once the standard error of earnings per game is "
+                        "this small")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR,
+                        help="Directory of cached cells")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the cache")
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        help="Also write cell configs and results to a JSON file")
+    add_rule_arguments(parser, grid=True)
+    add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    try:
+        rules = rules_grid_from_args(args)
+        for num_decks, table_rules in itertools.product(args.decks, rules):
+            check_penetration(num_decks, table_rules)
+        # Load every strategy up front, a bad name would otherwise fail in the workers
+        for strategy in args.strategies:
+            if get_strategy(strategy) is None:
+                raise ValueError("invalid strategy {0!r}, use a packaged strategy name or a "
+                                 ".json file".format(strategy))
+    except (argparse.ArgumentTypeError, ValueError, OSError) as error:
+        parser.error(str(error))
+
+    configs = grid(args.decks, args.shuffle_perc, args.strategies, args.engines, rules)
+    cache_dir = None if args.no_cache else args.cache_dir
+    # Rows of the board mix cells, so progress is reported without an estimate
+    board = ResultBoard(args.workers or os.cpu_count())
+    planned = sum(max(args.num_sims - cell.results["num_sims"], 0)
+                  for cell in (Cell(config, args.seed, cache_dir) for config in configs))
+    try:
+        with telemetry_from_args(args, board, planned, estimate=False):
+            cells, interrupted = run_sweep(configs, args.num_sims, workers=args.workers,
+                                           chunk_size=args.chunk_size, seed=args.seed,
+                                           target_stderr=args.target_stderr,
+                                           cache_dir=cache_dir, board=board)
+    finally:
+        board.close()
+    if interrupted:
+        print("Interrupted, reporting completed simulations only")
+    print("{0:<24} {1:>5} {2:>7} {3:>7} {4:>10} {5:>10} {6:>9}  {7}".format(
+        "strategy", "decks", "shuffle", "engine", "sims", "EV/game", "stderr", "rules"))
+    for cell in cells:
+        config, results = cell.config, cell.results
+        stats = results["round_stats"]
+        print("{0:<24} {1:>5} {2:>7.2f} {3:>7} {4:>10} {5:>10.4f} {6:>9.4f}  {7}".format(
+            config["strategy"], config["num_decks"], config["shuffle_perc"], config["engine"],
+            results["num_sims"], stats.mean, stats.stderr, rules_label(config["rules"])))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump([{"config": cell.config, "results": dump_results(cell.results)}
+                       for cell in cells], output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Module for multi-seat tables"""
+from .game import Game
+from .hand import Hand
+from .strategy import DealerStrategy
+
+MAX_SEATS = 7
+
+
+class Table():
+    """Blackjack table of 1 to 7 seats sharing one shoe and one dealer
+    Each seat is a Game keeping its own hand, strategy, bet and results,
+    the table deals in casino order and plays the dealer once per round
+    Args:
+        deck: finalized deck to use
+        player_strategies: strategy of each seat, first seat first
+        bankrolls: optional starting bankroll of each seat, 0.0 if not given
+        bet_spread: optional counting.BetSpread sizing every seat's bet
+        rules: optional rules.Rules of the dealer and payouts, DEFAULT_RULES if not given
+    """
+
+    __slots__ = ("deck", "seats", "bankrolls", "dealer_strategy", "dealer_hand")
+
+    def __init__(self, deck, player_strategies, bankrolls=None, bet_spread=None, rules=None):
+        if not 1 <= len(player_strategies) <= MAX_SEATS:
+            raise ValueError("A table seats 1 to {0} players, got {1}".format(
+                MAX_SEATS, len(player_strategies)))
+        self.deck = deck
+        self.seats = [Game(deck, strategy, bet_spread=bet_spread, rules=rules)
+                      for strategy in player_strategies]
+        if bankrolls is None:
+            bankrolls = [0.0] * len(player_strategies)
+        if len(bankrolls) != len(player_strategies):
+            raise ValueError("Need a bankroll per seat")
+        self.bankrolls = list(bankrolls)
+        self.dealer_strategy = DealerStrategy(deck, rules)
+        self.dealer_hand = Hand()
+
+    def deal(self):
+        """Deal initial cards in casino order
+        A card to each seat, the dealer upcard, a second card to each seat
+        and the hole card. The hole card is kept first in the dealer hand
+        where strategies expect it.
+        """
+        deck = self.deck
+        for seat in self.seats:
+            seat.player_hand.add_card(deck.deal())
+        upcard = deck.deal()
+        for seat in self.seats:
+            seat.player_hand.add_card(deck.deal())
+        self.dealer_hand.add_card(deck.deal())
+        self.dealer_hand.add_card(upcard)
+
+    def play_round(self):
+        """Reset and play a round with the current deck
+        Results of each seat are in its game_info
+        """
+        deck = self.deck
+        dealer_hand = self.dealer_hand
+        dealer_hand.clear()
+        seats = self.seats
+        for seat in seats:
+            seat.reset()
+            seat.round_start = deck.pos
+            seat.round_bet = seat.next_bet()
+            seat.player_hand.add_bet(seat.round_bet)
+        self.deal()
+
+        # Hands of every seat still in play once seats have acted
+        played = []
+        for seat in seats:
+            player_hand = seat.player_hand
+            if seat.settle_blackjack(player_hand, dealer_hand):
+                continue
+            strategy = seat.player_strategy
+            strategy.deck = deck
+            for hand in strategy.play(player_hand, dealer_hand):
+                played.append((seat, hand))
+
+        if any(not (Game.check_bust(hand) or hand.surrendered) for _, hand in played):
+            self.dealer_strategy.deck = deck
+            self.dealer_strategy.play(dealer_hand)
+        for seat, hand in played:
+            seat.settle(hand, dealer_hand)
+        for index, seat in enumerate(seats):
+            self.bankrolls[index] += seat.game_info["earnings"]
@@ -0,0 +1,284 @@
+"""Module for run telemetry
+
+A thread reads a run's result board every few seconds and reports
+progress: rounds done, rounds per second of each worker since the last
+report and on average, the current EV estimate with its confidence
+interval, and the time left. Reports go to stderr, and optionally to a
+Prometheus text file (for the node exporter's textfile collector) and a
+local HTTP endpoint to scrape, so stalled or slow workers show up while
+a long run is still going.
+"""
+import contextlib
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_INTERVAL = 10.0
+
+# Workers with a chunk in progress that have not published for this many intervals
+# are reported stalled
+STALL_INTERVALS = 3
+
+METRICS = (
+    ("pyblackjack_rounds_total", "counter", "Rounds completed"),
+    ("pyblackjack_rounds_target", "gauge", "Rounds the run will play at most"),
+    ("pyblackjack_rounds_per_second", "gauge", "Rounds per second since the last report"),
+    ("pyblackjack_average_rounds_per_second", "gauge", "Rounds per second since the start"),
+    ("pyblackjack_earnings_per_game", "gauge", "Current estimate of earnings per game"),
+    ("pyblackjack_earnings_per_game_stderr", "gauge", "Standard error of earnings per game"),
+    ("pyblackjack_eta_seconds", "gauge", "Estimated seconds left"),
+    ("pyblackjack_worker_rounds_total", "counter", "Rounds completed by a worker"),
+    ("pyblackjack_worker_rounds_per_second", "gauge",
+     "Rounds per second of a worker since the last report"),
+    ("pyblackjack_worker_last_update_age_seconds", "gauge",
+     "Seconds since a worker last published"),
+)
+
+
+def format_duration(seconds):
+    """Short human readable duration
+    Args:
+        seconds: duration, may be infinite
+    Returns text such as 1h02m, 3m05s or 12s
+    """
+    if math.isinf(seconds) or math.isnan(seconds):
+        return "?"
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return "{0}h{1:02d}m".format(seconds // 3600, seconds % 3600 // 60)
+    if seconds >= 60:
+        return "{0}m{1:02d}s".format(seconds // 60, seconds % 60)
+    return "{0}s".format(seconds)
+
+
+class Telemetry():
+    """Periodic progress reports of a run read off its result board
+    Used as a context manager around the run
+    Args:
+        board: board.ResultBoard the run publishes to
+        target_rounds: rounds the run plays at most
+        interval: seconds between reports
+        stream: stream for progress lines, None to not print them
+        metrics_file: optional Prometheus text file rewritten every report
+        port: optional local port serving the metrics at /metrics
+        estimate: report the EV estimate, off when rows mix configurations
+    """
+
+    def __init__(self, board, target_rounds, interval=DEFAULT_INTERVAL, stream=sys.stderr,
+                 metrics_file=None, port=None, estimate=True):
+        self.board = board
+        self.target_rounds = target_rounds
+        self.interval = interval
+        self.stream = stream
+        self.metrics_file = metrics_file
+        self.estimate = estimate
+        self.started = None
+        self.last = {}
+        self.metrics = ""
+        self.stopped = threading.Event()
+        self.thread = None
+        self.server = None
+        if port is not None:
+            self.server = ThreadingHTTPServer(("127.0.0.1", port), metrics_handler(self))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start reporting in the background"""
+        self.started = time.time()
+        self.thread = threading.Thread(target=self.loop, name="telemetry", daemon=True)
+        self.thread.start()
+        if self.server is not None:
+            threading.Thread(target=self.server.serve_forever, name="metrics",
+                             daemon=True).start()
+
+    def stop(self):
+        """Stop reporting with a final report and close the metrics endpoint"""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.report()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def loop(self):
+        """Report every interval until stopped"""
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def snapshot(self, now=None):
+        """Progress of the run so far
+        Args:
+            now: time of the snapshot, current time if None
+        Returns dict of rounds, rates, estimate, ETA and per worker progress
+        """
+        now = time.time() if now is None else now
+        totals = self.board.totals()
+        elapsed = max(now - self.started, 1e-9)
+        workers = []
+        for worker in totals["workers"]:
+            since, before = self.last.get(worker["row"], (self.started, 0))
+            rounds = worker["rounds"]
+            workers.append({"row": worker["row"], "rounds": rounds,
+                            "rate": (rounds - before) / max(now - since, 1e-9),
+                            "average": rounds / elapsed, "age": now - worker["updated"],
+                            "busy": worker["busy"]})
+            self.last[worker["row"]] = (now, rounds)
+        rounds = totals["rounds"]
+        average = rounds / elapsed
+        stats = totals["round_stats"]
+        return {"elapsed": elapsed, "rounds": rounds, "target": self.target_rounds,
+                "rate": sum(worker["rate"] for worker in workers), "average": average,
+                "ev": stats.mean, "stderr": stats.stderr, "low_high": stats.confidence_interval(),
+                "eta": max(self.target_rounds - rounds, 0) / average if average else math.inf,
+                "workers": workers}
+
+    def report(self, now=None):
+        """Write a progress report to each configured output
+        Args:
+            now: time of the report, current time if None
+        Returns snapshot reported
+        """
+        snapshot = self.snapshot(now)
+        if self.stream is not None:
+            self.stream.write(self.format_progress(snapshot) + "\n")
+            self.stream.flush()
+        self.metrics = self.format_metrics(snapshot)
+        if self.metrics_file is not None:
+            with open(self.metrics_file + ".tmp", "w") as metrics:
+                metrics.write(self.metrics)
+            os.replace(self.metrics_file + ".tmp", self.metrics_file)
+        return snapshot
+
+    def format_progress(self, snapshot):
+        """Progress lines of a snapshot
+        Args:
+            snapshot: snapshot to format
+        Returns a line for the run and one listing each worker's rate
+        """
+        rounds, target = snapshot["rounds"], snapshot["target"]
+        parts = ["[{0:>6}] {1:,}/{2:,} rounds ({3:.1%})".format(
+            format_duration(snapshot["elapsed"]), rounds, target,
+            rounds / target if target else 1.0)]
+        parts.append("{0:,.0f} rounds/s (average {1:,.0f})".format(
+            snapshot["rate"], snapshot["average"]))
+        if self.estimate and rounds > 1:
+            parts.append("EV/game {0:.4f} [{1:.4f}, {2:.4f}]".format(
+                snapshot["ev"], *snapshot["low_high"]))
+        parts.append("ETA {0}".format(format_duration(snapshot["eta"])))
+        workers = []
+        for worker in snapshot["workers"]:
+            text = "{0}: {1:,.0f}/s".format(worker["row"], worker["rate"])
+            if worker["busy"] and worker["age"] > STALL_INTERVALS * self.interval:
+                text += " stalled {0}".format(format_duration(worker["age"]))
+            workers.append(text)
+        return ", ".join(parts) + "\n  workers " + (", ".join(workers) or "starting")
+
+    def format_metrics(self, snapshot):
+        """Prometheus text exposition of a snapshot
+        Args:
+            snapshot: snapshot to format
+        Returns metrics text
+        """
+        values = {"pyblackjack_rounds_total": [("", snapshot["rounds"])],
+                  "pyblackjack_rounds_target": [("", snapshot["target"])],
+                  "pyblackjack_rounds_per_second": [("", snapshot["rate"])],
+                  "pyblackjack_average_rounds_per_second": [("", snapshot["average"])],
+                  "pyblackjack_eta_seconds": [("", snapshot["eta"])]}
+        if self.estimate and snapshot["rounds"] > 1:
+            values["pyblackjack_earnings_per_game"] = [("", snapshot["ev"])]
+            values["pyblackjack_earnings_per_game_stderr"] = [("", snapshot["stderr"])]
+        for name, field in (("pyblackjack_worker_rounds_total", "rounds"),
+                            ("pyblackjack_worker_rounds_per_second", "rate"),
+                            ("pyblackjack_worker_last_update_age_seconds", "age")):
+            values[name] = [('{{worker="{0}"}}'.format(worker["row"]), worker[field])
+                            for worker in snapshot["workers"]]
+        lines = []
+        for name, kind, help_text in METRICS:
+            if not values.get(name):
+                continue
+            lines.append("# HELP {0} {1}".format(name, help_text))
+            lines.append("# TYPE {0} {1}".format(name, kind))
+            for labels, value in values[name]:
+                lines.append("{0}{1} {2}".format(name, labels, format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+def format_value(value):
+    """Prometheus sample value
+    Args:
+        value: number
+    Returns text, +Inf for infinity
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def metrics_handler(telemetry):
+    """HTTP handler class serving the latest metrics of a telemetry
+    Args:
+        telemetry: Telemetry to serve
+    Returns BaseHTTPRequestHandler subclass
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Serve /metrics, 404 otherwise"""
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = telemetry.metrics.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MetricsHandler
+
+
+def add_telemetry_arguments(parser):
+    """Add progress reporting options to a command line parser
+    Args:
+        parser: argparse.ArgumentParser
+    """
+    group = parser.add_argument_group("progress")
+    group.add_argument("--progress", type=float, nargs="?", const=DEFAULT_INTERVAL,
+                       default=None, metavar="SECONDS",
+                       help="Report progress to stderr every SECONDS, {0:g} if not "
+                       "given".format(DEFAULT_INTERVAL))
+    group.add_argument("--metrics-file", type=str, default=None,
+                       help="Prometheus text file rewritten with every report")
+    group.add_argument("--metrics-port", type=int, default=None,
+                       help="Serve Prometheus metrics on localhost at this port's /metrics")
+
+
+def telemetry_from_args(args, board, target_rounds, estimate=True):
+    """Telemetry of parsed command line options
+    Args:
+        args: namespace parsed with add_telemetry_arguments options
+        board: board.ResultBoard of the run
+        target_rounds: rounds the run plays at most
+        estimate: report the EV estimate
+    Returns Telemetry, or a context doing nothing without any progress option
+    """
+    if args.progress is None and args.metrics_file is None and args.metrics_port is None:
+        return contextlib.nullcontext()
+    return Telemetry(board, target_rounds, args.progress or DEFAULT_INTERVAL,
+                     sys.stderr if args.progress is not None else None,
+                     args.metrics_file, args.metrics_port, estimate)
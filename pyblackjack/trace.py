@@ -0,0 +1,67 @@
+"""Module for per-round traces
+
+A trace is a JSON lines file with one record per round: the cards of
+every player and dealer hand, the decisions the player strategy made and
+the round result. Tracing is off unless a RoundTracer is given to a Game.
+"""
+import json
+
+
+def card_codes(hand):
+    """Compact card strings of a hand
+    Args:
+        hand: hand to encode
+    Returns list of value and suit initial, e.g. "10H"
+    """
+    return [card.value + card.suit[0] for card in hand.cards]
+
+
+class RoundTracer():
+    """Write a JSON line per played round
+    Args:
+        path: trace file, appended to
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rounds = 0
+        self.output = open(path, "a")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, game):
+        """Write record of the round game just played
+        Args:
+            game: game after play_round
+        """
+        strategy = game.player_strategy
+        record = {
+            "round": self.rounds,
+            "player": card_codes(game.player_hand),
+            "splits": [card_codes(hand) for hand in strategy.split_hands],
+            "dealer": card_codes(game.dealer_hand),
+            "actions": strategy.actions,
+            "hand_earnings": game.hand_earnings,
+        }
+        record.update(game.game_info)
+        self.output.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.rounds += 1
+
+    def close(self):
+        """Flush and close trace file"""
+        self.output.close()
+
+
+def read_trace(path):
+    """Read round records back from a trace file
+    Args:
+        path: trace file
+    Returns generator of round dicts
+    """
+    with open(path) as trace:
+        for line in trace:
+            yield json.loads(line)
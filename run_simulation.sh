@@ -1,51 +1,10 @@
 #!/bin/sh
-# Basic strat
-for run in {1..5}; do
-  python -m pyblackjack 1000000 4 0.75 basic_strategy >> basic_strat_output_4_75.txt
-done
-
-for run in {1..5}; do
-  python -m pyblackjack 1000000 1 0.75 basic_strategy >> basic_strat_output_1_75.txt
-done
-
-for run in {1..5}; do
-  python -m pyblackjack 1000000 1 0.50 basic_strategy >> basic_strat_output_1_50.txt
-done
+# Every strategy, deck count and shuffle percentage on one process pool,
+# cells are cached in .pyblackjack-cache so re-runs only top up what is missing
+python -m pyblackjack.sweep 5000000 --decks 1 4 --shuffle-perc 0.50 0.75 \
+  --strategies basic_strategy basic_strategy_alt simple -o sweep_output.json
 
+# Paired comparison of all strategies on the same shoes
 for run in {1..5}; do
-  python -m pyblackjack 1000000 4 0.50 basic_strategy >> basic_strat_output_4_50.txt
+  python -m pyblackjack 1000000 4 0.75 basic_strategy basic_strategy_alt simple >> comparison_output_4_75.txt
 done
-
-# Alt strat
-for run in {1..5}; do
-  python -m pyblackjack 1000000 4 0.75 basic_strategy_alt >> basic_strat_alt_output_4_75.txt
-done
-
-for run in {1..5}; do
-  python -m pyblackjack 1000000 1 0.75 basic_strategy_alt >> basic_strat_alt_output_1_75.txt
-done
-
-for run in {1..5}; do
-  python -m pyblackjack 1000000 1 0.50 basic_strategy_alt >> basic_strat_alt_output_1_50.txt
-done
-
-for run in {1..5}; do
-  python -m pyblackjack 1000000 4 0.50 basic_strategy_alt >> basic_strat_alt_output_4_50.txt
-done
-
-# Simple strat
-for run in {1..5}; do
-  python -m pyblackjack 1000000 4 0.75 simple >> simple_output_4_75.txt
-done
-
-for run in {1..5}; do
-  python -m pyblackjack 1000000 1 0.75 simple >> simple_output_1_75.txt
-done
-
-for run in {1..5}; do
-  python -m pyblackjack 1000000 1 0.50 simple >> simple_output_1_50.txt
-done
-
-for run in {1..5}; do
-  python -m pyblackjack 1000000 4 0.50 simple >> simple_output_4_50.txt
-done
\ No newline at end of file
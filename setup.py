@@ -12,17 +12,22 @@ setup(name='pyblackjack',
       long_description=readme(),
       long_description_content_type='text/markdown',
       license='MIT',
-      packages=find_packages(),
+      packages=find_packages(exclude=['tests', 'benchmarks']),
       test_suite='tests',
       entry_points={
           'console_scripts': [
               'pyblackjack = flagger.__main__:main'
           ]
       },
+      extras_require={
+          'vector': ['numpy>=1.20'],
+          'jit': ['numpy>=1.20', 'numba>=0.56']
+      },
       include_package_data=True,
       data_files=[('', [
           'pyblackjack/resources/strategies/basic_strategy.json',
-          'pyblackjack/resources/strategies/basic_strategy_alt.json'
+          'pyblackjack/resources/strategies/basic_strategy_alt.json',
+          'pyblackjack/resources/strategies/basic_strategy_i18.json'
       ])],
       zip_safe=False
       )
@@ -0,0 +1,54 @@
+import math
+from unittest import TestCase, skipIf
+try:
+    import numpy as np
+    from pyblackjack.bankroll import run_sessions, summarize_sessions
+    from pyblackjack.outcomes import round_outcomes
+except ImportError:
+    np = None
+
+
+@skipIf(np is None, "numpy not installed")
+class TestBankroll(TestCase):
+    """Test bankroll sessions
+    """
+
+    def test_sessions(self):
+        """Test ruin, final bankroll and drawdown of fixed outcomes
+        """
+        losing = run_sessions([-1.0], 10, 20, 5.0, seed=1, block_cells=60)
+        self.assertTrue(losing["ruined"].all())
+        self.assertEqual(losing["final"].tolist(), [0.0] * 10)
+        self.assertEqual(losing["drawdown"].tolist(), [5.0] * 10)
+
+        winning = run_sessions([1.0, 2.0], 1000, 10, 5.0, seed=1)
+        self.assertFalse(winning["ruined"].any())
+        self.assertEqual(winning["drawdown"].max(), 0.0)
+        self.assertTrue(((winning["final"] >= 15.0) & (winning["final"] <= 25.0)).all())
+
+        summary = summarize_sessions(winning, [1.0, 2.0])
+        self.assertEqual(summary["ruin"], 0.0)
+        self.assertEqual(summary["n0"], (0.5 / 1.5) ** 2)
+        self.assertEqual(summarize_sessions(losing, [-1.0])["n0"], math.inf)
+
+    def test_seeded_blocks(self):
+        """Test seeded runs repeat and ruin stops the session
+        """
+        outcomes, true_counts = round_outcomes(5000, 2, 0.5, "basic_strategy", seed=2)
+        self.assertIsNone(true_counts)
+        self.assertEqual(len(outcomes), 5000)
+        self.assertIn(1.5, outcomes)
+        counted, true_counts = round_outcomes(300, 2, 0.5, "basic_strategy", engine="object",
+                                              seed=2, count="hilo", spread=(1, 4))
+        self.assertEqual(len(counted), 300)
+        self.assertTrue(((counted * 2) % 1 == 0).all())
+        self.assertEqual(len(true_counts), 300)
+        first = run_sessions(outcomes, 500, 200, 10.0, seed=3, block_cells=10000)
+        second = run_sessions(outcomes, 500, 200, 10.0, seed=3, block_cells=10000)
+        for key in first:
+            self.assertTrue((first[key] == second[key]).all())
+        ruined = first["ruined"]
+        self.assertTrue(ruined.any())
+        self.assertTrue((first["final"][ruined] <= 0).all())
+        self.assertTrue((first["final"][ruined] > -10.0).all())
+        self.assertTrue((first["drawdown"][ruined] >= 10.0).all())
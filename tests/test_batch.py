@@ -0,0 +1,88 @@
+from unittest import TestCase, skipIf
+try:
+    import numpy as np
+    from pyblackjack.batch import (BatchSimulator, load_table, hand_value,
+                                   PAIRS, SOFT, HARD, STAND_CODE, HIT_CODE,
+                                   DOUBLE_CODE, SPLIT_CODE, MAX_ROUND_CARDS)
+    from pyblackjack.runner import MIN_ROUND_CARDS
+    from pyblackjack.rules import Rules
+except ImportError:
+    np = None
+
+
+@skipIf(np is None, "numpy not installed")
+class TestBatch(TestCase):
+    """Test vectorized batch simulator
+    """
+
+    def test_compile_table(self):
+        """Test strategy JSON compiles to matching action codes
+        """
+        table = load_table("basic_strategy")
+        self.assertEqual(table[PAIRS, 8, 10], SPLIT_CODE)
+        self.assertEqual(table[PAIRS, 9, 7], STAND_CODE)
+        self.assertEqual(table[SOFT, 7, 3], DOUBLE_CODE)
+        self.assertEqual(table[HARD, 16, 7], HIT_CODE)
+        self.assertEqual(table[HARD, 16, 6], STAND_CODE)
+
+    def test_hand_value(self):
+        """Test soft ace handling
+        """
+        values = hand_value(np.array([2, 12, 7, 3]), np.array([1, 1, 0, 3]))
+        self.assertEqual(list(values), [12, 12, 7, 13])
+
+    def test_run_counts(self):
+        """Test aggregates add up for exact round counts
+        """
+        simulator = BatchSimulator(1, 0.5, "simple", lanes=1000, seed=1)
+        info = simulator.run(2500)
+        self.assertEqual(info["num_hands"], 2500)
+        self.assertEqual(info["wins"] + info["ties"] + info["losses"], 2500)
+
+        simulator = BatchSimulator(4, 0.75, "basic_strategy", lanes=1000, seed=1)
+        info = simulator.run(5000)
+        self.assertGreaterEqual(info["num_hands"], 5000)
+
+    def test_seeded_runs_repeat(self):
+        """Test runs with same seed are identical
+        """
+        first = BatchSimulator(2, 0.75, "basic_strategy_alt", lanes=500, seed=3).run(2000)
+        second = BatchSimulator(2, 0.75, "basic_strategy_alt", lanes=500, seed=3).run(2000)
+        self.assertEqual(first, second)
+
+    def test_rules(self):
+        """Test rules change play on the same shoes
+        """
+        plain = BatchSimulator(2, 0.5, "basic_strategy", lanes=500, seed=4).run(2000)
+        paid = BatchSimulator(2, 0.5, "basic_strategy", lanes=500, seed=4,
+                              rules=Rules(blackjack_payout=1.2)).run(2000)
+        self.assertEqual(paid["wins"], plain["wins"])
+        self.assertLess(paid["earnings"], plain["earnings"])
+
+        simulator = BatchSimulator(2, 0.5, "basic_strategy", lanes=500, seed=4,
+                                   rules=Rules(surrender=True, hit_soft_17=True, penetration=0.8))
+        _, _, loss, earnings, _ = simulator.play_round(500)
+        self.assertTrue((earnings[:, 0] == -2.5).any())
+        self.assertTrue(loss[earnings[:, 0] == -2.5, 0].all())
+
+    def test_shoe_end(self):
+        """Test lanes reshuffle on the cards left before the cut and play past the shoe
+        """
+        simulator = BatchSimulator(1, 0.0, "basic_strategy", lanes=200, seed=2)
+        # A shoe of twos cut at its last card, each round takes over 20 cards
+        simulator.shoe[:, :52] = 1
+        simulator.end[:] = 52
+        simulator.cursor[:] = 52 - MIN_ROUND_CARDS
+        simulator.play_round(200)
+        self.assertTrue((simulator.cursor > 52).all())
+        simulator.play_round(200)
+        self.assertTrue((simulator.cursor <= MAX_ROUND_CARDS).all())
+
+    def test_no_split(self):
+        """Test pairs are played on their total when hands can't be split
+        """
+        simulator = BatchSimulator(2, 0.5, "basic_strategy", lanes=2000, seed=5,
+                                   rules=Rules(max_hands=1))
+        win, tie, loss, earnings, _ = simulator.play_round(2000)
+        self.assertFalse((win | tie | loss)[:, 1].any())
+        self.assertTrue((earnings[:, 1] == 0.0).all())
@@ -0,0 +1,22 @@
+from unittest import TestCase
+from benchmarks.__main__ import compare, measure
+from benchmarks.suite import BENCHMARKS
+
+
+class TestBenchmarks(TestCase):
+    """Test benchmark harness
+    """
+
+    def test_compare(self):
+        """Test slowdowns past threshold are regressions
+        """
+        baseline = {"results": {"a": {"ops_per_sec": 100.0}, "b": {"ops_per_sec": 100.0},
+                                "c": {"ops_per_sec": 100.0}}}
+        current = {"results": {"a": {"ops_per_sec": 95.0}, "b": {"ops_per_sec": 80.0},
+                               "d": {"ops_per_sec": 1.0}}}
+        self.assertEqual(compare(baseline, current, 0.1), {"b": 0.8})
+
+    def test_measure(self):
+        """Test benchmark runs and reports throughput
+        """
+        self.assertGreater(measure(BENCHMARKS["deck_deal"], repeat=1, min_time=0.01), 0)
@@ -0,0 +1,76 @@
+from unittest import TestCase
+from pyblackjack.board import ResultBoard, sum_stats, UPCARDS
+from pyblackjack.runner import simulate, run_simulations
+
+
+class TestBoard(TestCase):
+    """Test shared memory result board
+    """
+
+    def test_rows(self):
+        """Test published rows add up and are seen by attached boards
+        """
+        board = ResultBoard(2)
+        try:
+            row = board.row(1)
+            results = simulate(3000, 2, 0.5, "basic_strategy", seed=1, board=row)
+            row.finish(results)
+            attached = ResultBoard(2, board.name)
+            totals = attached.totals()
+            attached.close()
+            self.assertEqual(totals["rounds"], 3000)
+            self.assertEqual(totals["hands"], results["num_hands"])
+            self.assertEqual(totals["earnings"], results["earnings"])
+            self.assertEqual(totals["workers"][0]["chunks"], 1)
+            self.assertAlmostEqual(totals["round_stats"].mean, results["round_stats"].mean)
+            upcards = totals["upcards"]
+            self.assertEqual(set(upcards), set(UPCARDS))
+            self.assertEqual(sum(stats.count for stats in upcards.values()), 3000)
+            self.assertAlmostEqual(sum(stats.count * stats.mean for stats in upcards.values()),
+                                   results["earnings"])
+            self.assertLess(upcards[11].mean, upcards[6].mean)
+        finally:
+            board.close()
+
+    def test_busy(self):
+        """Test a worker shows as busy from the start of a chunk until it finishes
+        """
+        board = ResultBoard(1)
+        try:
+            row = board.row(0)
+            self.assertEqual(board.totals()["workers"], [])
+            row.begin()
+            worker, = board.totals()["workers"]
+            self.assertEqual((worker["rounds"], worker["busy"]), (0, True))
+            # Table rounds publish the average earnings per seat by upcard
+            results = simulate(1500, 2, 0.5, "simple", seats=3, seed=2, board=row)
+            self.assertEqual(board.totals()["rounds"], 1001)
+            row.finish(results)
+            totals = board.totals()
+            self.assertFalse(totals["workers"][0]["busy"])
+            self.assertEqual(sum(stats.count for stats in totals["upcards"].values()), 1500)
+            self.assertAlmostEqual(totals["round_stats"].mean, results["round_stats"].mean)
+        finally:
+            board.close()
+
+    def test_sum_stats(self):
+        """Test stats from sums match values added one at a time
+        """
+        stats = sum_stats(4, 2.0, 10.0)
+        self.assertEqual((stats.count, stats.mean, stats.m2), (4, 0.5, 9.0))
+        self.assertEqual(sum_stats(0, 0.0, 0.0).count, 0)
+
+    def test_run(self):
+        """Test pooled runs collect upcards and leave a given board readable
+        """
+        results, _ = run_simulations(2000, 1, 0.5, "basic_strategy", workers=2, chunk_size=300,
+                                     seed=3)
+        self.assertEqual(sum(stats.count for stats in results["upcards"].values()), 2000)
+        board = ResultBoard(2)
+        try:
+            run_simulations(2000, 1, 0.5, "simple", workers=2, chunk_size=300, board=board)
+            totals = board.totals()
+            self.assertEqual(totals["rounds"], 2000)
+            self.assertEqual(sum(worker["chunks"] for worker in totals["workers"]), 7)
+        finally:
+            board.close()
@@ -18,3 +18,11 @@ class TestCard(TestCase):
         self.assertEqual(c2.get_value(), 10)
         c3 = Card("Aces", "2")
         self.assertEqual(c3.get_value(), 2)
+
+    def test_card_points(self):
+        c = Card("Clubs", "A")
+        self.assertEqual(c.points, 11)
+        self.assertTrue(c.is_ace)
+        c2 = Card("Clubs", "K")
+        self.assertEqual(c2.points, 10)
+        self.assertFalse(c2.is_ace)
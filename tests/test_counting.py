@@ -0,0 +1,66 @@
+import random
+from unittest import TestCase
+from pyblackjack.counting import Counter, BetSpread, SYSTEMS, parse_ramp
+from pyblackjack.deck import Deck, CARDS
+from pyblackjack.runner import new_deck, reshuffle, simulate
+
+
+class TestCounting(TestCase):
+    """Test card counting
+    """
+
+    def test_running_count(self):
+        """Test count follows dealt cards without being told of them
+        """
+        deck = new_deck(2, rng=random.Random(1))
+        counter = Counter("hilo", deck)
+        tags = SYSTEMS["hilo"][0]
+        count = 0
+        for _ in range(60):
+            self.assertEqual(counter.running_count, count)
+            card = deck.deal()
+            count += tags[CARDS.index(card) % 13]
+        reshuffle(deck)
+        self.assertEqual(counter.running_count, 0)
+        deck.deal()
+        self.assertNotEqual(counter.prefix, None)
+
+    def test_balanced(self):
+        """Test balanced systems end a full shoe at zero and KO at +4
+        """
+        for system, (_, balanced) in SYSTEMS.items():
+            deck = Deck(6)
+            counter = Counter(system, deck)
+            deck.pos = len(deck.codes)
+            self.assertEqual(counter.running_count, 0 if balanced else 4)
+
+    def test_true_count(self):
+        """Test true count divides by decks remaining
+        """
+        deck = Deck(2)  # unshuffled, dealt A, 2, 3, 4, 5 first
+        counter = Counter("hilo", deck)
+        deck.pos = 5
+        self.assertEqual(counter.running_count, 3)
+        self.assertAlmostEqual(counter.true_count, 3 / (99 / 52))
+        self.assertEqual(Counter("ko", deck).true_count, counter.running_count - 4)
+        self.assertRaises(ValueError, Counter, "unknown", deck)
+
+    def test_bet_spread(self):
+        """Test bets follow the ramp and cap at its top
+        """
+        deck = Deck(1)
+        counter = Counter("ko", deck)
+        spread = BetSpread(counter, unit=10.0, ramp=parse_ramp("1,2,4"))
+        for count, bet in [(-3, 10.0), (0, 10.0), (1, 10.0), (2, 20.0), (3, 40.0), (9, 40.0)]:
+            counter.prefix = [count] * (len(deck.codes) + 1)
+            self.assertEqual(spread.bet(), bet)
+        self.assertRaises(ValueError, parse_ramp, "1,0")
+
+    def test_counted_simulation(self):
+        """Test counting alone leaves results unchanged and a spread changes bets
+        """
+        flat = simulate(500, 1, 0.5, "basic_strategy", seed=2)
+        self.assertEqual(simulate(500, 1, 0.5, "basic_strategy", seed=2, count="hilo"), flat)
+        spread = simulate(500, 1, 0.5, "basic_strategy", seed=2, count="hilo", spread=(1, 8))
+        self.assertEqual(spread["num_hands"], flat["num_hands"])
+        self.assertNotEqual(spread["earnings"], flat["earnings"])
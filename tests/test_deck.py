@@ -1,6 +1,7 @@
 from unittest import TestCase
 import hashlib
-from pyblackjack.deck import Deck
+import random
+from pyblackjack.deck import CARDS, Deck
 from pyblackjack.card import Card
 
 
@@ -31,9 +32,58 @@ class TestDeck(TestCase):
         d.cut()
         self.assertGreater(l, len(d.cards))
 
+        d = Deck(2, penetration=0.75)
+        d.cut()
+        self.assertEqual(len(d), 78)
+
     def test_deck_deal(self):
         """Test deck deal card
         """
         d = Deck(1)
         c = d.deal()
         self.assertEqual(c.value, "A")
+
+    def test_deck_deal_cursor(self):
+        """Test dealing advances cursor without copying cards
+        """
+        d = Deck(2)
+        self.assertEqual(len(d), 104)
+        d.deal()
+        d.deal()
+        self.assertEqual(len(d), 102)
+        self.assertEqual(len(d.cards), 102)
+
+    def test_deck_reset(self):
+        """Test reset returns dealt and cut cards in place
+        """
+        d = Deck(1)
+        d.shuffle()
+        d.cut()
+        d.deal()
+        d.reset()
+        self.assertEqual(len(d), 52)
+        d.shuffle()
+        self.assertEqual(sorted(str(c) for c in d.cards),
+                         sorted(str(c) for c in Deck(1).cards))
+
+    def test_deck_shuffle_remaining(self):
+        """Test shuffling a dealt deck leaves dealt cards in place
+        """
+        d = Deck(1, rng=random.Random(2))
+        codes = d.codes
+        dealt = [d.deal() for _ in range(5)]
+        d.shuffle()
+        self.assertIs(d.codes, codes)
+        self.assertEqual([str(CARDS[c]) for c in d.codes[:5]], [str(c) for c in dealt])
+        self.assertEqual(sorted(d.codes), sorted(Deck(1).codes))
+
+    def test_deck_seeded(self):
+        """Test decks with seeded generators shuffle identically
+        """
+        d1 = Deck(2, rng=random.Random(5))
+        d2 = Deck(2, rng=random.Random(5))
+        d1.shuffle()
+        d2.shuffle()
+        d1.cut()
+        d2.cut()
+        self.assertEqual([str(c) for c in d1.cards], [str(c) for c in d2.cards])
@@ -0,0 +1,109 @@
+from unittest import TestCase, skipIf
+try:
+    import numpy as np
+    from pyblackjack.batch import BatchSimulator
+except ImportError:
+    np = None
+from pyblackjack.exact import (ExactCalculator, dealer_probabilities, shoe_composition,
+                               remove, stand_ev, same_rank_chance, BUST)
+from pyblackjack.strategy import (load_strategy, load_surrender, STAND_CODE, HIT_CODE,
+                                  SPLIT_CODE, SURRENDER_CODE)
+from pyblackjack.rules import Rules
+
+
+class TestExact(TestCase):
+    """Test exact expected value engine
+    """
+
+    def test_dealer_probabilities(self):
+        """Test dealer outcome distribution
+        """
+        comp = remove(shoe_composition(4), 6)
+        probs = dealer_probabilities(6, comp)
+        self.assertAlmostEqual(sum(probs), 1.0)
+        self.assertGreater(probs[BUST], 0.40)
+        self.assertLess(probs[BUST], 0.44)
+
+        comp = remove(shoe_composition(4), 1)
+        probs = dealer_probabilities(1, comp)
+        self.assertAlmostEqual(sum(probs), 1.0)
+        self.assertLess(probs[BUST], 0.2)
+
+    def test_stand_ev(self):
+        """Test standing against known dealer outcomes
+        """
+        dealer = (0.0, 0.5, 0.0, 0.0, 0.0, 0.5)
+        self.assertEqual(stand_ev(19, dealer), 1.0)
+        self.assertEqual(stand_ev(18, dealer), 0.5)
+        self.assertEqual(stand_ev(17, dealer), 0.0)
+        self.assertEqual(stand_ev(22, dealer), -1.0)
+
+    def test_initial_evs(self):
+        """Test optimal actions for textbook hands
+        """
+        calculator = ExactCalculator(4)
+        evs = calculator.initial_evs(10, 6, 10)
+        self.assertGreater(evs[HIT_CODE], evs[STAND_CODE])
+        evs = calculator.initial_evs(10, 3, 4)
+        self.assertGreater(evs[STAND_CODE], evs[HIT_CODE])
+        evs = calculator.initial_evs(8, 8, 6)
+        self.assertEqual(max(evs, key=evs.get), SPLIT_CODE)
+
+    def test_ten_pairs(self):
+        """Test ten valued cards are a pair only when of one rank
+        """
+        self.assertEqual(same_rank_chance(8, shoe_composition(1)), 1.0)
+        self.assertAlmostEqual(same_rank_chance(10, shoe_composition(1)), 3 / 15)
+        calculator = ExactCalculator(1)
+        self.assertIn(SPLIT_CODE, calculator.initial_evs(10, 10, 6))
+        self.assertNotIn(SPLIT_CODE, calculator.initial_evs(10, 10, 6, pair=False))
+        chance = 3 / 15
+        self.assertAlmostEqual(calculator.pair_weighted_ev(10, 10, 6),
+                               chance * calculator.initial_ev(10, 10, 6)
+                               + (1 - chance) * calculator.initial_ev(10, 10, 6, pair=False))
+
+    def test_expected_value(self):
+        """Test house edge of packaged strategies
+        """
+        basic = ExactCalculator(1, load_strategy("basic_strategy")[1]).expected_value()
+        alt = ExactCalculator(1, load_strategy("basic_strategy_alt")[1]).expected_value()
+        self.assertGreater(basic, -0.01)
+        self.assertLess(basic, 0.01)
+        self.assertLess(alt, basic)
+
+    def test_rules(self):
+        """Test house edge moves with the rules as expected
+        """
+        table = load_strategy("basic_strategy")[1]
+        first = load_surrender("basic_strategy")
+        base = ExactCalculator(1, table).expected_value()
+        self.assertLess(ExactCalculator(1, table, Rules(hit_soft_17=True)).expected_value(), base)
+        self.assertLess(ExactCalculator(1, table, Rules(double_after_split=False)).expected_value(),
+                        base)
+        six_five = ExactCalculator(1, table, Rules(blackjack_payout=1.2)).expected_value()
+        self.assertAlmostEqual(base - six_five, 0.014, delta=0.001)
+        # The packaged surrenders are for shoes, 16 against a 9 is wrong in a single deck
+        self.assertGreater(ExactCalculator(6, table, Rules(surrender=True), first).expected_value(),
+                           ExactCalculator(6, table).expected_value())
+        evs = ExactCalculator(1, rules=Rules(surrender=True)).initial_evs(10, 6, 10)
+        self.assertEqual(max(evs, key=evs.get), SURRENDER_CODE)
+
+    @skipIf(np is None, "numpy not installed")
+    def test_no_split_matches_simulation(self):
+        """Test A,A that can't be split is played as hard 12 like the simulators
+        """
+        rules = Rules(max_hands=1)
+        exact = ExactCalculator(1, load_strategy("basic_strategy")[1], rules).initial_ev(1, 1, 10)
+        # Deal A,A against a ten from the top of every lane's single deck
+        lanes = 100000
+        simulator = BatchSimulator(1, 0.0, "basic_strategy", lanes=lanes, seed=7, rules=rules)
+        rest = list(simulator.ranks)
+        for rank in (0, 0, 9):
+            rest.remove(rank)
+        rest = simulator.rng.permuted(np.broadcast_to(np.array(rest, dtype=np.int8),
+                                                      (lanes, len(rest))), axis=1)
+        simulator.shoe[:, [0, 2, 3]] = [0, 0, 9]
+        simulator.shoe[:, 1] = rest[:, 0]
+        simulator.shoe[:, 4:52] = rest[:, 1:]
+        earnings = simulator.play_round(lanes)[3].sum(axis=1) / simulator.bet
+        self.assertAlmostEqual(exact, earnings.mean(), delta=4 * earnings.std() / lanes ** 0.5)
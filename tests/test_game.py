@@ -1,9 +1,12 @@
 from unittest import TestCase
+from array import array
 from pyblackjack.hand import Hand
 from pyblackjack.card import Card
 from pyblackjack.deck import Deck
 from pyblackjack.game import Game, WIN, LOSS
 from pyblackjack.strategy import BasicStrategy
+from pyblackjack.rules import Rules
+from pyblackjack.counting import Counter
 
 
 class TestGame(TestCase):
@@ -167,7 +170,8 @@ class TestGame(TestCase):
         game.display_results()
         self.assertGreaterEqual(len(strategy.split_hands), 2)
         self.assertEqual(
-            game.game_info["losses"] + game.game_info["wins"] + game.game_info["ties"], 2)
+            game.game_info["losses"] + game.game_info["wins"] + game.game_info["ties"],
+            len(strategy.split_hands))
 
     def test_calculate_earnings(self):
         d = Deck(4)
@@ -202,29 +206,128 @@ class TestGame(TestCase):
         strategy = BasicStrategy(d)
 
         game = Game(d, strategy)
-        earnings = game.calculate_earnings(h1, WIN, False)
+        earnings = game.calculate_earnings(h1, WIN)
         self.assertEqual(earnings, 5.0)
 
         game = Game(d, strategy)
-        earnings = game.calculate_earnings(h1, LOSS, False)
+        earnings = game.calculate_earnings(h1, LOSS)
         self.assertEqual(earnings, 5.0)
 
-        game = Game(d, strategy)
-        earnings = game.calculate_earnings(h1, WIN, True)
-        self.assertEqual(earnings, 5.0)
+        # Only naturals pay 3-2, whatever ranks a hand holds
+        for hand in (h2, h3, h4, h5):
+            earnings = game.calculate_earnings(hand, WIN)
+            self.assertEqual(earnings, 5.0)
 
-        game = Game(d, strategy)
-        earnings = game.calculate_earnings(h2, WIN, False)
-        self.assertEqual(earnings, 7.5)
+        natural = Hand()
+        natural.add_card(Card("Spades", "A"))
+        natural.add_card(Card("Clubs", "K"))
+        natural.add_bet(5.0)
+        self.assertEqual(game.calculate_earnings(natural, WIN, True), 7.5)
+        game = Game(d, strategy, rules=Rules(blackjack_payout=1.2))
+        self.assertEqual(game.calculate_earnings(natural, WIN, True), 6.0)
 
-        game = Game(d, strategy)
-        earnings = game.calculate_earnings(h3, WIN, False)
-        self.assertEqual(earnings, 7.5)
+        h1.surrendered = True
+        self.assertEqual(game.calculate_earnings(h1, LOSS), 2.5)
 
+    def test_play_round_reuse(self):
+        """Test rounds reuse hands and reset results
+        """
+        d = Deck(4)
+        d.shuffle()
+        strategy = BasicStrategy(d)
         game = Game(d, strategy)
-        earnings = game.calculate_earnings(h4, WIN, False)
-        self.assertEqual(earnings, 7.5)
+        player_hand = game.player_hand
+        for _ in range(20):
+            game.play_round()
+            results = game.game_info["wins"] + game.game_info["ties"] + game.game_info["losses"]
+            self.assertIn(results, (1, 2))
+            self.assertEqual(len(game.hand_earnings), results)
+        self.assertIs(game.player_hand, player_hand)
+        self.assertFalse(hasattr(game, "__dict__"))
+
+    def test_reset_strategy(self):
+        """Test split state does not leak into the next round
+        """
+        d = Deck(4)
+        d.shuffle()
+        strategy = BasicStrategy(d)
+        game = Game(d, strategy)
+
+        player_hand = Hand()
+        player_hand.add_card(Card("Spades", "A"))
+        player_hand.add_card(Card("Clubs", "A"))
+        dealer_hand = Hand()
+        dealer_hand.add_card(Card("Spades", "10"))
+        dealer_hand.add_card(Card("Hearts", "3"))
+        game.calculate_results(player_hand, dealer_hand)
+        self.assertEqual(strategy.num_hands, 2)
+
+        game.reset()
+        self.assertEqual(strategy.num_hands, 1)
+        self.assertEqual(strategy.split_hands, [])
+        self.assertEqual(game.game_info["earnings"], 0.0)
+        self.assertEqual(game.player_hand.cards, [])
 
+    def test_split_dealer_once(self):
+        """Test dealer plays once for all split hands and every hand is settled
+        """
+        d = Deck(1)
+        d.codes = array('b', [9, 9, 4, 12] * 4)
+        d.end = len(d.codes)
+        strategy = BasicStrategy(d)
         game = Game(d, strategy)
-        earnings = game.calculate_earnings(h5, WIN, False)
-        self.assertEqual(earnings, 7.5)
+
+        player_hand = Hand()
+        player_hand.add_card(Card("Spades", "8"))
+        player_hand.add_card(Card("Clubs", "8"))
+        player_hand.add_bet(5.0)
+        dealer_hand = Hand()
+        dealer_hand.add_card(Card("Spades", "10"))
+        dealer_hand.add_card(Card("Hearts", "6"))
+        game.calculate_results(player_hand, dealer_hand)
+        self.assertEqual([c.value for c in dealer_hand.cards], ["10", "6", "5"])
+        self.assertEqual(game.game_info["losses"], 2)
+        self.assertEqual(game.hand_earnings, [-5.0, -5.0])
+
+    def test_surrender(self):
+        """Test a surrendered hand loses half its bet without the dealer playing
+        """
+        d = Deck(1)
+        rules = Rules(surrender=True)
+        game = Game(d, BasicStrategy(d, rules=rules), rules=rules)
+        player_hand = Hand()
+        player_hand.add_card(Card("Spades", "10"))
+        player_hand.add_card(Card("Clubs", "6"))
+        player_hand.add_bet(5.0)
+        dealer_hand = Hand()
+        dealer_hand.add_card(Card("Spades", "5"))
+        dealer_hand.add_card(Card("Hearts", "10"))
+        game.calculate_results(player_hand, dealer_hand)
+        self.assertEqual(len(dealer_hand.cards), 2)
+        self.assertEqual(game.game_info["losses"], 1)
+        self.assertEqual(game.hand_earnings, [-2.5])
+
+    def test_insurance(self):
+        """Test insurance costs half the bet and pays 2-1 on a dealer blackjack
+        """
+        d = Deck(1)
+        counter = Counter("hilo", d)
+        counter.prefix = [10] * 53
+        rules = Rules(insurance=True)
+        strategy = BasicStrategy(d, strat_file="basic_strategy_i18", rules=rules)
+        for hole, earnings in (("K", 0.0), ("9", -2.5)):
+            game = Game(d, strategy, rules=rules)
+            player_hand = Hand()
+            player_hand.add_card(Card("Spades", "10"))
+            player_hand.add_card(Card("Clubs", "10"))
+            player_hand.add_bet(5.0)
+            dealer_hand = Hand()
+            dealer_hand.add_card(Card("Spades", hole))
+            dealer_hand.add_card(Card("Hearts", "A"))
+            self.assertEqual(game.settle_blackjack(player_hand, dealer_hand), hole == "K")
+            self.assertEqual(game.game_info["earnings"], earnings)
+            if hole != "K":
+                game.settle(player_hand, dealer_hand)
+            # The insurance result is settled with the hand, 20 pushes against A, 9
+            self.assertEqual(game.hand_earnings, [earnings])
+            self.assertEqual(sum(game.hand_earnings), game.game_info["earnings"])
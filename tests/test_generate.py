@@ -0,0 +1,72 @@
+from unittest import TestCase
+from pyblackjack.exact import shoe_composition
+from pyblackjack.generate import (upcard_column, hard_combos, best_action, combo_chance,
+                                  generate_strategy)
+from pyblackjack.strategy import (load_strategy, compile_strategy, compile_surrender, SPLIT,
+                                  CATEGORIES, STAND_CODE, HIT_CODE)
+from pyblackjack.rules import Rules
+
+
+class TestGenerate(TestCase):
+    """Test strategy table generator
+    """
+
+    def test_hard_combos(self):
+        """Test two card hands for a hard total
+        """
+        self.assertEqual(hard_combos(4), [(2, 2)])
+        self.assertEqual(hard_combos(12), [(2, 10), (3, 9), (4, 8), (5, 7), (6, 6)])
+        self.assertEqual(hard_combos(21), [])
+
+    def test_combo_chance(self):
+        """Test two card hands in either order add up to every deal
+        """
+        comp = shoe_composition(1)
+        self.assertAlmostEqual(combo_chance(comp, 5, 6), 2 * 4 * 4 / (52 * 51))
+        self.assertAlmostEqual(combo_chance(comp, 5, 5), 4 * 3 / (52 * 51))
+        self.assertAlmostEqual(sum(combo_chance(comp, first, second)
+                                   for first in range(1, 11) for second in range(first, 11)), 1.0)
+
+    def test_best_action(self):
+        """Test highest expected value wins
+        """
+        self.assertEqual(best_action({STAND_CODE: -0.2, HIT_CODE: -0.1}), "H")
+
+    def test_upcard_column(self):
+        """Test generated column matches packaged 4 deck basic strategy
+        """
+        lookup_table, _ = load_strategy("basic_strategy")
+        column = upcard_column(4, 6)
+        for name, _, _ in CATEGORIES:
+            for key, action in column[name].items():
+                expected = lookup_table["BasicStrategy"][name][str(key)]
+                if not isinstance(expected, str):
+                    expected = expected["6"]
+                self.assertEqual(action, expected, (name, key))
+
+    def test_rules(self):
+        """Test generated columns follow the house rules
+        """
+        h17 = upcard_column(6, 11, Rules(surrender=True, hit_soft_17=True))
+        self.assertEqual(h17["Surrender"], [15, 16, 17])
+        self.assertEqual(upcard_column(6, 11)["Surrender"], [])
+        self.assertEqual(upcard_column(6, 2)["Pairs"][2], "Sp")
+        self.assertEqual(upcard_column(6, 2, Rules(double_after_split=False))["Pairs"][2], "H")
+        self.assertNotIn(SPLIT, upcard_column(6, 6, Rules(max_hands=1))["Pairs"].values())
+
+    def test_no_split_aces(self):
+        """Test A,A that can't be split is decided with the hard 12 hands it plays as
+        """
+        self.assertEqual(upcard_column(6, 4)["Other"][12], "St")
+        column = upcard_column(6, 4, Rules(max_hands=1))
+        self.assertEqual(column["Pairs"][11], "H")
+        self.assertEqual(column["Other"][12], "H")
+        self.assertEqual(upcard_column(6, 6, Rules(max_hands=1))["Other"][12], "H")
+        self.assertEqual(upcard_column(6, 5, Rules(max_hands=1))["Other"][12], "St")
+
+    def test_generate_surrender(self):
+        """Test surrender section is written in the strategy JSON schema
+        """
+        strategy = generate_strategy(6, Rules(surrender=True))
+        self.assertEqual(strategy["Surrender"], {"15": [10], "16": [9, 10, 11]})
+        self.assertIsNotNone(compile_surrender(strategy, compile_strategy(strategy)))
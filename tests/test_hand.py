@@ -55,3 +55,36 @@ class TestHand(TestCase):
         payout_ratio = 0.5
         h.add_bet(10 + (10 * payout_ratio))
         self.assertEqual(h.bet, 15)
+
+    def test_hand_soft_flags(self):
+        """Test cached soft, pair and blackjack state
+        """
+        h = Hand()
+        h.add_card(Card("Spades", "A"))
+        h.add_card(Card("Clubs", "A"))
+        self.assertTrue(h.is_pair)
+        self.assertTrue(h.is_soft)
+        self.assertEqual(h.value, 12)
+        h.add_card(Card("Hearts", "K"))
+        self.assertFalse(h.is_pair)
+        self.assertFalse(h.is_soft)
+        self.assertEqual(h.value, 12)
+        h.add_card(Card("Hearts", "A"))
+        self.assertEqual(h.value, 13)
+
+        h = Hand()
+        h.add_card(Card("Spades", "A"))
+        h.add_card(Card("Clubs", "Q"))
+        self.assertTrue(h.is_blackjack)
+        self.assertFalse(h.is_pair)
+
+    def test_hand_recalculate(self):
+        """Test recalculating value after editing cards directly
+        """
+        h = Hand()
+        h.add_card(Card("Spades", "9"))
+        h.add_card(Card("Clubs", "A"))
+        h.cards.pop()
+        h.calculate_value()
+        self.assertEqual(h.get_value(), 9)
+        self.assertFalse(h.is_soft)
@@ -0,0 +1,109 @@
+import os
+import random
+import tempfile
+from array import array
+from unittest import TestCase, skipIf
+from pyblackjack.deck import Deck
+from pyblackjack.game import Game
+from pyblackjack.runner import new_deck, reshuffle, get_strategy, new_counting
+from pyblackjack.history import (HistoryRecorder, ReplayDeck, RecordExhausted, read_history,
+                                 replay, RECORD, NO_CARD)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def record_rounds(path, strategy, rounds, spread=None):
+    """Play and record rounds from a seeded shoe"""
+    deck = new_deck(2, rng=random.Random(6))
+    _, bet_spread = new_counting(deck, "hilo" if spread else None, spread)
+    with HistoryRecorder(path) as recorder:
+        game = Game(deck, get_strategy(strategy), recorder, bet_spread)
+        for _ in range(rounds):
+            if len(deck) < 52:
+                reshuffle(deck)
+            game.play_round()
+
+
+class TestHistory(TestCase):
+    """Test binary hand histories
+    """
+
+    def test_replay_deck(self):
+        """Test recorded cards are dealt in order until they run out
+        """
+        deck = ReplayDeck()
+        deck.load([0, 12, NO_CARD])
+        self.assertEqual(deck.deal().value, "A")
+        self.assertEqual(deck.deal().value, "K")
+        with self.assertRaises(RecordExhausted):
+            deck.deal()
+
+    @skipIf(np is None, "numpy not installed")
+    def test_read_records(self):
+        """Test records read back with fixed layout
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "history.bin")
+            record_rounds(path, "basic_strategy", 30)
+            history = read_history(path)
+            self.assertEqual(history.dtype.itemsize, RECORD.size)
+            self.assertEqual(len(history), 30)
+            self.assertTrue((history["n_cards"] >= 4).all())
+            self.assertTrue((history["n_actions"] <= 16).all())
+            self.assertTrue((history["bet"] == 5.0).all())
+            self.assertEqual(int(history["wins"].sum() + history["ties"].sum() +
+                                 history["losses"].sum()), 30)
+            del history
+
+    @skipIf(np is None, "numpy not installed")
+    def test_replay(self):
+        """Test replaying the recorded strategy reproduces every round
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "history.bin")
+            record_rounds(path, "basic_strategy", 200)
+            same = replay([path], get_strategy("basic_strategy"))
+            other = replay([path], get_strategy("simple"))
+        self.assertEqual(same["difference"].count, 200)
+        self.assertEqual(same["difference"].m2, 0.0)
+        self.assertEqual(same["recorded"], same["replayed"])
+        self.assertEqual(other["recorded"], same["recorded"])
+        self.assertNotEqual(other["difference"].m2, 0.0)
+
+    @skipIf(np is None, "numpy not installed")
+    def test_replay_bets(self):
+        """Test rounds bet on the count are replayed with their recorded bet
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "history.bin")
+            record_rounds(path, "basic_strategy", 300, spread=(1, 4, 8))
+            bets = set(read_history(path)["bet"].tolist())
+            same = replay([path], get_strategy("basic_strategy"))
+        self.assertGreater(len(bets), 1)
+        self.assertEqual(same["difference"].m2, 0.0)
+        self.assertEqual(same["recorded"], same["replayed"])
+
+    @skipIf(np is None, "numpy not installed")
+    def test_replay_past_cut(self):
+        """Test a replayed strategy hitting more than the recorded one
+        """
+        deck = Deck(1)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "history.bin")
+            with HistoryRecorder(path) as recorder:
+                game = Game(deck, get_strategy("simple"), recorder)
+                # 2, 10 stands on 12 against 7, 10 with the cut card after the fourth
+                # card, first mid shoe then with the last five cards of the shoe
+                for start, hits in ((0, [4]), (47, [1])):
+                    deck.codes[start:start + 5] = array("b", [1, 6, 9, 22] + hits)
+                    deck.pos, deck.end = start, start + 5
+                    game.play_round()
+            results = replay([path], get_strategy("basic_strategy"))
+        # Basic strategy hits 12 against a 10, the 5 past the cut pushes at 17
+        # while the 2 leaves 14 with no card recorded to hit it with
+        self.assertEqual(results["skipped"], 1)
+        self.assertEqual(results["difference"].count, 1)
+        self.assertEqual(results["recorded"].mean, -5.0)
+        self.assertEqual(results["replayed"].mean, 0.0)
@@ -0,0 +1,101 @@
+import math
+from unittest import TestCase, skipIf, mock
+try:
+    import numpy as np
+    from pyblackjack import jit
+    from pyblackjack.board import ResultBoard
+    from pyblackjack.jit import JitSimulator, JIT_AVAILABLE
+    from pyblackjack.rules import Rules
+    from pyblackjack.runner import simulate, MIN_ROUND_CARDS
+except ImportError:
+    np = None
+
+
+@skipIf(np is None, "numpy not installed")
+class TestJit(TestCase):
+    """Test compiled round kernel
+    """
+
+    def test_run_counts(self):
+        """Test aggregates add up across refills of shuffles
+        """
+        info = JitSimulator(1, 0.5, "basic_strategy", seed=1).run(5000)
+        self.assertEqual(info["wins"] + info["ties"] + info["losses"], info["num_hands"])
+        self.assertGreater(info["num_hands"], 5000)
+        self.assertEqual(info["round_stats"].count, 5000)
+        self.assertEqual(info["hand_stats"].count, info["num_hands"])
+        self.assertAlmostEqual(info["round_stats"].mean * 5000, info["earnings"])
+
+        simple = JitSimulator(1, 0.5, "simple", seed=1).run(2500)
+        self.assertEqual(simple["num_hands"], 2500)
+
+    def test_publish_steps(self):
+        """Test rounds played in publish steps match a single step and reach the board
+        """
+        whole = JitSimulator(1, 0.5, "basic_strategy", seed=2).run(5000)
+        board = ResultBoard(1)
+        try:
+            row = board.row(0)
+            with mock.patch.object(jit, "RUN_STEP", 1000):
+                stepped = JitSimulator(1, 0.5, "basic_strategy", seed=2).run(5000, row)
+            totals = board.totals()
+        finally:
+            board.close()
+        self.assertEqual(stepped["num_hands"], whole["num_hands"])
+        self.assertEqual(stepped["wins"], whole["wins"])
+        self.assertAlmostEqual(stepped["earnings"], whole["earnings"])
+        self.assertAlmostEqual(stepped["round_stats"].m2, whole["round_stats"].m2)
+        self.assertEqual(totals["rounds"], 5000)
+        self.assertTrue(totals["workers"][0]["busy"])
+        self.assertEqual(sum(stats.count for stats in totals["upcards"].values()), 5000)
+
+    @skipIf(not JIT_AVAILABLE, "numba not installed")
+    def test_interpreted(self):
+        """Test the interpreted kernel plays the same rounds as the compiled one
+        """
+        rules = Rules(surrender=True, hit_soft_17=True, resplit_aces=True, penetration=0.8)
+        compiled = JitSimulator(2, 0.5, "basic_strategy", seed=3, rules=rules).run(2000)
+        with mock.patch.object(jit, "play_rounds", jit.play_rounds.py_func), \
+                mock.patch.object(jit, "shuffle", jit.shuffle.py_func):
+            interpreted = JitSimulator(2, 0.5, "basic_strategy", seed=3, rules=rules).run(2000)
+        self.assertEqual(compiled, interpreted)
+
+    def test_shoe_end(self):
+        """Test a long round at the cut of a full shoe plays on into the padding
+        """
+        rules = Rules(penetration=0.99)
+        simulator = JitSimulator(1, 0.5, "basic_strategy", seed=5, rules=rules)
+        simulator.play(1)
+        # A shoe of twos cut at its last card, splitting to four hands takes over
+        # 20 cards. The interpreted kernel raises IndexError past the array
+        simulator.cards[:52] = 1
+        simulator.state[1], simulator.state[2] = 52 - MIN_ROUND_CARDS, 52
+        with mock.patch.object(jit, "play_rounds",
+                               getattr(jit.play_rounds, "py_func", jit.play_rounds)), \
+                mock.patch.object(jit, "shuffle", getattr(jit.shuffle, "py_func", jit.shuffle)):
+            _, _, hand_earnings, _ = simulator.play(1)
+            self.assertEqual(simulator.state[0], 1)
+            self.assertGreater(simulator.state[1], 52)
+            self.assertEqual(len(hand_earnings), 4)
+            # The next round reshuffles, fewer than MIN_ROUND_CARDS are left before the cut
+            simulator.play(1)
+            self.assertEqual(simulator.state[0], 2)
+
+    def test_matches_object(self):
+        """Test kernel and object engine agree within sampling error
+        """
+        rules = Rules(surrender=True, hit_soft_17=True, max_hands=3, resplit_aces=True)
+        for strategy, num_decks, table_rules in (("basic_strategy", 2, Rules()),
+                                                 ("basic_strategy", 6, rules),
+                                                 ("simple", 1, Rules())):
+            reference = simulate(20000, num_decks, 0.5, strategy, "object", seed=7,
+                                 rules=table_rules)
+            compiled = simulate(400000, num_decks, 0.5, strategy, "jit", seed=7,
+                                rules=table_rules)
+            expected, actual = reference["round_stats"], compiled["round_stats"]
+            self.assertLess(abs(expected.mean - actual.mean),
+                            4 * math.hypot(expected.stderr, actual.stderr))
+            self.assertAlmostEqual(compiled["num_hands"] / 400000,
+                                   reference["num_hands"] / 20000, delta=0.01)
+            self.assertAlmostEqual(compiled["wins"] / compiled["num_hands"],
+                                   reference["wins"] / reference["num_hands"], delta=0.015)
@@ -0,0 +1,85 @@
+import math
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+try:
+    import numpy as np
+    from pyblackjack.outcomes import (OutcomeHistogram, as_histogram, outcome_config,
+                                      load_histogram, round_outcomes)
+except ImportError:
+    np = None
+
+
+@skipIf(np is None, "numpy not installed")
+class TestOutcomes(TestCase):
+    """Test outcome histograms
+    """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_histogram(self):
+        """Test counts, moments, merging and sampling of a histogram
+        """
+        outcomes = [-1.0, -1.0, 1.0, 1.5, -1.0, 0.0, 1.0, 2.0]
+        true_counts = [-1, -1, 2, 2, 0, 0, 2, 2]
+        histogram = OutcomeHistogram.from_outcomes(outcomes, true_counts)
+        self.assertEqual(histogram.values.tolist(), [-1.0, 0.0, 1.0, 1.5, 2.0])
+        self.assertEqual(histogram.true_counts.tolist(), [-1, 0, 2])
+        self.assertEqual(histogram.rounds, 8)
+        self.assertAlmostEqual(histogram.mean, float(np.mean(outcomes)))
+        self.assertAlmostEqual(histogram.std, float(np.std(outcomes)))
+        self.assertAlmostEqual(histogram.count_correlation(),
+                               float(np.corrcoef(true_counts, outcomes)[0, 1]))
+        self.assertEqual(histogram.ev_by_count(), {-1: (2, -1.0), 0: (2, -0.5), 2: (4, 1.375)})
+        self.assertEqual(histogram.given_count(2).rounds, 4)
+        self.assertEqual(histogram.given_count(2).mean, 1.375)
+
+        merged = histogram.merge(OutcomeHistogram.from_outcomes([3.0], [5]))
+        self.assertEqual(merged.rounds, 9)
+        self.assertEqual(merged.values.tolist(), [-1.0, 0.0, 1.0, 1.5, 2.0, 3.0])
+        self.assertEqual(merged.true_counts.tolist(), [-1, 0, 2, 5])
+        with self.assertRaises(ValueError):
+            histogram.merge(as_histogram([1.0]))
+        with self.assertRaises(ValueError):
+            as_histogram([])
+
+        draws = histogram.sample(np.random.default_rng(1), (200, 500))
+        self.assertEqual(draws.shape, (200, 500))
+        self.assertEqual(set(draws.ravel().tolist()), set(histogram.values.tolist()))
+        self.assertAlmostEqual(float(draws.mean()), histogram.mean, delta=0.02)
+        self.assertEqual(OutcomeHistogram.from_dict(histogram.as_dict()).as_dict(),
+                         histogram.as_dict())
+
+    def test_cache(self):
+        """Test cached histograms are reused, topped up and keyed by config
+        """
+        config = outcome_config(2, 0.5, "basic_strategy")
+        first = load_histogram(config, 3000, seed=4, cache_dir=self.cache_dir)
+        self.assertEqual(first.rounds, 3000)
+        again = load_histogram(config, 2000, seed=4, cache_dir=self.cache_dir)
+        self.assertEqual(again.as_dict(), first.as_dict())
+        more = load_histogram(config, 5000, seed=4, cache_dir=self.cache_dir)
+        self.assertEqual(more.rounds, 5000)
+        topped_up = dict(zip(more.values.tolist(), more.marginal.tolist()))
+        for value, rounds in zip(first.values.tolist(), first.marginal.tolist()):
+            self.assertGreaterEqual(topped_up[value], rounds)
+        other = load_histogram(outcome_config(6, 0.5, "basic_strategy"), 2000, seed=4,
+                               cache_dir=self.cache_dir)
+        self.assertEqual(other.rounds, 2000)
+
+        outcomes, _ = round_outcomes(2000, 2, 0.5, "basic_strategy", seed=5)
+        self.assertEqual(as_histogram(outcomes).rounds, 2000)
+
+    def test_counted(self):
+        """Test counted outcomes are split by true count
+        """
+        config = outcome_config(2, 0.5, "basic_strategy", engine="object", count="hilo")
+        histogram = load_histogram(config, 500, seed=6, cache_dir=None)
+        self.assertEqual(histogram.rounds, 500)
+        self.assertIn(0, histogram.true_counts.tolist())
+        self.assertEqual(sum(rounds for rounds, _ in histogram.ev_by_count().values()), 500)
+        self.assertFalse(math.isnan(histogram.count_correlation()))
@@ -0,0 +1,59 @@
+import argparse
+import json
+import pickle
+import tempfile
+import os
+from unittest import TestCase
+from pyblackjack.rules import (Rules, DEFAULT_RULES, load_rules, add_rule_arguments,
+                               rules_from_args, rules_grid_from_args)
+
+
+class TestRules(TestCase):
+    """Test house rules
+    """
+
+    def test_validate(self):
+        """Test impossible rules are refused
+        """
+        self.assertRaises(ValueError, Rules, max_hands=0)
+        self.assertRaises(ValueError, Rules, blackjack_payout=0)
+        self.assertRaises(ValueError, Rules, penetration=1.5)
+        self.assertEqual(pickle.loads(pickle.dumps(Rules(hit_soft_17=True))),
+                         Rules(hit_soft_17=True))
+        self.assertNotEqual(Rules(hit_soft_17=True), DEFAULT_RULES)
+
+    def test_from_args(self):
+        """Test options override the rules file
+        """
+        parser = argparse.ArgumentParser()
+        add_rule_arguments(parser)
+        self.assertEqual(rules_from_args(parser.parse_args([])), DEFAULT_RULES)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rules.json")
+            with open(path, "w") as rules_file:
+                json.dump({"hit_soft_17": True, "blackjack_payout": 1.2}, rules_file)
+            self.assertEqual(load_rules(path), Rules(hit_soft_17=True, blackjack_payout=1.2))
+            args = parser.parse_args(["--rules", path, "--blackjack-payout", "1.5", "--no-das",
+                                      "--surrender"])
+            self.assertEqual(rules_from_args(args), Rules(
+                hit_soft_17=True, double_after_split=False, surrender=True))
+
+            with open(path, "w") as rules_file:
+                json.dump({"hit_soft_seventeen": True}, rules_file)
+            self.assertRaises(argparse.ArgumentTypeError, rules_from_args,
+                              parser.parse_args(["--rules", path]))
+
+    def test_grid_from_args(self):
+        """Test each rules file is a set of rules to sweep with the options over it
+        """
+        parser = argparse.ArgumentParser()
+        add_rule_arguments(parser, grid=True)
+        self.assertEqual(rules_grid_from_args(parser.parse_args([])), [DEFAULT_RULES])
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, name) for name in ("h17.json", "s17.json")]
+            for path, options in zip(paths, ({"hit_soft_17": True}, {})):
+                with open(path, "w") as rules_file:
+                    json.dump(options, rules_file)
+            args = parser.parse_args(["--rules"] + paths + ["--surrender"])
+            self.assertEqual(rules_grid_from_args(args), [
+                Rules(hit_soft_17=True, surrender=True), Rules(surrender=True)])
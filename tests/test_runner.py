@@ -0,0 +1,92 @@
+from unittest import TestCase
+from pyblackjack.runner import (split_chunks, simulate, run_simulations, chunk_seed,
+                                compare_strategies, check_penetration)
+from pyblackjack.rules import Rules
+
+
+class TestRunner(TestCase):
+    """Test simulation runner
+    """
+
+    def test_split_chunks(self):
+        """Test chunks add up to exact simulation count
+        """
+        self.assertEqual(split_chunks(25, 10), [10, 10, 5])
+        self.assertEqual(split_chunks(20, 10), [10, 10])
+        self.assertEqual(split_chunks(3, 10), [3])
+
+    def test_simulate(self):
+        """Test single batch results
+        """
+        results = simulate(100, 2, 0.75, "simple")
+        self.assertEqual(results["num_sims"], 100)
+        self.assertEqual(results["num_hands"], 100)
+
+    def test_run_simulations(self):
+        """Test pooled run completes exact count
+        """
+        results, interrupted = run_simulations(250, 1, 0.5, "basic_strategy",
+                                               workers=2, chunk_size=40)
+        self.assertFalse(interrupted)
+        self.assertEqual(results["num_sims"], 250)
+        self.assertEqual(results["wins"] + results["ties"] + results["losses"],
+                         results["num_hands"])
+
+    def test_seeded_runs_repeat(self):
+        """Test seeded runs are reproducible across worker counts
+        """
+        first, _ = run_simulations(300, 2, 0.75, "simple", workers=1, chunk_size=50, seed=11)
+        second, _ = run_simulations(300, 2, 0.75, "simple", workers=2, chunk_size=50, seed=11)
+        self.assertEqual(first, second)
+
+    def test_chunk_seed(self):
+        """Test chunks get distinct seeds
+        """
+        self.assertIsNone(chunk_seed(None, 0))
+        self.assertNotEqual(chunk_seed(1, 0), chunk_seed(1, 1))
+        self.assertEqual(chunk_seed(1, 2), chunk_seed(1, 2))
+
+    def test_target_stderr(self):
+        """Test run stops handing out chunks once stderr target is met
+        """
+        results, _ = run_simulations(100000, 1, 0.5, "simple", workers=1, chunk_size=100,
+                                     target_stderr=1.0)
+        self.assertLess(results["num_sims"], 100000)
+        self.assertLessEqual(results["round_stats"].stderr, 1.0)
+        self.assertEqual(results["round_stats"].count, results["num_sims"])
+        self.assertEqual(results["hand_stats"].count, results["num_hands"])
+
+    def test_compare_strategies(self):
+        """Test strategies are paired on the same shoes
+        """
+        results = compare_strategies(300, 2, 0.75, ["basic_strategy", "basic_strategy", "simple"],
+                                     seed=4)
+        reference = simulate(300, 2, 0.75, "basic_strategy", seed=4)
+        self.assertEqual(results["strategies"][0], reference)
+        self.assertEqual(results["strategies"][1], reference)
+        self.assertEqual(results["differences"][0].m2, 0.0)
+        self.assertEqual(results["differences"][0].count, 300)
+        self.assertAlmostEqual(results["differences"][1].mean * 300,
+                               results["strategies"][2]["earnings"] - reference["earnings"])
+
+    def test_run_comparison(self):
+        """Test pooled comparison merges every chunk
+        """
+        results, _ = run_simulations(250, 1, 0.5, ["basic_strategy", "simple"],
+                                     workers=2, chunk_size=40, seed=8)
+        self.assertEqual(results["num_sims"], 250)
+        self.assertEqual([info["num_sims"] for info in results["strategies"]], [250, 250])
+        self.assertEqual(results["differences"][0].count, 250)
+
+    def test_low_penetration(self):
+        """Test a cut card before a round's worth of cards is rejected up front
+        """
+        low = Rules(penetration=0.2)
+        self.assertRaises(ValueError, check_penetration, 1, low)
+        self.assertRaises(ValueError, simulate, 100, 1, 0.5, "basic_strategy", rules=low)
+        self.assertRaises(ValueError, run_simulations, 100, 1, 0.5, "basic_strategy",
+                          workers=1, rules=low)
+        self.assertRaises(ValueError, check_penetration, 1, Rules(penetration=0.5), seats=2)
+        check_penetration(6, low)
+        results = simulate(2000, 1, 0.5, "basic_strategy", seed=1, rules=Rules(penetration=0.4))
+        self.assertEqual(results["num_sims"], 2000)
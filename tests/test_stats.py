@@ -0,0 +1,42 @@
+from unittest import TestCase
+import math
+from pyblackjack.stats import RunningStats
+
+
+class TestRunningStats(TestCase):
+    """Test streaming statistics
+    """
+
+    def test_add(self):
+        """Test mean and variance of added values
+        """
+        stats = RunningStats()
+        for value in [2.0, 4.0, 4.0, 4.0, 5.0, 5.0, 7.0, 9.0]:
+            stats.add(value)
+        self.assertEqual(stats.count, 8)
+        self.assertAlmostEqual(stats.mean, 5.0)
+        self.assertAlmostEqual(stats.variance, 32.0 / 7)
+        self.assertAlmostEqual(stats.stderr, math.sqrt(32.0 / 7 / 8))
+
+    def test_merge(self):
+        """Test merging partial stats matches adding all values
+        """
+        values = [-5.0, 7.5, 0.0, 5.0, -10.0, 5.0, 5.0]
+        whole, first, second = RunningStats(), RunningStats(), RunningStats()
+        for value in values:
+            whole.add(value)
+        for value in values[:3]:
+            first.add(value)
+        for value in values[3:]:
+            second.add(value)
+        first.merge(second).merge(RunningStats())
+        self.assertEqual(first.count, whole.count)
+        self.assertAlmostEqual(first.mean, whole.mean)
+        self.assertAlmostEqual(first.m2, whole.m2)
+
+    def test_empty(self):
+        """Test stats before enough values
+        """
+        stats = RunningStats()
+        self.assertEqual(stats.variance, 0.0)
+        self.assertEqual(stats.stderr, math.inf)
@@ -1,8 +1,15 @@
 from unittest import TestCase
 from pyblackjack.hand import Hand
 from pyblackjack.card import Card
-from pyblackjack.deck import Deck
-from pyblackjack.strategy import DealerStrategy, BasicStrategy, SimpleStrategy, SPLIT
+from array import array
+from pyblackjack.deck import Deck, CARD_VALUES
+from pyblackjack.rules import Rules
+from pyblackjack.counting import Counter
+import copy
+from pyblackjack.strategy import (DealerStrategy, BasicStrategy, SimpleStrategy, SPLIT, STAND,
+                                  DOUBLE, HIT, SURRENDER, compile_strategy, load_strategy,
+                                  compile_deviations, load_deviations, compile_surrender,
+                                  load_surrender)
 
 
 class TestDealerStrategy(TestCase):
@@ -37,6 +44,17 @@ class TestDealerStrategy(TestCase):
         self.strategy.play(dealer_hand)
         self.assertEqual(len(dealer_hand.cards), 2)
 
+    def test_dealer_strategy_soft_17(self):
+        """Test soft 17 stands by default and is hit when the rules say so
+        """
+        dealer_hand = Hand()
+        dealer_hand.add_card(Card("Spades", "6"))
+        dealer_hand.add_card(Card("Clubs", "A"))
+        self.strategy.play(dealer_hand)
+        self.assertEqual(len(dealer_hand.cards), 2)
+        DealerStrategy(self.deck, Rules(hit_soft_17=True)).play(dealer_hand)
+        self.assertGreaterEqual(len(dealer_hand.cards), 3)
+
 
 class TestSimpleStrategy(TestCase):
     """Test simplest strat
@@ -132,9 +150,10 @@ class TestBasicStrategy(TestCase):
         dealer_hand.add_card(Card("Clubs", "9"))
 
         cont_playing = strategy.play_hand(SPLIT, player_hand, dealer_hand)
-        self.assertEqual(len(strategy.split_hands), 2)
-        self.assertEqual(cont_playing, True)
-        self.assertEqual(strategy.cont_split, False)
+        self.assertEqual(len(strategy.stack), 2)
+        self.assertEqual(strategy.num_hands, 2)
+        self.assertEqual(cont_playing, False)
+        self.assertEqual([h.cards[0].value for h in strategy.stack], ["A", "A"])
 
     def test_basic_strat_split_nonace(self):
         """Test split non-ace
@@ -149,8 +168,8 @@ class TestBasicStrategy(TestCase):
         dealer_hand.add_card(Card("Clubs", "3"))
 
         is_playing = strategy.play_hand(SPLIT, player_hand, dealer_hand)
-        self.assertEqual(len(strategy.split_hands), 2)
-        self.assertEqual(is_playing, True)
+        self.assertEqual(len(strategy.stack), 2)
+        self.assertEqual(is_playing, False)
 
     def test_basic_strat_double_1(self):
         """Test double down 1
@@ -230,3 +249,219 @@ class TestBasicStrategy(TestCase):
         self.strategy.play(player_hand, dealer_hand)
         self.assertGreater(len(player_hand.cards), 2)
         self.assertEqual(player_hand.bet, 4.0)
+
+
+def stacked_deck(values):
+    """Deck dealing the given card values in order"""
+    deck = Deck(1)
+    deck.codes = array('b', [CARD_VALUES.index(value) for value in values] * 2)
+    deck.end = len(deck.codes)
+    return deck
+
+
+def dealer(upcard):
+    """Dealer hand showing upcard"""
+    hand = Hand()
+    hand.add_card(Card("Spades", "10"))
+    hand.add_card(Card("Spades", upcard))
+    return hand
+
+
+def pair(value):
+    """Pair of value with a bet"""
+    hand = Hand()
+    hand.add_card(Card("Spades", value))
+    hand.add_card(Card("Clubs", value))
+    hand.add_bet(5.0)
+    return hand
+
+
+class TestSplitRules(TestCase):
+    """Test split hands played within house rules
+    """
+
+    def test_resplit_to_max_hands(self):
+        """Test pairs resplit until the hand limit then play on their total
+        """
+        strategy = BasicStrategy(stacked_deck(["8"] * 3 + ["10"] * 8))
+        hands = strategy.play(pair("8"), dealer("6"))
+        self.assertEqual(len(hands), 4)
+        self.assertEqual(strategy.num_hands, 4)
+        self.assertEqual(sorted(h.value for h in hands), [16, 18, 18, 18])
+        self.assertEqual(sum(h.bet for h in hands), 20.0)
+
+        strategy = BasicStrategy(stacked_deck(["8"] * 3 + ["10"] * 8), rules=Rules(max_hands=2))
+        hands = strategy.play(pair("8"), dealer("6"))
+        self.assertEqual(len(hands), 2)
+        self.assertEqual([len(h.cards) for h in hands], [2, 2])
+
+    def test_split_aces(self):
+        """Test split aces take one card and resplit only when allowed
+        """
+        strategy = BasicStrategy(stacked_deck(["A", "5", "A", "4"]))
+        hands = strategy.play(pair("A"), dealer("6"))
+        self.assertEqual([[c.value for c in h.cards] for h in hands], [["A", "A"], ["A", "5"]])
+
+        strategy = BasicStrategy(stacked_deck(["A", "5", "9", "4"]), rules=Rules(resplit_aces=True))
+        hands = strategy.play(pair("A"), dealer("6"))
+        self.assertEqual(len(hands), 3)
+        self.assertTrue(all(len(h.cards) == 2 for h in hands))
+
+    def test_double_after_split(self):
+        """Test split hands double only when the rules allow
+        """
+        strategy = BasicStrategy(stacked_deck(["9", "5", "9", "9"]))
+        hands = strategy.play(pair("2"), dealer("5"))
+        self.assertEqual([h.bet for h in hands], [10.0, 5.0])
+
+        strategy = BasicStrategy(stacked_deck(["9", "5", "9", "9"]),
+                                 rules=Rules(double_after_split=False))
+        hands = strategy.play(pair("2"), dealer("5"))
+        self.assertEqual([h.bet for h in hands], [5.0, 5.0])
+
+
+class TestSurrender(TestCase):
+    """Test late surrender and insurance
+    """
+
+    def test_compile(self):
+        """Test surrenders are merged into hard totals of the first decision table
+        """
+        lookup_table, table = load_strategy("basic_strategy")
+        first = load_surrender("basic_strategy")
+        self.assertEqual(sum(a != b for a, b in zip(first, table)), 4)
+        self.assertIsNone(load_surrender("basic_strategy_alt"))
+        broken = copy.deepcopy(lookup_table)
+        broken["Surrender"]["16"] = [1]
+        with self.assertRaises(ValueError):
+            compile_surrender(broken, table)
+        broken = copy.deepcopy(lookup_table)
+        broken["BasicStrategy"]["Other"]["16"]["10"] = SURRENDER
+        with self.assertRaises(ValueError):
+            compile_strategy(broken)
+
+    def test_surrender_first_decision(self):
+        """Test only a dealt hand surrenders, and only when the rules allow it
+        """
+        hand = Hand()
+        hand.add_card(Card("Spades", "10"))
+        hand.add_card(Card("Clubs", "6"))
+        hand.add_bet(5.0)
+        strategy = BasicStrategy(stacked_deck(["5"]), rules=Rules(surrender=True))
+        hands = strategy.play(hand, dealer("10"))
+        self.assertTrue(hands[0].surrendered)
+        self.assertEqual(len(hands[0].cards), 2)
+
+        hand.surrendered = False
+        strategy = BasicStrategy(stacked_deck(["5"]))
+        self.assertEqual(strategy.decide(hand, 10), HIT)
+        self.assertFalse(strategy.play(hand, dealer("10"))[0].surrendered)
+
+        # Three card 16 plays on, split 8s are never surrendered
+        hand = Hand()
+        for value in ("10", "2", "4"):
+            hand.add_card(Card("Spades", value))
+        strategy = BasicStrategy(stacked_deck(["5"]), rules=Rules(surrender=True))
+        self.assertFalse(strategy.play(hand, dealer("10"))[0].surrendered)
+        strategy = BasicStrategy(stacked_deck(["10"] * 4), rules=Rules(surrender=True))
+        self.assertFalse(any(h.surrendered for h in strategy.play(pair("8"), dealer("9"))))
+
+    def test_insure(self):
+        """Test insurance is taken on the count only where offered
+        """
+        deck = Deck(1)
+        counter = Counter("hilo", deck)
+        counter.prefix = [6] * 53
+        dealer_hand = dealer("A")
+        strategy = BasicStrategy(deck, strat_file="basic_strategy_i18", rules=Rules(insurance=True))
+        self.assertTrue(strategy.insure(dealer_hand))
+        counter.prefix = [0] * 53
+        self.assertFalse(strategy.insure(dealer_hand))
+        counter.prefix = [6] * 53
+        self.assertFalse(BasicStrategy(deck, strat_file="basic_strategy_i18").insure(dealer_hand))
+        self.assertFalse(BasicStrategy(deck, rules=Rules(insurance=True)).insure(dealer_hand))
+
+
+class TestCompileStrategy(TestCase):
+    """Test compiled decision tables
+    """
+
+    def test_decide(self):
+        """Test single lookups against JSON table
+        """
+        strategy = BasicStrategy(None)
+        hand = Hand()
+        hand.add_card(Card("Spades", "9"))
+        hand.add_card(Card("Clubs", "9"))
+        self.assertEqual(strategy.decide(hand, 7), STAND)
+        self.assertEqual(strategy.decide(hand, 8), SPLIT)
+
+        hand = Hand()
+        hand.add_card(Card("Spades", "A"))
+        hand.add_card(Card("Clubs", "7"))
+        self.assertEqual(strategy.decide(hand, 3), DOUBLE)
+        hand.add_card(Card("Clubs", "2"))
+        self.assertEqual(strategy.decide(hand, 3), STAND)
+
+    def test_missing_cell(self):
+        """Test incomplete tables fail at compile time
+        """
+        lookup_table, _ = load_strategy("basic_strategy")
+        broken = copy.deepcopy(lookup_table)
+        del broken["BasicStrategy"]["Other"]["16"]["7"]
+        with self.assertRaises(ValueError):
+            compile_strategy(broken)
+
+        broken = copy.deepcopy(lookup_table)
+        del broken["BasicStrategy"]["Ace"]
+        with self.assertRaises(ValueError):
+            compile_strategy(broken)
+
+    def test_invalid_action(self):
+        """Test unknown actions fail at compile time
+        """
+        lookup_table, _ = load_strategy("basic_strategy_alt")
+        broken = copy.deepcopy(lookup_table)
+        broken["BasicStrategy"]["Pairs"]["8"] = "X"
+        with self.assertRaises(ValueError):
+            compile_strategy(broken)
+
+
+class TestDeviations(TestCase):
+    """Test count deviations
+    """
+
+    def test_compile(self):
+        """Test packaged deviations compile and plain tables have none
+        """
+        self.assertIsNone(load_deviations("basic_strategy"))
+        deviations = load_deviations("basic_strategy_i18")
+        self.assertEqual(sum(cell is not None for cell in deviations), 17)
+        lookup_table, table = load_strategy("basic_strategy_i18")
+        broken = copy.deepcopy(lookup_table)
+        broken["Deviations"][0]["Action"] = "X"
+        with self.assertRaises(ValueError):
+            compile_deviations(broken, table)
+
+    def test_decide(self):
+        """Test deviations switch on the true count left after the hole card
+        """
+        deck = Deck(1)
+        counter = Counter("hilo", deck)
+        strategy = BasicStrategy(deck, strat_file="basic_strategy_i18")
+        hand = Hand()
+        hand.add_card(Card("Spades", "10"))
+        hand.add_card(Card("Clubs", "6"))
+        hole = Card("Hearts", "9")
+        self.assertEqual(strategy.decide(hand, 10), HIT)
+        self.assertEqual(strategy.decide(hand, 10, counter, hole), STAND)
+        counter.prefix = [-1] * 53
+        self.assertEqual(strategy.decide(hand, 10, counter, hole), HIT)
+
+        hand = Hand()
+        hand.add_card(Card("Spades", "10"))
+        hand.add_card(Card("Clubs", "3"))
+        self.assertEqual(strategy.decide(hand, 2, counter, hole), STAND)
+        counter.prefix = [-5] * 53
+        self.assertEqual(strategy.decide(hand, 2, counter, hole), HIT)
+        self.assertEqual(strategy.decide(hand, 2), STAND)
@@ -0,0 +1,56 @@
+import tempfile
+from unittest import TestCase
+from pyblackjack.sweep import (grid, config_key, dump_results, load_results, run_sweep,
+                               rules_label)
+from pyblackjack.runner import simulate
+from pyblackjack.rules import Rules
+
+
+class TestSweep(TestCase):
+    """Test parameter sweeps
+    """
+
+    def test_grid(self):
+        """Test every combination gets a distinct cache key
+        """
+        configs = grid([1, 2], [0.5, 0.75], ["simple", "basic_strategy"])
+        self.assertEqual(len(configs), 8)
+        self.assertEqual(len({config_key(config, 1) for config in configs}), 8)
+        self.assertNotEqual(config_key(configs[0], 1), config_key(configs[0], 2))
+        h17 = grid([1], [0.5], ["simple"], rules=[Rules(hit_soft_17=True)])
+        self.assertNotEqual(config_key(h17[0], 1), config_key(configs[0], 1))
+        self.assertEqual(rules_label(h17[0]["rules"]), "hit_soft_17=True")
+        self.assertEqual(rules_label(configs[0]["rules"]), "default")
+
+    def test_dump_results(self):
+        """Test results survive a JSON round trip
+        """
+        results = simulate(50, 1, 0.5, "simple", seed=1)
+        self.assertEqual(load_results(dump_results(results)), results)
+
+    def test_cache_top_up(self):
+        """Test re-runs only simulate missing chunks and match an uncached run
+        when the cached cells hold whole chunks
+        """
+        configs = grid([1], [0.5], ["simple", "basic_strategy"])
+        with tempfile.TemporaryDirectory() as tmp:
+            cells, _ = run_sweep(configs, 200, workers=1, chunk_size=100, seed=3, cache_dir=tmp)
+            self.assertEqual([cell.chunks for cell in cells], [2, 2])
+            cells, _ = run_sweep(configs, 200, workers=1, chunk_size=100, seed=3, cache_dir=tmp)
+            self.assertEqual([cell.results["num_sims"] for cell in cells], [200, 200])
+            topped, _ = run_sweep(configs, 500, workers=2, chunk_size=100, seed=3, cache_dir=tmp)
+        fresh, _ = run_sweep(configs, 500, workers=1, chunk_size=100, seed=3, cache_dir=None)
+        for cell, other in zip(topped, fresh):
+            self.assertEqual(cell.chunks, 5)
+            self.assertEqual(cell.results["num_sims"], 500)
+            self.assertEqual(cell.results, other.results)
+
+    def test_partial_top_up(self):
+        """Test a top-up after a partial chunk continues its chunk indices
+        """
+        configs = grid([1], [0.5], ["simple"])
+        with tempfile.TemporaryDirectory() as tmp:
+            cells, _ = run_sweep(configs, 150, workers=1, chunk_size=100, seed=3, cache_dir=tmp)
+            self.assertEqual(cells[0].chunks, 2)
+            pending = [(index, size) for _, index, size in cells[0].pending_chunks(400, 100)]
+            self.assertEqual(pending, [(2, 100), (3, 100), (4, 50)])
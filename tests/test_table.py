@@ -0,0 +1,63 @@
+import random
+from unittest import TestCase
+from pyblackjack.deck import Deck
+from pyblackjack.table import Table
+from pyblackjack.runner import new_deck, reshuffle, get_strategy, simulate, run_simulations
+
+
+class TestTable(TestCase):
+    """Test multi-seat tables
+    """
+
+    def test_deal_order(self):
+        """Test cards go round the seats before the dealer upcard and hole card
+        """
+        table = Table(Deck(1), [get_strategy("simple"), get_strategy("simple")])
+        table.deal()
+        self.assertEqual([c.value for c in table.seats[0].player_hand.cards], ["A", "4"])
+        self.assertEqual([c.value for c in table.seats[1].player_hand.cards], ["2", "5"])
+        self.assertEqual([c.value for c in table.dealer_hand.cards], ["6", "3"])
+
+    def test_seats(self):
+        """Test seat count is validated
+        """
+        self.assertRaises(ValueError, Table, Deck(1), [])
+        self.assertRaises(ValueError, Table, Deck(1), [get_strategy("simple")] * 8)
+        self.assertRaises(ValueError, Table, Deck(1), [get_strategy("simple")], [1.0, 2.0])
+
+    def test_play_rounds(self):
+        """Test every seat settles each hand and bankrolls follow earnings
+        """
+        deck = new_deck(6, rng=random.Random(3))
+        strategies = [get_strategy("basic_strategy"), get_strategy("simple"),
+                      get_strategy("basic_strategy_alt")]
+        table = Table(deck, strategies, bankrolls=[100.0, 100.0, 100.0])
+        earnings = [0.0, 0.0, 0.0]
+        for _ in range(300):
+            if len(deck) < 60:
+                reshuffle(deck)
+            table.play_round()
+            for index, seat in enumerate(table.seats):
+                info = seat.game_info
+                hands = len(seat.player_strategy.split_hands) or 1
+                self.assertEqual(info["wins"] + info["ties"] + info["losses"], hands)
+                self.assertEqual(len(seat.hand_earnings), hands)
+                earnings[index] += info["earnings"]
+        for bankroll, seat_earnings in zip(table.bankrolls, earnings):
+            self.assertAlmostEqual(bankroll, 100.0 + seat_earnings)
+
+    def test_simulate_seats(self):
+        """Test table batches count a game per seat
+        """
+        results = simulate(200, 4, 0.5, "basic_strategy", seed=1, seats=5)
+        self.assertEqual(results["num_sims"], 200)
+        self.assertEqual(results["seat_games"], 1000)
+        self.assertEqual(results["round_stats"].count, 200)
+        self.assertGreaterEqual(results["num_hands"], 1000)
+
+    def test_run_seats(self):
+        """Test pooled table runs count table rounds and seat games apart
+        """
+        results, _ = run_simulations(90, 2, 0.5, "simple", workers=2, chunk_size=40, seats=3)
+        self.assertEqual(results["num_sims"], 90)
+        self.assertEqual(results["seat_games"], 270)
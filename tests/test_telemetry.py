@@ -0,0 +1,79 @@
+import io
+import os
+import socket
+import tempfile
+import time
+from unittest import TestCase
+from urllib.request import urlopen
+from pyblackjack.board import ResultBoard
+from pyblackjack.runner import simulate
+from pyblackjack.telemetry import Telemetry, format_duration
+
+
+class TestTelemetry(TestCase):
+    """Test run progress reports
+    """
+
+    def setUp(self):
+        self.board = ResultBoard(2)
+        self.row = self.board.row(1)
+        self.results = simulate(2000, 2, 0.5, "simple", seed=3, board=self.row)
+        self.row.finish(self.results)
+
+    def tearDown(self):
+        self.board.close()
+
+    def test_report(self):
+        """Test progress line, rates and Prometheus metrics of a report
+        """
+        stream = io.StringIO()
+        telemetry = Telemetry(self.board, 8000, interval=1.0, stream=stream)
+        now = time.time()
+        telemetry.started = now - 10.0
+        snapshot = telemetry.report(now=now)
+        self.assertEqual(snapshot["rounds"], 2000)
+        self.assertAlmostEqual(snapshot["average"], 200.0)
+        self.assertAlmostEqual(snapshot["eta"], 30.0)
+        self.assertAlmostEqual(snapshot["ev"], self.results["round_stats"].mean)
+        self.assertIn("2,000/8,000 rounds (25.0%)", stream.getvalue())
+        self.assertIn("ETA 30s", stream.getvalue())
+        self.assertIn("workers 1: 200/s\n", stream.getvalue())
+        self.assertIn("pyblackjack_rounds_total 2000\n", telemetry.metrics)
+        self.assertIn('pyblackjack_worker_rounds_total{worker="1"} 2000\n', telemetry.metrics)
+        self.assertIn("pyblackjack_earnings_per_game ", telemetry.metrics)
+        # No new rounds since the last report, the finished worker is idle
+        snapshot = telemetry.report(now=now + 10.0)
+        self.assertEqual(snapshot["workers"][0]["rate"], 0.0)
+        self.assertAlmostEqual(snapshot["average"], 100.0)
+        self.assertIn("workers 1: 0/s\n", stream.getvalue())
+        self.assertNotIn("stalled", stream.getvalue())
+        # A chunk started without publishing since is stalled
+        self.row.begin()
+        telemetry.report(now=time.time() + 10.0)
+        self.assertIn("workers 1: 0/s stalled", stream.getvalue())
+
+    def test_outputs(self):
+        """Test metrics file and HTTP endpoint without an estimate
+        """
+        with socket.socket() as free:
+            free.bind(("127.0.0.1", 0))
+            port = free.getsockname()[1]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "pyblackjack.prom")
+            with Telemetry(self.board, 2000, interval=60.0, stream=None, metrics_file=path,
+                           port=port, estimate=False) as telemetry:
+                telemetry.report()
+                with urlopen("http://127.0.0.1:{0}/metrics".format(port)) as response:
+                    served = response.read().decode()
+                with open(path) as metrics:
+                    self.assertEqual(metrics.read(), served)
+        self.assertIn("pyblackjack_eta_seconds 0.0\n", served)
+        self.assertNotIn("pyblackjack_earnings_per_game", served)
+
+    def test_format_duration(self):
+        """Test short durations
+        """
+        self.assertEqual(format_duration(12.4), "12s")
+        self.assertEqual(format_duration(185), "3m05s")
+        self.assertEqual(format_duration(3720), "1h02m")
+        self.assertEqual(format_duration(float("inf")), "?")
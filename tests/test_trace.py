@@ -0,0 +1,50 @@
+import os
+import random
+import tempfile
+from unittest import TestCase
+from pyblackjack.game import Game
+from pyblackjack.runner import new_deck, reshuffle, get_strategy, simulate
+from pyblackjack.trace import RoundTracer, read_trace
+
+
+class TestTrace(TestCase):
+    """Test per-round traces
+    """
+
+    def test_record_rounds(self):
+        """Test a record is written per round with cards and decisions
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.jsonl")
+            with RoundTracer(path) as tracer:
+                deck = new_deck(2, rng=random.Random(4))
+                game = Game(deck, get_strategy("basic_strategy"), tracer)
+                for _ in range(20):
+                    if len(deck) < 20:
+                        reshuffle(deck)
+                    game.play_round()
+            records = list(read_trace(path))
+        self.assertEqual([r["round"] for r in records], list(range(20)))
+        for record in records:
+            self.assertGreaterEqual(len(record["player"]), 2)
+            self.assertGreaterEqual(len(record["dealer"]), 2)
+            self.assertEqual(sum(record["hand_earnings"]), record["earnings"])
+        self.assertTrue(any(record["actions"] for record in records))
+
+    def test_untraced_strategy(self):
+        """Test strategies keep no decisions without a tracer
+        """
+        game = Game(new_deck(1, rng=random.Random(1)), get_strategy("simple"))
+        game.play_round()
+        self.assertIsNone(game.player_strategy.actions)
+
+    def test_simulate_trace(self):
+        """Test traced batch matches its results
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.jsonl")
+            results = simulate(50, 1, 0.5, "simple", seed=2, trace=path)
+            records = list(read_trace(path))
+        self.assertEqual(len(records), 50)
+        self.assertAlmostEqual(sum(r["earnings"] for r in records), results["earnings"])
+        self.assertEqual(results, simulate(50, 1, 0.5, "simple", seed=2))